@@ -4,5 +4,5 @@ from .db2feeds import Db2Feeds
 from .dbmerge import DbMerge
 from .db2json import Db2JSON
 from .dbanalyzer import DbAnalyzer
-from .dbfilter import DbFilter
+from .dbfilter import DbFilter, DbMultiFilter, DbFilterOutput
 from .json2db import JSON2Db
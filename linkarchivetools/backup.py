@@ -9,20 +9,35 @@ What to do:
  - if any table is affected run reindex on it
  - run reindex from time to time
 """
+import io
 import sys
 import os
+import json
+import shutil
 import subprocess
 import argparse
 from pathlib import Path
+from datetime import datetime, date, timezone
 import time
 
-from sqlalchemy import create_engine, Column, String, Integer, MetaData, Table, text, LargeBinary, DateTime, select
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from sqlalchemy import create_engine, Column, String, Integer, MetaData, Table, text, LargeBinary, DateTime, select, func, or_
 from sqlalchemy.dialects.postgresql.types import BYTEA
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 #from linkarchivetools.utils.reflected import *
-from linkarchivetools.utils.reflected import ReflectedTable
-from linkarchivetools.tableconfig import get_backup_tables, get_tables
+from linkarchivetools.utils.reflected import ReflectedTable, ReflectedWatermark
+from linkarchivetools.model.definitions import Watermark
+from linkarchivetools.tableconfig import get_backup_tables, get_tables, get_table_dependencies
+from linkarchivetools.utils.taskscheduler import TaskScheduler
+from linkarchivetools.utils.snapshotprocessor import SnapshotProcessor
+from linkarchivetools.utils.pgmaintenance import PgMaintenance
+from linkarchivetools.utils.tabledigest import BackupManifest, get_table_digest, get_digest_differences
 
 
 output_directory = Path(__file__).parents[1]
@@ -33,12 +48,23 @@ tables_to_backup = get_backup_tables()
 
 
 all_tables = list(tables_to_backup)
-all_tables.append("blockentry")
-all_tables.append("apikeys")
-all_tables.append("applogging")
-all_tables.append("backgroundjob")
-all_tables.append("backgroundjobhistory")
-all_tables.append("keywords")
+for table in ["blockentry", "apikeys", "applogging", "backgroundjob", "backgroundjobhistory", "keywords"]:
+    if table not in all_tables:
+        all_tables.append(table)
+
+# truncated in sqlite backups
+tables_to_obfuscate = [
+    "dataexport",
+    "usersearchhistory",
+    "credentials",
+]
+
+# created in sqlite backups
+sqlite_indexes = [
+    ("linkdatamodel", "link"),
+    ("linkdatamodel", "title"),
+    ("linkdatamodel", "date_published"),
+]
 
 def get_backup_directory(export_type):
     return output_directory / "data" / ("backup_" + export_type)
@@ -63,6 +89,8 @@ def run_pg_dump_backup(run_info):
         format_args = "c"
     elif run_info["format"] == "plain" or run_info["format"] == "sql":
         format_args = "p"
+    elif run_info["format"] == "directory":
+        format_args = "d"
 
     command_input = [
         "pg_dump",
@@ -77,6 +105,10 @@ def run_pg_dump_backup(run_info):
     if "format" in run_info and run_info["format"] == "sql":
         command_input.append("--inserts")
 
+    # directory format dumps tables in parallel
+    if run_info["format"] == "directory" and run_info.get("jobs", 1) > 1:
+        command_input.extend(["-j", str(run_info["jobs"])])
+
     for table in tables:
         command_input.append("-t")
         command_input.append(table)
@@ -84,6 +116,10 @@ def run_pg_dump_backup(run_info):
     operating_dir = get_workspace_backup_directory(run_info["format"], workspace)
     operating_dir.mkdir(parents=True, exist_ok=True)
 
+    # pg_dump does not write into existing directory
+    if run_info["format"] == "directory":
+        shutil.rmtree(operating_dir / output_file, ignore_errors=True)
+
     print("Running: {} @ {}".format(command_input, operating_dir))
 
     try:
@@ -127,75 +163,23 @@ def truncate_table(run_info, table):
     return True
 
 
-def reset_table_index_sequence(run_info, table):
-    user = run_info["user"]
-    database = run_info["database"]
-    host = run_info["host"]
-    tables = run_info["tables"]
-
-    print("Resetting sequence for table {}".format(table))
-
-    sql = f"SELECT setval('{table}_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 1));"
-
-    command = [
-       'psql',
-       "-h", host,
-       "-U", user,
-       "-d", database,
-       '-c', sql,
-    ]
-
-    try:
-        subprocess.run(command, check=True)
-        print("Reset index sequence successfully.")
-    except subprocess.CalledProcessError as e:
-        print("An error occurred:", e)
-        return False
-
-    return True
+def get_workspace_maintenance(run_info):
+    """
+    Tables of workspace share one engine pool
+    """
+    return PgMaintenance(get_local_engine(run_info))
 
 
-def reset_tables_index_sequence(tablemapping, run_info):
+def reset_tables_index_sequence(run_info, tables):
     workspace = run_info["workspace"]
 
     # after restore we need to reset sequences
-    for item in tablemapping:
-        key = item[0]
-        tables = item[1]
-
-        run_info["output_file"] = key
-        run_info["tables"] = tables
-
-        for table in tables:
-            table = table.replace("instance_", workspace+"_")
-
-            if not reset_table_index_sequence(run_info, table):
-                print("Could not reset index in table")
-                return False
-
-    return True
-
-
-def run_table_sql(run_info, table, sql):
-    user = run_info["user"]
-    database = run_info["database"]
-    host = run_info["host"]
-
-    print("Call {} initiating".format(table))
+    maintenance = get_workspace_maintenance(run_info)
+    maintenance.run("sequence", [workspace + "_" + table for table in tables])
+    maintenance.engine.dispose()
 
-    command = [
-       'psql',
-       "-h", host,
-       "-U", user,
-       "-d", database,
-       '-c', sql,
-    ]
-
-    try:
-        subprocess.run(command, check=True)
-        print("Call {} successful.".format(sql))
-    except subprocess.CalledProcessError as e:
-        print("An error occurred:", e)
+    if not maintenance.is_successful():
+        print("Could not reset index in table")
         return False
 
     return True
@@ -232,6 +216,8 @@ def run_pg_restore(run_info):
         format_args = "c"
     elif run_info["format"] == "plain":
         format_args = "p"
+    elif run_info["format"] == "directory":
+        format_args = "d"
 
     command_input = [
         "pg_restore",
@@ -243,6 +229,9 @@ def run_pg_restore(run_info):
         output_file,
     ]
 
+    if run_info["format"] == "directory" and run_info.get("jobs", 1) > 1:
+        command_input.extend(["-j", str(run_info["jobs"])])
+
     for table in tables:
         command_input.append("-t")
         command_input.append(table)
@@ -298,6 +287,16 @@ def create_destionation_table(table_name, source_table, destination_engine):
             destination_table.create(destination_engine)
 
 
+def clear_destination_table(table_name, destination_engine):
+    """
+    Full backup replaces rows of previous backup. Rows can be inserted without checking ids
+    """
+    destination_table = get_engine_table(None, table_name, destination_engine, with_workspace=False)
+    with destination_engine.connect() as connection:
+        connection.execute(destination_table.delete())
+        connection.commit()
+
+
 def get_engine_table(workspace, table_name, engine, with_workspace=True):
     if with_workspace:
         this_tables_name = "{}_{}".format(workspace, table_name)
@@ -309,125 +308,229 @@ def get_engine_table(workspace, table_name, engine, with_workspace=True):
     return engine_table
 
 
-def get_table_row_values(row, source_table):
-    data = {}
-    
-    for column in source_table.columns:
-        value = getattr(row, column.name)
-        data[column.name] = value
+def get_peak_rss_mb():
+    """
+    Peak memory of this process, in MB. None if it cannot be read
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # bytes on macOS, kilobytes on linux
+        peak = peak / 1024
+    return peak / 1024
+
+
+def get_copy_value(value):
+    """
+    Converts value to PostgreSQL COPY text format
+    """
+    if value is None:
+        return "\\N"
+
+    if isinstance(value, bool):
+        text_value = "t" if value else "f"
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        text_value = "\\x" + bytes(value).hex()
+    elif isinstance(value, (datetime, date)):
+        text_value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        text_value = json.dumps(value)
+    else:
+        text_value = str(value)
+
+    return (
+        text_value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
+
+def get_copy_data(rows):
+    """
+    @param rows list of tuples
+    @returns file like object with rows in COPY text format
+    """
+    data = io.StringIO()
+    for row in rows:
+        data.write("\t".join(get_copy_value(value) for value in row))
+        data.write("\n")
+    data.seek(0)
     return data
 
 
-def is_row_with_id(connection, table, id_value):
+def copy_rows_postgres(connection, table, column_names, rows, override=False):
+    """
+    Writes rows with COPY FROM STDIN.
+    If not override, rows are copied into staging table first, and rows
+    with existing ids are skipped by INSERT ... ON CONFLICT DO NOTHING.
+    """
+    columns_text = ", ".join(f'"{column_name}"' for column_name in column_names)
+    staging_name = f"staging_{table.name}"
+
+    cursor = connection.connection.cursor()
     try:
-        existing = connection.execute(
-            select(table.c.id).where(table.c.id == id_value)
-        ).first()
+        if override:
+            cursor.copy_expert(
+                f'COPY "{table.name}" ({columns_text}) FROM STDIN', get_copy_data(rows)
+            )
+            return
+
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS "{staging_name}" (LIKE "{table.name}" INCLUDING DEFAULTS)'
+        )
+        cursor.execute(f'TRUNCATE "{staging_name}"')
+        cursor.copy_expert(
+            f'COPY "{staging_name}" ({columns_text}) FROM STDIN', get_copy_data(rows)
+        )
+        cursor.execute(
+            f'INSERT INTO "{table.name}" ({columns_text}) '
+            f'SELECT {columns_text} FROM "{staging_name}" ON CONFLICT DO NOTHING'
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(connection, table, column_names, rows, override=False, upsert=False):
+    """
+    Writes rows with one executemany.
+    If not override, rows with existing ids are skipped by ON CONFLICT DO NOTHING.
+    @param upsert Rows with existing ids are updated
+    """
+    data = [dict(zip(column_names, row)) for row in rows]
+
+    stmt = table.insert()
+    if upsert or not override:
+        if connection.dialect.name == "sqlite":
+            stmt = sqlite_insert(table)
+        elif connection.dialect.name == "postgresql":
+            stmt = postgresql_insert(table)
+        else:
+            raise NotImplementedError(f"Unsupported dialect: {connection.dialect.name}")
+
+        if upsert:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={
+                    column_name: stmt.excluded[column_name]
+                    for column_name in column_names
+                    if column_name != "id"
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing()
 
-        return existing
-    except Exception as E:
-        connection.rollback()
-        return False
+    connection.execute(stmt, data)
 
 
-def copy_table(instance, table_name, source_engine, destination_engine, override=False, to_sqlite=True, commit_every_row=False):
+def write_rows(connection, table, column_names, rows, override=False, upsert=False):
+    if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2" and not upsert:
+        copy_rows_postgres(connection, table, column_names, rows, override=override)
+    else:
+        insert_rows(connection, table, column_names, rows, override=override, upsert=upsert)
+
+
+def copy_table(instance, table_name, source_engine, destination_engine, override=False, to_sqlite=True, commit_every_row=False, batch_size=1000, where=None, upsert=False):
     """
-    Copies table from postgres to destination
+    Copies table from postgres to destination.
+    Rows are streamed in batches. Batch is written with COPY into PostgreSQL,
+    or with executemany into SQLite.
     @param override If true, will work faster, since it does not check if row with id exists
     @param to_sqlite If to SQLlite then destination table names will not include workspace. If from SQLite then
                   source tables will not include
+    @param commit_every_row Commits every batch. If batch fails, its rows are written one by one, and bad rows are skipped
+    @param where function returning condition for source table. Only matching rows are copied
+    @param upsert Rows which exist in destination are updated
+    @param batch_size Number of rows fetched at once. PostgreSQL rows are read by server side cursor,
+                      so only one batch is held in memory
+    @returns number of copied rows
     """
-    Session = sessionmaker(bind=source_engine)
-    session = Session()
-
     source_table = get_engine_table(instance, table_name, source_engine, with_workspace=to_sqlite)
     destination_table = get_engine_table(instance, table_name, destination_engine, with_workspace=not to_sqlite)
 
     print(f"Copying from {source_table} to {destination_table}")
 
-    with destination_engine.connect() as destination_connection:
-        with source_engine.connect() as connection:
-            result = connection.execute(source_table.select())
+    # only columns which exist in both tables are copied
+    column_names = [
+        column.name for column in source_table.columns if column.name in destination_table.c
+    ]
+    columns = [source_table.c[column_name] for column_name in column_names]
 
-            index = 0
-            for row in result:
-                index += 1
-                sys.stdout.write("{}\r".format(index))
+    stmt = select(*columns)
+    if where is not None:
+        condition = where(source_table)
+        if condition is not None:
+            stmt = stmt.where(condition)
 
-                data = get_table_row_values(row, source_table)
+    start_time = time.time()
+
+    index = 0
+    with destination_engine.connect() as destination_connection:
+        with source_engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=batch_size, yield_per=batch_size
+            ).execute(stmt)
 
-                # Check if the ID already exists
-                if not override:
-                    id_value = data.get("id")
-                    if id_value is not None:
-                        existing = is_row_with_id(destination_connection, destination_table, id_value)
+            for rows in result.partitions():
+                rows = [tuple(row) for row in rows]
 
-                        if existing:
-                            continue
-                
                 try:
-                   destination_connection.execute(destination_table.insert(), data)
+                    write_rows(destination_connection, destination_table, column_names, rows, override=override, upsert=upsert)
+                    if commit_every_row:
+                        destination_connection.commit()
                 except Exception as e:
-                    print(f"Skipping row {index} due to insert error {e}")
+                    if not commit_every_row:
+                        raise
+                    print(f"Batch at row {index} failed, writing rows one by one: {e}")
                     destination_connection.rollback()
-                    continue
+                    copy_rows_one_by_one(destination_connection, destination_table, column_names, rows, index, override, upsert)
 
-                if commit_every_row:
-                    try:
-                        destination_connection.commit()
-                    except Exception as e:
-                        print(f"Skipping row {index} due to insert error {e}")
-                        destination_connection.rollback()
-                        continue
+                index += len(rows)
+                sys.stdout.write("{}\r".format(index))
 
             if not commit_every_row:
                 destination_connection.commit()
 
-    session.close()
+    summary = f"Copied {index} rows of {table_name} in {time.time() - start_time:.2f}s"
+    peak_rss = get_peak_rss_mb()
+    if peak_rss is not None:
+        summary += f", peak RSS {peak_rss:.1f} MB"
+    print(summary)
+
+    return index
 
 
-def obfuscate_user_table(table_name, destination_engine):
+def copy_rows_one_by_one(connection, table, column_names, rows, index, override=False, upsert=False):
     """
-    Remove passwords from the database
+    Fallback for batch which could not be written
     """
-    destination_metadata = MetaData()
-    destination_table = Table(table_name, destination_metadata, autoload_with=destination_engine)
-
-    columns = destination_table.columns.keys()
-    is_superuser_index = columns.index('is_superuser')
-
-    with destination_engine.connect() as destination_connection:
-        result = destination_connection.execute(destination_table.select())
-
-        for row in result:
-            update_stmt = destination_table.update().where(destination_table.c.id == row[0]).values(password='')
-            destination_connection.execute(update_stmt)
-
-            if is_superuser_index and row[is_superuser_index]:
-                update_stmt = destination_table.update().where(destination_table.c.id == row[0]).values(username='admin')
+    for row in rows:
+        index += 1
+        try:
+            insert_rows(connection, table, column_names, [row], override=override, upsert=upsert)
+            connection.commit()
+        except Exception as e:
+            print(f"Skipping row {index} due to insert error {e}")
+            connection.rollback()
 
-        destination_connection.commit()
-
-
-def create_indexes(destination_engine, table_name, column_name):
-    destination_metadata = MetaData()
-    destination_table = Table(table_name, destination_metadata, autoload_with=destination_engine)
-
-    #r = ReflectedTable(destination_engine)
-    #r.create_index(destination_table, "link")
-    #r.create_index(destination_table, "title")
-    #r.create_index(destination_table, "date_published")
-
-
-def obfuscate_all(destination_engine):
-    obfuscate_user_table("user", destination_engine)
 
+def obfuscate_all(destination_engine, indexes=None, vacuum_into=None):
+    """
+    Obfuscation, truncation and indexes are applied in one transaction
+    @param vacuum_into If set, compacted copy is written into this file
+    """
     with destination_engine.connect() as connection:
-        r = ReflectedTable(engine=destination_engine, connection=connection)
-        r.truncate_table("dataexport")
-        r.truncate_table("usersearchhistory")
-        r.truncate_table("credentials")
+        processor = SnapshotProcessor(destination_engine, connection)
+        report = processor.process(
+            obfuscate=True,
+            truncate_tables=tables_to_obfuscate,
+            indexes=indexes,
+            vacuum_into=vacuum_into,
+        )
+        if report:
+            print(report)
 
 
 #### SQLite
@@ -441,33 +544,149 @@ def get_local_engine(run_info):
     password = run_info["password"]
 
     # Create the database engine
-    SOURCE_DATABASE_URL = f"postgresql://{user}:{password}@{host}/{database}"
+    # psycopg2 is the dependency of the package, newer SQLAlchemy defaults to psycopg
+    SOURCE_DATABASE_URL = f"postgresql+psycopg2://{user}:{password}@{host}/{database}"
     source_engine = create_engine(SOURCE_DATABASE_URL)
 
     return source_engine
 
 
-def get_sqlite_engine(run_info):
+def get_sqlite_file(run_info):
     workspace = run_info["workspace"]
 
-    file_name = workspace+".db"
-    DESTINATION_DATABASE_URL = "sqlite:///" + file_name
+    operating_dir = get_workspace_backup_directory(run_info["format"], workspace)
+    return operating_dir / (workspace + ".db")
+
+
+def get_sqlite_engine(run_info):
+    file_name = get_sqlite_file(run_info)
+    DESTINATION_DATABASE_URL = "sqlite:///" + str(file_name)
     destination_engine = create_engine(DESTINATION_DATABASE_URL)
 
     return destination_engine
 
 
+def get_backup_watermark_name(table_name):
+    return f"backup_{table_name}"
+
+
+def get_change_date_column_name(table):
+    """
+    Column updated when row changes. Rows changed after previous backup are copied again
+    """
+    for column_name in ["date_update_last", "date_updated"]:
+        if column_name in table.c:
+            return column_name
+
+
+def get_watermark_date(date, column):
+    """
+    Watermark dates are stored in UTC, without time zone
+    """
+    if date is None:
+        return None
+
+    if getattr(column.type, "timezone", False):
+        return date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def get_table_watermark_values(connection, table):
+    """
+    @returns (max id, max change date) of table
+    """
+    columns = [func.max(table.c.id)]
+
+    column_name = get_change_date_column_name(table)
+    if column_name:
+        columns.append(func.max(table.c[column_name]))
+
+    row = connection.execute(select(*columns)).first()
+
+    last_id = row[0]
+    date = None
+    if column_name and row[1] is not None:
+        date = row[1]
+        if isinstance(date, datetime) and date.tzinfo:
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return last_id, date
+
+
+def get_incremental_condition(table, watermark):
+    """
+    Rows added, or changed after previous backup.
+    Removed rows are not detected, full backup is necessary from time to time.
+    """
+    if watermark is None or watermark.last_id is None:
+        return None
+
+    conditions = [table.c.id > watermark.last_id]
+
+    column_name = get_change_date_column_name(table)
+    if column_name:
+        column = table.c[column_name]
+        if watermark.date is None:
+            # no row had change date during previous backup
+            conditions.append(column.is_not(None))
+        else:
+            conditions.append(column > get_watermark_date(watermark.date, column))
+
+    return or_(*conditions)
+
+
+def backup_table_sqlite(workspace, table_name, source_engine, destination_engine, incremental=False, batch_size=1000):
+    """
+    Copies table into SQLite backup. Stores max id and change date as watermark.
+    @param incremental Only rows added or changed after previous backup are copied
+    """
+    source_table = get_engine_table(workspace, table_name, source_engine)
+    with source_engine.connect() as connection:
+        # read before copy. Rows added during copy are copied again next time
+        last_id, date = get_table_watermark_values(connection, source_table)
+
+    watermark_name = get_backup_watermark_name(table_name)
+
+    with destination_engine.connect() as connection:
+        Watermark.__table__.create(connection, checkfirst=True)
+        connection.commit()
+
+        watermark = None
+        if incremental:
+            watermark = ReflectedWatermark(destination_engine, connection).get_watermark(watermark_name)
+
+    if incremental:
+        copy_table(
+            workspace,
+            table_name,
+            source_engine,
+            destination_engine,
+            to_sqlite=True,
+            where=lambda table: get_incremental_condition(table, watermark),
+            upsert=True,
+            batch_size=batch_size,
+        )
+    else:
+        clear_destination_table(table_name, destination_engine)
+        copy_table(workspace, table_name, source_engine, destination_engine, override=True, to_sqlite=True, batch_size=batch_size)
+
+    with destination_engine.connect() as connection:
+        watermarks = ReflectedWatermark(destination_engine, connection)
+        watermarks.set_watermark(watermark_name, last_id=last_id, date=date)
+
+
 def run_db_copy_backup(run_info):
     workspace = run_info["workspace"]
     tables = run_info["tables"]
     empty = run_info["empty"]
+    incremental = run_info.get("incremental", False)
+    batch_size = run_info.get("batch_size", 1000)
 
     # Create the database engine
     source_engine = get_local_engine(run_info)
 
     operating_dir = get_workspace_backup_directory(run_info["format"], workspace)
     operating_dir.mkdir(parents=True, exist_ok=True)
-    os.chdir(operating_dir)
 
     destination_engine = get_sqlite_engine(run_info)
 
@@ -478,7 +697,11 @@ def run_db_copy_backup(run_info):
         create_destionation_table(table, source_table, destination_engine)
 
         if not empty:
-            copy_table(workspace, table, source_engine, destination_engine, override=True, to_sqlite=True)
+            backup_table_sqlite(workspace, table, source_engine, destination_engine, incremental=incremental, batch_size=batch_size)
+
+        manifest = run_info.get("manifest")
+        if manifest and table in get_verified_tables():
+            manifest.set_table(table, get_digest(destination_engine, workspace, table, with_workspace=False, batch_size=batch_size))
 
     return True
 
@@ -491,14 +714,11 @@ def run_db_copy_restore(run_info):
 
     destination_engine = get_local_engine(run_info)
 
-    operating_dir = get_workspace_backup_directory(run_info["format"], workspace)
-    os.chdir(operating_dir)
-
     source_engine = get_sqlite_engine(run_info)
 
     for table in tables:
         table = table.replace(workspace + "_", "")
-        copy_table(workspace, table, source_engine, destination_engine, override=False, to_sqlite=False, commit_every_row=True)
+        copy_table(workspace, table, source_engine, destination_engine, override=False, to_sqlite=False, commit_every_row=True, batch_size=run_info.get("batch_size", 1000))
 
     return True
 
@@ -511,136 +731,569 @@ def run_db_copy_backup_auth(run_info):
 
     operating_dir = get_workspace_backup_directory(run_info["format"], workspace)
     operating_dir.mkdir(parents=True, exist_ok=True)
-    os.chdir(operating_dir)
 
     destination_engine = get_sqlite_engine(run_info)
 
     source_table = get_engine_table("auth", "user", source_engine)
     create_destionation_table("user", source_table, destination_engine)
 
-    copy_table("auth", "user", source_engine, destination_engine, override=True, to_sqlite=True)
+    # users table is small, it is always copied whole
+    if run_info.get("incremental", False):
+        copy_table("auth", "user", source_engine, destination_engine, to_sqlite=True, upsert=True)
+    else:
+        clear_destination_table("user", destination_engine)
+        copy_table("auth", "user", source_engine, destination_engine, override=True, to_sqlite=True)
 
     return True
 
 
-def backup_workspace(run_info):
+def get_table_run_info(run_info, table, output_file):
+    new_run_info = dict(run_info)
+    new_run_info["tables"] = [run_info["workspace"] + "_" + table]
+    new_run_info["output_file"] = output_file
+    return new_run_info
+
+
+def get_table_depends_on(workspace, stage, table, tables):
+    """
+    Names of tasks, which have to finish before table. From declared dependencies
     """
-    @note table order is important
+    dependencies = get_table_dependencies().get(table, [])
+    return [
+        get_task_name(workspace, stage, dependency)
+        for dependency in dependencies
+        if dependency in tables
+    ]
 
-    mapping:
-      file : tables
+
+def get_task_name(workspace, stage, table=None):
+    if table:
+        return f"{workspace}:{stage}:{table}"
+    return f"{workspace}:{stage}"
+
+
+def add_join_task(scheduler, name, depends_on):
     """
-    print("--------------------")
-    print(run_info["workspace"])
-    print("--------------------")
+    Task, which finishes when all tasks it depends on finish
+    """
+    return scheduler.add_task(name, lambda: True, depends_on=depends_on)
 
-    workspace = run_info["workspace"]
 
-    for table in tables_to_create:
-        new_run_info = dict(run_info)
-        new_key = "instance_" + table
+def get_manifest_file(run_info):
+    operating_dir = get_workspace_backup_directory(run_info["format"], run_info["workspace"])
+    return operating_dir / "manifest.json"
+
+
+def get_verified_tables():
+    """
+    Tables with digest in manifest. Obfuscated tables differ from source
+    """
+    return [table for table in tables_to_backup if table not in tables_to_obfuscate]
+
 
-        new_run_info["tables"] = []
-        new_run_info["output_file"] = new_key
+def get_digest(engine, workspace, table_name, with_workspace=True, column_names=None, batch_size=1000):
+    table = get_engine_table(workspace, table_name, engine, with_workspace=with_workspace)
+    with engine.connect() as connection:
+        return get_table_digest(connection, table, column_names=column_names, batch_size=batch_size)
 
-        table_name = workspace + "_" + table
-        new_run_info["tables"].append(table_name)
 
-        if new_run_info["format"] == "sqlite":
-            if table not in tables_to_backup:
-                new_run_info["empty"] = True
-            if not run_db_copy_backup(new_run_info):
-                return False
+def store_source_digest(run_info, manifest, table_name):
+    """
+    Dumps cannot be read without restore, therefore source is hashed after dump
+    """
+    source_engine = get_local_engine(run_info)
+    digest = get_digest(source_engine, run_info["workspace"], table_name, batch_size=run_info.get("batch_size", 1000))
+    manifest.set_table(table_name, digest)
+    return True
+
+
+def add_backup_tasks(scheduler, run_info, depends_on=None):
+    """
+    Backup produces manifest, with row count, max id and hash of every table.
+    @returns name of task, which finishes when backup of workspace is complete
+    """
+    workspace = run_info["workspace"]
+    depends_on = list(depends_on or [])
+    file_format = run_info["format"]
+
+    manifest = BackupManifest(get_manifest_file(run_info))
+    manifest.set_info(workspace=workspace, format=file_format, date=datetime.now().isoformat())
+    run_info = dict(run_info)
+    run_info["manifest"] = manifest
+
+    task_names = []
+
+    if file_format == "directory":
+        # pg_dump -j dumps tables in parallel
+        new_run_info = dict(run_info)
+        new_run_info["tables"] = [workspace + "_" + table for table in tables_to_backup]
+        new_run_info["output_file"] = "instance"
+        task_names.append(
+            scheduler.add_task(
+                get_task_name(workspace, "backup", "tables"),
+                run_pg_dump_backup,
+                new_run_info,
+                depends_on=depends_on,
+            )
+        )
+    else:
+        if file_format == "sqlite":
+            tables = list(tables_to_create)
         else:
-            if table in tables_to_backup:
-                if not run_pg_dump_backup(new_run_info):
-                    return False
+            tables = [table for table in tables_to_create if table in tables_to_backup]
 
-    if run_info["format"] == "custom":
+        for table in tables:
+            new_run_info = get_table_run_info(run_info, table, "instance_" + table)
+            table_depends_on = depends_on + get_table_depends_on(workspace, "backup", table, tables)
+            name = get_task_name(workspace, "backup", table)
+
+            if file_format == "sqlite":
+                if table not in tables_to_backup:
+                    new_run_info["empty"] = True
+                # one writer for SQLite file
+                scheduler.add_task(
+                    name,
+                    run_db_copy_backup,
+                    new_run_info,
+                    depends_on=table_depends_on,
+                    resource=str(get_sqlite_file(run_info)),
+                )
+            else:
+                scheduler.add_task(name, run_pg_dump_backup, new_run_info, depends_on=table_depends_on)
+
+            task_names.append(name)
+
+    if file_format in ("custom", "directory"):
         new_run_info = dict(run_info)
         new_run_info["tables"] = ['auth_user']
         new_run_info["workspace"] = 'auth'
         new_run_info["output_file"] = "auth_user"
-        if not run_pg_dump_backup(new_run_info):
-            return False
+        task_names.append(
+            scheduler.add_task(
+                get_task_name(workspace, "backup", "auth_user"),
+                run_pg_dump_backup,
+                new_run_info,
+                depends_on=depends_on,
+            )
+        )
+
+    if file_format == "sqlite":
+        task_names = [
+            scheduler.add_task(
+                get_task_name(workspace, "backup", "finish"),
+                finish_sqlite_backup,
+                dict(run_info),
+                depends_on=task_names,
+                resource=str(get_sqlite_file(run_info)),
+            )
+        ]
+    else:
+        for table in get_verified_tables():
+            if file_format == "directory":
+                dump_task_name = get_task_name(workspace, "backup", "tables")
+            else:
+                dump_task_name = get_task_name(workspace, "backup", table)
 
-    if run_info["format"] == "sqlite":
-        run_db_copy_backup_auth(run_info)
+            task_names.append(
+                scheduler.add_task(
+                    get_task_name(workspace, "digest", table),
+                    store_source_digest,
+                    dict(run_info),
+                    manifest,
+                    table,
+                    depends_on=[dump_task_name],
+                )
+            )
+
+    manifest_task_name = scheduler.add_task(
+        get_task_name(workspace, "backup", "manifest"),
+        manifest.write,
+        depends_on=task_names,
+    )
+
+    return add_join_task(scheduler, get_task_name(workspace, "backup"), [manifest_task_name] + depends_on)
+
+
+def finish_sqlite_backup(run_info):
+    run_db_copy_backup_auth(run_info)
 
-        destination_engine = get_sqlite_engine(run_info)
+    destination_engine = get_sqlite_engine(run_info)
 
-        create_indexes(destination_engine, "linkdatamodel", "link")
-        create_indexes(destination_engine, "linkdatamodel", "title")
-        create_indexes(destination_engine, "linkdatamodel", "date_published")
+    vacuum_into = None
+    if run_info.get("snapshot"):
+        sqlite_file = get_sqlite_file(run_info)
+        vacuum_into = sqlite_file.with_name(sqlite_file.stem + "_public.db")
 
-        obfuscate_all(destination_engine)
+    obfuscate_all(destination_engine, indexes=sqlite_indexes, vacuum_into=vacuum_into)
 
     return True
 
 
-def restore_workspace(run_info):
+def verify_table_digest(run_info, manifest, results, side, table_name):
     """
-    @note table order is important
+    Hashes table of source, or of SQLite backup. Columns are the same as in manifest
     """
-    workspace = run_info["workspace"]
+    expected = manifest.get_table(table_name)
+    if expected is None:
+        return True
 
-    print("--------------------")
-    print(run_info["workspace"])
-    print("--------------------")
+    batch_size = run_info.get("batch_size", 1000)
 
-    if not run_info["append"]:
-        for table in tables_to_backup:
-            key = "./instance_" + table
-            tables = [workspace + "_" + table]
+    if side == "source":
+        engine = get_local_engine(run_info)
+        with_workspace = True
+    else:
+        engine = get_sqlite_engine(run_info)
+        with_workspace = False
+
+    results[(side, table_name)] = get_digest(
+        engine,
+        run_info["workspace"],
+        table_name,
+        with_workspace=with_workspace,
+        column_names=expected["columns"],
+        batch_size=batch_size,
+    )
+    return True
 
-            run_info["output_file"] = key
-            run_info["tables"] = tables
 
-            if not truncate_all(run_info):
-                print("Could not truncate table")
-                return
+def get_dump_file(run_info, table_name):
+    operating_dir = get_workspace_backup_directory(run_info["format"], run_info["workspace"])
+    if run_info["format"] == "directory":
+        return operating_dir / "instance"
+    return operating_dir / ("instance_" + table_name)
 
-    for table in tables_to_backup:
-        key = "./instance_" + table
-        tables = [workspace + "_" + table]
 
-        new_run_info = dict(run_info)
+def get_dump_listing(dump_file):
+    """
+    @returns table of contents of custom, or directory archive. None if archive cannot be read
+    """
+    try:
+        result = subprocess.run(
+            ["pg_restore", "--list", str(dump_file)],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+    except (subprocess.CalledProcessError, OSError) as E:
+        print(f"Cannot read archive {dump_file}: {getattr(E, 'stderr', None) or E}")
+        return None
 
-        new_key = key.replace("instance", workspace)
-        new_run_info["output_file"] = new_key
-        new_run_info["tables"] = []
+    return result.stdout
 
-        for item in tables:
-            table_name = item.replace("instance", workspace)
-            new_run_info["tables"].append(table_name)
 
-        if new_run_info["format"] == "sqlite":
-            if not run_db_copy_restore(new_run_info):
-                return False
+def get_plain_dump_error(dump_file, this_table_name):
+    """
+    @returns error text, or None if SQL dump is complete, and has data of table
+    """
+    has_table = False
+    is_complete = False
+
+    with open(dump_file, "r", errors="replace") as fh:
+        for line in fh:
+            if line.startswith(f"-- Data for Name: {this_table_name}; Type: TABLE DATA"):
+                has_table = True
+            elif line.startswith("-- PostgreSQL database dump complete"):
+                is_complete = True
+
+    if not is_complete:
+        return "dump is not complete"
+    if not has_table:
+        return "table data is missing"
+
+
+def verify_dumps(run_info, manifest, results):
+    """
+    Dumps cannot be hashed without restore. Archive is read, and checked that it has data of every table
+    """
+    workspace = run_info["workspace"]
+    listings = {}
+
+    for table_name in manifest.get_tables():
+        this_table_name = workspace + "_" + table_name
+        dump_file = get_dump_file(run_info, table_name)
+
+        if not dump_file.exists():
+            results[("dump", table_name)] = f"file {dump_file} does not exist"
+            continue
+
+        if run_info["format"] in ("plain", "sql"):
+            results[("dump", table_name)] = get_plain_dump_error(dump_file, this_table_name) or True
+            continue
+
+        if dump_file not in listings:
+            listings[dump_file] = get_dump_listing(dump_file)
+        listing = listings[dump_file]
+
+        if listing is None:
+            results[("dump", table_name)] = "archive cannot be read"
+        elif f"TABLE DATA public {this_table_name} " not in listing:
+            results[("dump", table_name)] = "table data is missing"
         else:
-            if not run_pg_restore(new_run_info):
-                return False
+            results[("dump", table_name)] = True
 
-    reset_tables_index_sequence(tablemapping, run_info)
+    return True
+
+
+def report_verification(run_info, manifest, results, sides):
+    """
+    @returns False if any table does not match manifest
+    """
+    workspace = run_info["workspace"]
+    valid = True
+
+    for table_name, expected in sorted(manifest.get_tables().items()):
+        for side in sides:
+            actual = results.get((side, table_name))
+            if actual is None:
+                print(f"{workspace}:{table_name}: {side} was not verified")
+                valid = False
+                continue
+
+            if side == "dump":
+                if actual is not True:
+                    print(f"{workspace}:{table_name}: dump INVALID, {actual}")
+                    valid = False
+                continue
+
+            differences = get_digest_differences(expected, actual)
+            if differences:
+                print(
+                    f"{workspace}:{table_name}: {side} MISMATCH {', '.join(differences)}. "
+                    f"Rows expected {expected['rows']}, found {actual['rows']}"
+                )
+                valid = False
+
+    if not valid:
+        return False
+
+    count = len(manifest.get_tables())
+    if "dump" in sides:
+        print(
+            f"{workspace}: source of all {count} tables matches manifest, dumps contain all tables. "
+            f"Contents of dumps were NOT verified, it requires restore"
+        )
+    else:
+        print(f"{workspace}: all {count} tables match manifest")
 
     return True
 
 
-def run_sql_for_workspaces(run_info, sql_command):
+def add_verify_tasks(scheduler, run_info, depends_on=None):
+    """
+    Source, and SQLite backup tables are hashed in parallel, and compared with manifest.
+    Dumps of other formats cannot be hashed without restore. Source is compared with manifest,
+    and dumps are checked to be readable, and to contain all tables.
+    @returns name of task, which reports result of verification
+    """
+    workspace = run_info["workspace"]
+    depends_on = list(depends_on or [])
+
+    manifest = BackupManifest(get_manifest_file(run_info))
+    results = {}
+
+    sides = ["source"]
+    if run_info["format"] == "sqlite":
+        sides.append("backup")
+    else:
+        sides.append("dump")
+
+    def read_manifest():
+        if not manifest.read():
+            print(f"Manifest does not exist: {manifest.file_name}")
+            return False
+        return True
+
+    read_task_name = scheduler.add_task(
+        get_task_name(workspace, "verify", "manifest"),
+        read_manifest,
+        depends_on=depends_on,
+    )
+
+    task_names = []
+    if "dump" in sides:
+        task_names.append(
+            scheduler.add_task(
+                get_task_name(workspace, "verify", "dump"),
+                verify_dumps,
+                dict(run_info),
+                manifest,
+                results,
+                depends_on=[read_task_name],
+            )
+        )
+
+    for table in get_verified_tables():
+        for side in sides:
+            if side == "dump":
+                continue
+            task_names.append(
+                scheduler.add_task(
+                    get_task_name(workspace, "verify", f"{side}:{table}"),
+                    verify_table_digest,
+                    dict(run_info),
+                    manifest,
+                    results,
+                    side,
+                    table,
+                    depends_on=[read_task_name],
+                )
+            )
+
+    return scheduler.add_task(
+        get_task_name(workspace, "verify"),
+        report_verification,
+        dict(run_info),
+        manifest,
+        results,
+        sides,
+        depends_on=task_names,
+    )
+
+
+def backup_workspace(run_info):
+    """
+    @note table order is important. It is defined by tableconfig.get_table_dependencies
+
+    mapping:
+      file : tables
+    """
+    print("--------------------")
+    print(run_info["workspace"])
+    print("--------------------")
+
+    scheduler = TaskScheduler(jobs=run_info.get("jobs", 1))
+    add_backup_tasks(scheduler, run_info)
+    return scheduler.run()
+
+
+def add_restore_tasks(scheduler, run_info, depends_on=None):
+    """
+    @returns name of task, which finishes when restore of workspace is complete
+    """
+    workspace = run_info["workspace"]
+    depends_on = list(depends_on or [])
+    file_format = run_info["format"]
+
+    if not run_info["append"]:
+        # truncate uses CASCADE, therefore all tables are truncated before any is restored
+        new_run_info = dict(run_info)
+        new_run_info["tables"] = [workspace + "_" + table for table in tables_to_backup]
+        depends_on = [
+            scheduler.add_task(
+                get_task_name(workspace, "truncate"),
+                truncate_all,
+                new_run_info,
+                depends_on=depends_on,
+            )
+        ]
+
+    task_names = []
+
+    if file_format == "directory":
+        new_run_info = dict(run_info)
+        new_run_info["tables"] = [workspace + "_" + table for table in tables_to_backup]
+        new_run_info["output_file"] = "./instance"
+        task_names.append(
+            scheduler.add_task(
+                get_task_name(workspace, "restore", "tables"),
+                run_pg_restore,
+                new_run_info,
+                depends_on=depends_on,
+            )
+        )
+    else:
+        for table in tables_to_backup:
+            new_run_info = get_table_run_info(run_info, table, "./" + workspace + "_" + table)
+            table_depends_on = depends_on + get_table_depends_on(workspace, "restore", table, tables_to_backup)
+
+            if file_format == "sqlite":
+                function = run_db_copy_restore
+            else:
+                function = run_pg_restore
+
+            task_names.append(
+                scheduler.add_task(
+                    get_task_name(workspace, "restore", table),
+                    function,
+                    new_run_info,
+                    depends_on=table_depends_on,
+                )
+            )
+
+    return scheduler.add_task(
+        get_task_name(workspace, "restore"),
+        reset_tables_index_sequence,
+        dict(run_info),
+        list(tables_to_backup),
+        depends_on=task_names + depends_on,
+    )
+
+
+def restore_workspace(run_info):
+    """
+    @note table order is important. It is defined by tableconfig.get_table_dependencies
+    """
     print("--------------------")
     print(run_info["workspace"])
     print("--------------------")
 
+    scheduler = TaskScheduler(jobs=run_info.get("jobs", 1))
+    add_restore_tasks(scheduler, run_info)
+    return scheduler.run()
+
+
+def run_maintenance_table(maintenance, command, table):
+    """
+    Errors are reported by finish_maintenance, after all tables were processed
+    """
+    maintenance.run_table(command, table)
+
+
+def finish_maintenance(maintenance):
+    maintenance.print_summary()
+    maintenance.engine.dispose()
+    return maintenance.is_successful()
+
+
+def add_sql_tasks(scheduler, run_info, stage, sql_command, depends_on=None):
+    """
+    Tables are independent, they are processed at the same time if jobs are set.
+    @param sql_command Name of maintenance command, for example "vacuum", or SQL with {table}
+    @returns name of task, which finishes when command was run for all tables
+    """
     workspace = run_info["workspace"]
+    depends_on = list(depends_on or [])
+
+    maintenance = get_workspace_maintenance(run_info)
 
+    task_names = []
     for table in all_tables:
-        call_table = workspace + "_" + table
-        call_sql_command = sql_command.replace("{table}", call_table)
+        task_names.append(
+            scheduler.add_task(
+                get_task_name(workspace, stage, table),
+                run_maintenance_table,
+                maintenance,
+                sql_command,
+                workspace + "_" + table,
+                depends_on=depends_on,
+            )
+        )
+
+    return scheduler.add_task(
+        get_task_name(workspace, stage),
+        finish_maintenance,
+        maintenance,
+        depends_on=task_names + depends_on,
+    )
 
-        if not run_table_sql(run_info, call_table, call_sql_command):
-            return False
 
-    return True
+def run_sql_for_workspaces(run_info, sql_command):
+    print("--------------------")
+    print(run_info["workspace"])
+    print("--------------------")
+
+    scheduler = TaskScheduler(jobs=run_info.get("jobs", 1))
+    add_sql_tasks(scheduler, run_info, "sql", sql_command)
+    return scheduler.run()
 
 
 def parse_backup_commandline():
@@ -649,6 +1302,7 @@ def parse_backup_commandline():
     parser.add_argument("-b", "--backup", action="store_true", help="Perform a backup")
     parser.add_argument("-r", "--restore", action="store_true", help="Restore from a backup")
     parser.add_argument("-o", "--output-dir", help="Output directory")
+    parser.add_argument("--verify", action="store_true", help="Compares source, and backup with manifest. Tables are hashed in parallel")
     parser.add_argument("-a", "--analyze", action="store_true", help="Analyze the database")
     parser.add_argument("--vacuum", action="store_true", help="Vacuum the database")
     parser.add_argument("--reindex", action="store_true", help="Reindex the database. Useful to detect errors in consistency")
@@ -660,8 +1314,12 @@ def parse_backup_commandline():
     parser.add_argument("-i", "--ignore-errors", action="store_true", help="Ignore errors during the operation")
     parser.add_argument("--empty", action="store_true", help="Creates empty table version during backup")
     parser.add_argument("--append", action="store_true", help="Appends data during restore, does not clear tables")
-    parser.add_argument("-f", "--format", default="custom", choices=["custom", "plain", "sql", "sqlite"],
-                        help="Format of the backup (default: 'custom'). Choices: 'custom', 'plain', or 'sql'.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="For sqlite format. Number of rows read, and written at once. Rows are streamed, only one batch is in memory")
+    parser.add_argument("--snapshot", action="store_true", help="For sqlite format. Writes compacted copy of backup into <workspace>_public.db, with VACUUM INTO")
+    parser.add_argument("--incremental", action="store_true", help="For sqlite format. Copies only rows added, or changed since previous backup into existing backup file")
+    parser.add_argument("-f", "--format", default="custom", choices=["custom", "plain", "sql", "sqlite", "directory"],
+                        help="Format of the backup (default: 'custom'). Choices: 'custom', 'plain', 'sql', 'sqlite', or 'directory'.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of tables, workspaces processed at the same time. Also for analyze, vacuum, reindex. For directory format passed to pg_dump, pg_restore")
 
     parser.add_argument("--host", default="127.0.0.1", help="Host address for the database (default: 127.0.0.1)")
 
@@ -689,7 +1347,12 @@ class Backup(object):
 
         start_time = time.time()
 
-        errors = False
+        jobs = self.args.jobs
+        if self.args.format == "directory":
+            # pg_dump, pg_restore run jobs on their own
+            jobs = 1
+
+        scheduler = TaskScheduler(jobs=jobs, stop_on_error=not self.args.ignore_errors)
 
         for workspace in workspaces:
             run_info = {}
@@ -701,56 +1364,59 @@ class Backup(object):
             run_info["password"] = self.args.password
             run_info["empty"] = self.args.empty
             run_info["append"] = self.args.append
+            run_info["incremental"] = self.args.incremental
+            run_info["batch_size"] = self.args.batch_size
+            run_info["snapshot"] = self.args.snapshot
+            run_info["jobs"] = self.args.jobs
 
             if self.args.ignore_errors:
                 run_info["ignore_errors"] = True
 
-            if self.args.backup and not backup_workspace(run_info):
-                print("Leaving because of errors")
-                errors = True
-                break
-
-            if self.args.restore and not restore_workspace(run_info):
-                print("Leaving because of errors")
-                errors = True
-                break
-
-            if self.args.analyze and not run_sql_for_workspaces(run_info, "ANALYZE {table};"):
-                print("Leaving because of errors")
-                errors = True
-                break
-
-            if self.args.vacuum and not run_sql_for_workspaces(run_info, "VACUUM {table};"):
-                print("Leaving because of errors")
-                errors = True
-                break
-
-            if self.args.reindex and not run_sql_for_workspaces(run_info, "REINDEX TABLE {table};"):
-                print("Leaving because of errors")
-                errors = True
-                break
-
-            sql_text = "SELECT setval('{table}_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 1));"
-            if self.args.sequence_update and not run_sql_for_workspaces(run_info, sql_text):
-                print("Leaving because of errors")
-                errors = True
-                break
-
-        if errors:
-            print("There were errors")
-        else:
+            self.add_workspace_tasks(scheduler, run_info)
+
+        if scheduler.run():
             print("All calls were successful")
+        else:
+            print("There were errors")
 
         elapsed_time_seconds = time.time() - start_time
         elapsed_minutes = int(elapsed_time_seconds // 60)
         elapsed_seconds = int(elapsed_time_seconds % 60)
         print(f"Time: {elapsed_minutes}:{elapsed_seconds}")
 
+    def add_workspace_tasks(self, scheduler, run_info):
+        """
+        Operations for one workspace are run one after another.
+        Workspaces are independent, and can be processed at the same time.
+        """
+        depends_on = []
+
+        if self.args.backup:
+            depends_on = [add_backup_tasks(scheduler, run_info, depends_on)]
+
+        if self.args.restore:
+            depends_on = [add_restore_tasks(scheduler, run_info, depends_on)]
+
+        if self.args.verify:
+            depends_on = [add_verify_tasks(scheduler, run_info, depends_on)]
+
+        if self.args.analyze:
+            depends_on = [add_sql_tasks(scheduler, run_info, "analyze", "analyze", depends_on)]
+
+        if self.args.vacuum:
+            depends_on = [add_sql_tasks(scheduler, run_info, "vacuum", "vacuum", depends_on)]
+
+        if self.args.reindex:
+            depends_on = [add_sql_tasks(scheduler, run_info, "reindex", "reindex", depends_on)]
+
+        if self.args.sequence_update:
+            depends_on = [add_sql_tasks(scheduler, run_info, "sequence", "sequence", depends_on)]
+
 
 def main():
     parser, args = parse_backup_commandline()
 
-    if not args.backup and not args.restore and not args.analyze and not args.vacuum and not args.reindex and not args.sequence_update:
+    if not args.backup and not args.restore and not args.verify and not args.analyze and not args.vacuum and not args.reindex and not args.sequence_update:
         parser.print_help()
 
     else:
@@ -5,11 +5,16 @@ Converts Database to information about RSS feeds.
 import shutil
 import argparse
 from pathlib import Path
-from sqlalchemy import create_engine
+from dateutil import parser as date_parser
+from sqlalchemy import create_engine, select, func
 
-from webtoolkit import RemoteUrl, BaseUrl
+from webtoolkit import RemoteUrl, BaseUrl, PageRequestObject
 from linkarchivetools import tableconfig
+from linkarchivetools.model.definitions import Watermark
 from .utils.reflected import *
+from .utils.concurrentfetcher import ConcurrentFetcher, HostRateLimiter
+from .utils.feedcache import FeedCache
+from .utils.sqlitecompaction import SqliteCompaction
 
 
 class Db2Feeds(object):
@@ -27,12 +32,30 @@ class Db2Feeds(object):
         output_format=None,
         read_internet_links=False,
         update_feed=False,
+        workers=1,
+        host_interval_s=0,
+        timeout_s=None,
+        cache_db=None,
+        cache_ttl_days=30,
+        refresh_older_than=None,
+        incremental=False,
+        batch_size=500,
+        compact="full",
     ):
         """
         Constructor
         @param read_internet_links Read links to find RSS feeds
         @param update_feed Many things are copied from original entry.
                           If this setting is true, feed entry fetches title, and other properties
+        @param workers How many remote calls can be in flight at the same time
+        @param host_interval_s Minimal time between calls for one host
+        @param timeout_s Timeout of one remote call
+        @param cache_db File with cache of discovered feeds. If not set, cache is not used
+        @param cache_ttl_days Cached feeds older than this number of days are fetched again
+        @param refresh_older_than Cached feeds fetched before this date are fetched again
+        @param incremental Process only entries added after the previous run. Requires output DB
+        @param batch_size Number of feed entries written at once
+        @param compact How output DB is compacted after tables were truncated. See SqliteCompaction
         """
         self.input_db = input_db
         self.output_db = output_db
@@ -42,6 +65,20 @@ class Db2Feeds(object):
         self.output_format = output_format
         self.read_internet_links = read_internet_links
         self.update_feed = update_feed
+        self.workers = workers
+        self.timeout_s = timeout_s
+        self.cache_db = cache_db
+        self.cache_ttl_days = cache_ttl_days
+        self.refresh_older_than = refresh_older_than
+        self.incremental = incremental
+        self.batch_size = batch_size
+        self.compact = compact
+        self.truncated = False
+
+        self.cache = None
+        self.existing_links = None
+        self.pending_entries = []
+        self.rate_limiter = HostRateLimiter(host_interval_s)
 
         self.new_table = None
 
@@ -72,6 +109,38 @@ class Db2Feeds(object):
         """
         API
         """
+        if self.cache_db:
+            cache_engine = create_engine(f"sqlite:///{self.cache_db}")
+            with cache_engine.connect() as cache_connection:
+                self.cache = FeedCache(
+                    cache_engine,
+                    cache_connection,
+                    ttl_days=self.cache_ttl_days,
+                    refresh_older_than=self.refresh_older_than,
+                    fetch_mode=self.get_fetch_mode(),
+                )
+                self.convert_input()
+            self.cache = None
+        else:
+            self.convert_input()
+
+        self.compact_output()
+
+    def compact_output(self):
+        """
+        Tables are truncated without VACUUM. Space is reclaimed once, at the end
+        """
+        if not self.new_engine or not self.truncated or self.compact == "none":
+            return
+
+        with self.new_engine.connect() as new_connection:
+            compaction = SqliteCompaction(self.new_engine, new_connection)
+            report = compaction.compact(mode=self.compact)
+            print(report)
+
+        self.truncated = False
+
+    def convert_input(self):
         self.engine = create_engine(f"sqlite:///{self.input_db}")
         with self.engine.connect() as connection:
             self.connection = connection
@@ -87,35 +156,176 @@ class Db2Feeds(object):
             self.truncate_tables()
 
         self.new_table = None
+        self.existing_links = None
         if self.new_engine:
             self.new_table = ReflectedEntryTable(self.new_engine, self.new_connection)
+            self.existing_links = set(self.new_table.get_links())
 
         table = ReflectedEntryTable(self.engine, self.connection)
-        for entry in table.get_entries_good():
-            self.convert_entry(entry)
+
+        watermarks = None
+        if self.incremental and self.new_engine:
+            Watermark.__table__.create(self.new_connection, checkfirst=True)
+            self.new_connection.commit()
+
+            watermarks = ReflectedWatermark(self.new_engine, self.new_connection)
+
+            date_started = datetime.now()
+            last_id = self.connection.execute(select(func.max(table.get_table().c.id))).scalar()
+
+            entries = self.get_new_entries(table, watermarks)
+        else:
+            entries = table.get_entries_good()
+
+        if self.cache:
+            entries = self.get_uncached_entries(entries)
+
+        if self.workers > 1 and self.is_remote_enabled():
+            self.convert_entries_concurrently(entries)
+        else:
+            for entry in entries:
+                self.convert_entry(entry)
+
+        self.flush_entries()
+
+        if watermarks:
+            watermarks.set_watermark(self.get_watermark_name(), last_id=last_id, date=date_started)
+
+    def get_watermark_name(self):
+        return "db2feeds_{}".format(Path(self.input_db).name)
+
+    def get_new_entries(self, table, watermarks):
+        """
+        Entries added after previous run. All entries, if output was cleaned
+        """
+        watermark = None
+        if not self.clean:
+            watermark = watermarks.get_watermark(self.get_watermark_name())
+
+        if watermark is None:
+            return table.get_entries_good_after()
+
+        return table.get_entries_good_after(last_id=watermark.last_id, date=watermark.date)
+
+    def convert_entries_concurrently(self, entries):
+        """
+        Remote calls are made by worker threads. Results are written by this thread only.
+        """
+        fetcher = ConcurrentFetcher(self.fetch_entry, max_in_flight=self.workers)
+        for entry, result, exception in fetcher.fetch(entries):
+            if exception:
+                print(f"Cannot read {entry.link}: {exception}")
+                continue
+
+            feeds, status_code = result
+            self.cache_entry(entry, feeds, status_code)
+            self.write_entry(entry, feeds)
+
+    def get_uncached_entries(self, entries):
+        """
+        Writes entries which feeds are in cache. Yields the rest
+        """
+        for entry in entries:
+            feeds = self.cache.get(entry.link)
+            if feeds is None:
+                yield entry
+            else:
+                self.write_entry(entry, feeds)
+
+    def get_fetch_mode(self):
+        """
+        Feeds found with remote server, or with feed properties differ from local ones
+        """
+        modes = []
+        if self.remote_server and self.read_internet_links:
+            modes.append("remote-read")
+        if self.remote_server and self.update_feed:
+            modes.append("update-feed")
+        if not modes:
+            modes.append("local")
+        return ",".join(modes)
+
+    def cache_entry(self, entry, feeds, status_code):
+        if not self.cache:
+            return
+
+        # remote read failed, it should be tried again next time
+        if len(feeds) == 0 and status_code is None and self.read_internet_links and self.remote_server:
+            return
+        if status_code is not None and not (200 <= status_code < 300):
+            return
+
+        self.cache.set(entry.link, feeds, status_code)
+
+    def is_remote_enabled(self):
+        if not self.remote_server:
+            return False
+        return self.read_internet_links or self.update_feed
 
     def convert_entry(self, entry):
+        feeds, status_code = self.fetch_entry(entry)
+        self.cache_entry(entry, feeds, status_code)
+        self.write_entry(entry, feeds)
+
+    def fetch_entry(self, entry):
+        """
+        Finds feeds of entry. Can be called from worker thread, does not access DB.
+        @returns list of (feed, feed properties) tuples, and status code of remote read
+        """
         url = BaseUrl(entry.link)
-        feeds = url.get_feeds()
+        feeds = list(url.get_feeds())
+        status_code = None
 
         if len(feeds) == 0:
             if self.read_internet_links:
                 if self.remote_server:
-                    url_ex = RemoteUrl(remote_server_location=self.remote_server, url=entry.link)
+                    url_ex = self.get_remote_url(entry.link)
                     url_ex.get_response()
                     feeds.extend(url_ex.get_feeds())
+                    status_code = url_ex.get_status_code()
 
+        result = []
         for feed in feeds:
-            data = self.prepare_data(entry, feed)
+            result.append((feed, self.fetch_feed_properties(feed)))
+        return result, status_code
+
+    def fetch_feed_properties(self, feed):
+        if not self.update_feed or not self.remote_server:
+            return
+
+        url_feed = self.get_remote_url(feed)
+        url_feed.get_response()
+
+        properties = {}
+        properties["title"] = url_feed.get_title()
+        properties["description"] = url_feed.get_description()
+        properties["status_code"] = url_feed.get_status_code()
+        properties["thumbnail"] = url_feed.get_thumbnail()
+        properties["date_published"] = url_feed.get_date_published()
+        return properties
+
+    def get_remote_url(self, link):
+        self.rate_limiter.wait(link)
+
+        request = PageRequestObject(link, timeout_s=self.timeout_s)
+        return RemoteUrl(request=request, remote_server_location=self.remote_server)
+
+    def write_entry(self, entry, feeds):
+        for feed, feed_properties in feeds:
+            data = self.prepare_data(entry, feed, feed_properties)
 
             if self.new_table:
-                if not self.new_table.exists(link=feed):
+                if feed not in self.existing_links:
                     self.print_data(entry, data)
                     self.copy_entry(entry, self.new_table, data)
+                    self.existing_links.add(feed)
             else:
                 self.print_data(entry, data)
 
-    def prepare_data(self, entry, feed):
+    def prepare_data(self, entry, feed, feed_properties=None):
+        """
+        @param feed_properties properties read from remote server, which override entry properties
+        """
         data = {}
         data["link"] = feed
         data["title"] = entry.title
@@ -137,45 +347,50 @@ class Db2Feeds(object):
         data["page_rating_visits"] = 0
         data["page_rating"] = 0
 
-        if self.update_feed and self.remote_server:
-            url_feed = RemoteUrl(remote_server=self.remote_server, url=feed)
-            url_feed.get_response()
-
-            data["title"] = url_feed.get_title()
-            data["description"] = url_feed.get_description()
-            data["status_code"] = url_feed.get_status_code()
-            data["thumbnail"] = url_feed.get_thumbnail()
-            data["date_published"] = url_feed.get_date_published()
+        if feed_properties:
+            data.update(feed_properties)
         return data
 
     def copy_entry(self, entry, entry_table, data):
         """
+        Feed entries are written in batches
+        """
+        self.pending_entries.append((entry.id, data))
+        if len(self.pending_entries) >= self.batch_size:
+            self.flush_entries()
+
+    def flush_entries(self):
+        """
+        Inserts pending feed entries, then copies tags, social data of their entries
         """
-        new_entry_id = entry_table.insert_json(data)
-        self.copy_tags(entry, new_entry_id)
-        self.copy_social_data(entry, new_entry_id)
-
-    def copy_tags(self, entry, new_entry_id):
-        source_entry_compacted_tags = ReflectedEntryCompactedTags(self.engine, self.connection)
-        tags = source_entry_compacted_tags.get_tags(entry.id)
-
-        entry_tag_data = {}
-        for tag in tags:
-            entry_tag_data["tag"] = tag
-            entry_tag_data["entry_id"] = new_entry_id
-            destination_entry_compacted_tags = ReflectedEntryCompactedTags(self.new_engine, self.new_connection)
-            destination_entry_compacted_tags.insert_json_data(entry_tag_data)
-
-    def copy_social_data(self, entry, new_entry_id):
-        source_entry_social_data = ReflectedSocialData(self.engine, self.connection)
-        social_data = source_entry_social_data.get_json(entry.id)
-        if social_data:
-            if "id" in social_data:
-                del social_data["id"]
-            social_data["entry_id"] = new_entry_id
-
-            destination_entry_social_data = ReflectedSocialData(self.new_engine, self.new_connection)
-            destination_entry_social_data.insert_json_data(social_data)
+        if not self.pending_entries:
+            return
+
+        keys = set()
+        for entry_id, data in self.pending_entries:
+            keys.update(data.keys())
+
+        json_data_list = []
+        for entry_id, data in self.pending_entries:
+            json_data_list.append({key: data.get(key) for key in keys})
+
+        new_entry_ids = self.new_table.insert_json_data_many(json_data_list, return_ids=True)
+
+        entry_id_pairs = []
+        for (entry_id, data), new_entry_id in zip(self.pending_entries, new_entry_ids):
+            entry_id_pairs.append((entry_id, new_entry_id))
+
+        # per user data, like user tags, votes is not copied into feeds
+        copier = EntryRelationsCopier(
+            self.engine,
+            self.connection,
+            self.new_engine,
+            self.new_connection,
+            table_names=["entrycompactedtags", "socialdata"],
+        )
+        copier.copy(entry_id_pairs)
+
+        self.pending_entries = []
 
     def truncate_tables(self):
         if not self.new_engine:
@@ -186,8 +401,7 @@ class Db2Feeds(object):
             table = ReflectedTable(self.new_engine, self.new_connection)
             table.truncate_table(table_name)
 
-        table = ReflectedTable(self.new_engine, self.new_connection)
-        table.vacuum()
+        self.truncated = True
 
     def get_table_names(self):
         return tableconfig.get_backup_tables()
@@ -237,6 +451,14 @@ def parse():
         help="format of display. LINES, JSON, SQLITE",
     )
     parser.add_argument("--crawling-server", default="", help="Remote crawling server")
+    parser.add_argument("--workers", type=int, default=1, help="Number of remote calls made at the same time")
+    parser.add_argument("--host-interval", type=float, default=0, help="Minimal number of seconds between calls for one host")
+    parser.add_argument("--timeout", type=int, help="Timeout of remote call, in seconds")
+    parser.add_argument("--cache-db", help="File with cache of discovered feeds. Created if it does not exist")
+    parser.add_argument("--cache-ttl", type=int, default=30, help="Cached feeds older than this number of days are fetched again")
+    parser.add_argument("--refresh-older-than", help="Cached feeds fetched before this date are fetched again")
+    parser.add_argument("--incremental", action="store_true", help="Processes only entries added after the previous run")
+    parser.add_argument("--compact", default="full", choices=["full", "incremental", "none"], help="How output DB is compacted, after tables were truncated. Default full")
 
     args = parser.parse_args()
 
@@ -251,12 +473,26 @@ def main():
         print("File {} does not exist".format(path))
         return
 
+    refresh_older_than = None
+    if args.refresh_older_than:
+        refresh_older_than = date_parser.parse(args.refresh_older_than)
+
     reader = Db2Feeds(
         input_db=args.db,
         output_db=args.output_db,
         clean=args.clean,
         remote_server=args.crawling_server,
         output_format=args.output_format,
+        read_internet_links=args.read_internet_links,
+        update_feed=args.update_rss,
+        workers=args.workers,
+        host_interval_s=args.host_interval,
+        timeout_s=args.timeout,
+        cache_db=args.cache_db,
+        cache_ttl_days=args.cache_ttl,
+        refresh_older_than=refresh_older_than,
+        incremental=args.incremental,
+        compact=args.compact,
     )
     reader.convert()
 
@@ -6,13 +6,18 @@ Examples:
   $ --search "title=*Musk*"
  - What was said about Musk (title, link, description, etc)
   $ --search "Musk"
+ - How many bookmarks, and votes, do we have per year
+  $ --search "bookmarked==1" --group-by "year(date_published)" --aggregate "count,sum(page_rating_votes)"
 """
 
 import argparse
 import time
 import os
+import sys
+import csv
 import json
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, MetaData, Table
+from sqlalchemy.exc import NoSuchTableError
 
 from webtoolkit import BaseUrl
 
@@ -20,13 +25,17 @@ from linkarchivetools.utils.omnisearch import SingleSymbolEvaluator, EquationEva
 from linkarchivetools.utils.alchemysearch import (
     AlchemySymbolEvaluator,
     AlchemyEquationEvaluator,
+    AlchemyAggregateEvaluator,
     AlchemySearch,
 )
+from linkarchivetools.utils.materializedviews import MaterializedViews
+from linkarchivetools.utils.federatedsearch import FederatedSearch, get_db_files
 from linkarchivetools.model import entry_to_json
 from linkarchivetools.utils.reflected import (
     ReflectedTable,
     ReflectedEntryTable,
-    ReflectedUserTags,
+    ReflectedSourceTable,
+    ReflectedEntryCompactedTags,
     ReflectedSocialData,
 )
 
@@ -110,11 +119,9 @@ class DisplayRowHandler(object):
                 text += " " + entry.title
 
         if self.args.source:
-            source_id = entry.source
-            if source_id:
-                r = ReflectedEntryTable(self.engine, self.connection)
-                source = r.get_source(source_id)
-                text += " [{}]".format(source.title)
+            source_title = self.get_source_title(entry)
+            if source_title:
+                text += " [{}]".format(source_title)
 
         print(text)
 
@@ -129,53 +136,109 @@ class DisplayRowHandler(object):
                 print(description)
 
         if self.args.tags:
-            tags_table = ReflectedUserTags(self.engine, self.connection)
-            tags = tags_table.get_tags_string(entry.id)
+            tags = self.get_tags(entry)
             if tags and tags != "":
                 self.print_tags(tags)
 
         if self.args.social:
-            social_table = ReflectedSocialData(self.engine, self.connection)
-            social = social_table.get(entry.id)
+            social = self.get_social(entry)
             if social is not None:
                 self.print_social(social)
 
         if self.args.status:
             print(entry.status_code)
 
+    def get_source_title(self, entry):
+        """
+        Source title is joined by search. Query is only a fallback.
+        """
+        if "source_title" in entry._mapping:
+            return entry.source_title
+
+        if self.connection is None:
+            return
+
+        source_id = entry.source_id
+        if source_id:
+            r = ReflectedSourceTable(self.engine, self.connection)
+            source = r.get_source(source_id)
+            if source:
+                return source.title
+
+    def get_tags(self, entry):
+        """
+        Tags are joined by search. Query is only a fallback.
+        Tags of entry, from all users, are read from entrycompactedtags
+        """
+        if "tags" in entry._mapping:
+            return entry.tags
+
+        if self.connection is None:
+            return
+
+        tags_table = ReflectedEntryCompactedTags(self.engine, self.connection)
+        return tags_table.get_tags_string(entry.id)
+
+    def get_social(self, entry):
+        """
+        Social data is joined by search. Query is only a fallback.
+
+        @returns dict, or None if entry does not have social data
+        """
+        mapping = entry._mapping
+        if "social_id" in mapping:
+            if mapping["social_id"] is None:
+                return None
+
+            social = {}
+            for key, value in mapping.items():
+                if key.startswith("social_"):
+                    social[key[len("social_"):]] = value
+            return social
+
+        if self.connection is None:
+            return
+
+        social_table = ReflectedSocialData(self.engine, self.connection)
+        return social_table.get_json(entry.id)
+
     def print_tags(self, tags):
         print(tags)
 
     def print_social(self, social):
+        view_count = social.get("view_count")
+        thumbs_up = social.get("thumbs_up")
+        thumbs_down = social.get("thumbs_down")
+
         if (
-            social.view_count is not None
-            and social.thumbs_up is not None
-            and social.thumbs_down is not None
+            view_count is not None
+            and thumbs_up is not None
+            and thumbs_down is not None
         ):
             print(
-                f"V:{social.view_count} TU:{social.thumbs_up} TD:{social.thumbs_down}"
+                f"V:{view_count} TU:{thumbs_up} TD:{thumbs_down}"
             )
         else:
-            if social.view_count:
-                print(f"F:{social.view_count}")
+            if view_count:
+                print(f"F:{view_count}")
 
-            if social.thumbs_up:
-                print(f"F:{social.thumbs_up}")
+            if thumbs_up:
+                print(f"F:{thumbs_up}")
 
-            if social.thumbs_down:
-                print(f"F:{social.thumbs_down}")
+            if thumbs_down:
+                print(f"F:{thumbs_down}")
 
-            if social.upvote_diff:
-                print(f"S:{social.upvote_diff}")
+            if social.get("upvote_diff"):
+                print(f"S:{social['upvote_diff']}")
 
-            if social.upvote_ratio:
-                print(f"S:{social.upvote_ratio}")
+            if social.get("upvote_ratio"):
+                print(f"S:{social['upvote_ratio']}")
 
-            if social.followers_count:
-                print(f"F:{social.followers_count}")
+            if social.get("followers_count"):
+                print(f"F:{social['followers_count']}")
 
-            if social.stars:
-                print(f"S:{social.stars}")
+            if social.get("stars"):
+                print(f"S:{social['stars']}")
 
     def get_time_diff(self):
         return time.time() - self.start_time
@@ -225,6 +288,42 @@ class YieldRowHandler(object):
         yield row
 
 
+class AggregateRowHandler(object):
+    """
+    Displays grouped rows as table, JSON or CSV
+    """
+
+    def __init__(self, args=None, engine=None, connection=None):
+        self.args = args
+        self.engine = engine
+        self.connection = connection
+
+        self.header_printed = False
+        self.csv_writer = None
+
+        self.total_entries = 0
+
+    def handle_row(self, row):
+        mapping = row._mapping
+
+        if self.args and getattr(self.args, "json", False):
+            print(json.dumps(dict(mapping), default=str))
+        elif self.args and getattr(self.args, "csv", False):
+            if self.csv_writer is None:
+                self.csv_writer = csv.writer(sys.stdout)
+            if not self.header_printed:
+                self.csv_writer.writerow(list(mapping.keys()))
+                self.header_printed = True
+            self.csv_writer.writerow(list(mapping.values()))
+        else:
+            if not self.header_printed:
+                print(" | ".join(mapping.keys()))
+                self.header_printed = True
+            print(" | ".join([str(value) for value in mapping.values()]))
+
+        self.total_entries += 1
+
+
 class DbAnalyzer(object):
     def __init__(self, input_db, args=None):
         self.args = args
@@ -233,26 +332,36 @@ class DbAnalyzer(object):
         self.input_db = input_db
 
     def print_summary(self, print_columns=False):
-        db = self.input_db
+        files = self.get_db_files()
 
-        if not os.path.isfile(db):
-            print("File does not exist:{}".format(db))
-            return
+        for db in files:
+            if not os.path.isfile(db):
+                print("File does not exist:{}".format(db))
+                return
 
-        self.engine = create_engine("sqlite:///" + db)
-        with self.engine.connect() as connection:
-            r = ReflectedTable(self.engine, connection)
-            r.print_summary(print_columns)
+            if len(files) > 1:
+                print("DB: {}".format(db))
+
+            self.engine = create_engine("sqlite:///" + db)
+            with self.engine.connect() as connection:
+                r = ReflectedTable(self.engine, connection)
+                r.print_summary(print_columns)
 
     def search(self):
         if self.is_db_scan():
-            file = self.input_db
+            files = self.get_db_files()
+            if len(files) > 1:
+                row_handler = DisplayRowHandler(args=self.args)
+                yield from self.perform_federated_search(files, row_handler)
+                return
+
+            file = files[0]
             if not os.path.isfile(file):
                 print("File does not exist:{}".format(file))
                 return
 
             print("Creating engine")
-            self.engine = create_engine("sqlite:///" + self.input_db)
+            self.engine = create_engine("sqlite:///" + file)
             print("Creating engine DONE")
 
             with self.engine.connect() as connection:
@@ -261,6 +370,29 @@ class DbAnalyzer(object):
         else:
             print("No database was specified")
 
+    def perform_federated_search(self, files, row_handler):
+        """
+        Every file is searched concurrently, results are merged by order column
+        """
+        for file in files:
+            if not os.path.isfile(file):
+                print("File does not exist:{}".format(file))
+                return
+
+        search = None
+        if self.args:
+            search = self.args.search
+
+        print("Searching {} files...".format(len(files)))
+        searcher = FederatedSearch(
+            files,
+            search,
+            row_handler=row_handler,
+            args=self.args,
+            **self.get_join_options(),
+        )
+        yield from searcher.search()
+
     def perform_search(self):
         row_handler = DisplayRowHandler(args=self.args, engine=self.engine, connection=self.connection)
 
@@ -268,6 +400,12 @@ class DbAnalyzer(object):
         if self.args:
             search = self.args.search
 
+        view = None
+        if self.args and getattr(self.args, "view", None):
+            view = self.get_view(self.args.view)
+            if view is None:
+                return
+
         print("Starting alchemy")
         searcher = AlchemySearch(
             self.engine,
@@ -275,6 +413,8 @@ class DbAnalyzer(object):
             row_handler=row_handler,
             args=self.args,
             connection=self.connection,
+            view=view,
+            **self.get_join_options(),
         )
         print("Starting alchemy DONE")
 
@@ -283,13 +423,19 @@ class DbAnalyzer(object):
 
     def get_entries(self):
         if self.is_db_scan():
-            file = self.input_db
+            files = self.get_db_files()
+            if len(files) > 1:
+                row_handler = YieldRowHandler(args=self.args)
+                yield from self.perform_federated_search(files, row_handler)
+                return
+
+            file = files[0]
             if not os.path.isfile(file):
                 print("File does not exist:{}".format(file))
                 return
 
             print("Creating engine")
-            self.engine = create_engine("sqlite:///" + self.input_db)
+            self.engine = create_engine("sqlite:///" + file)
             print("Creating engine DONE")
 
             with self.engine.connect() as connection:
@@ -303,6 +449,12 @@ class DbAnalyzer(object):
         if self.args:
             search = self.args.search
 
+        view = None
+        if self.args and getattr(self.args, "view", None):
+            view = self.get_view(self.args.view)
+            if view is None:
+                return
+
         print("Starting alchemy")
         searcher = AlchemySearch(
             self.engine,
@@ -310,12 +462,133 @@ class DbAnalyzer(object):
             row_handler=row_handler,
             args=self.args,
             connection=self.connection,
+            view=view,
+            **self.get_join_options(),
         )
         print("Starting alchemy DONE")
 
         print("Searching...")
         yield from searcher.search()
 
+    def aggregate(self):
+        """
+        Groups search results, with --group-by and --aggregate
+        """
+        if not self.is_db_scan():
+            print("No database was specified")
+            return
+
+        files = self.get_db_files()
+        if len(files) > 1:
+            print("Grouping of several databases is not supported")
+            return
+
+        file = files[0]
+        if not os.path.isfile(file):
+            print("File does not exist:{}".format(file))
+            return
+
+        self.engine = create_engine("sqlite:///" + file)
+
+        with self.engine.connect() as connection:
+            self.connection = connection
+
+            row_handler = AggregateRowHandler(args=self.args, engine=self.engine, connection=self.connection)
+
+            searcher = AlchemySearch(
+                self.engine,
+                self.args.search,
+                row_handler=row_handler,
+                args=self.args,
+                connection=self.connection,
+            )
+
+            aggregates = getattr(self.args, "aggregate", None) or "count"
+            yield from searcher.aggregate(self.args.group_by, aggregates)
+
+    def check_aggregate(self):
+        """
+        Checks --group-by, and --aggregate expressions, before rows are read
+        @returns error text, or None if expressions are valid
+        """
+        files = self.get_db_files()
+        if len(files) != 1 or not os.path.isfile(files[0]):
+            # reported by aggregate
+            return
+
+        table_name = getattr(self.args, "table", None) or "linkdatamodel"
+
+        engine = create_engine("sqlite:///" + files[0])
+        try:
+            table = Table(table_name, MetaData(), autoload_with=engine)
+        except NoSuchTableError:
+            return "Table does not exist: {}".format(table_name)
+        finally:
+            engine.dispose()
+
+        evaluator = AlchemyAggregateEvaluator(table)
+        try:
+            if len(evaluator.get_group_by(self.args.group_by)) == 0:
+                return "Group by was not specified"
+            evaluator.get_aggregates(getattr(self.args, "aggregate", None) or "count")
+        except (AttributeError, NotImplementedError) as E:
+            return str(E)
+
+    def get_view(self, name):
+        """
+        Returns search view. View is materialized, if it was not before.
+        """
+        views = MaterializedViews(self.engine, self.connection)
+
+        view = views.get_view(name)
+        if view is None:
+            print("View does not exist:{}".format(name))
+            return
+
+        if not views.is_materialized(view):
+            print("Materializing view:{}".format(name))
+            views.refresh_view(view)
+
+        return view
+
+    def refresh_views(self, full=False):
+        """
+        Refreshes materialized search views
+        """
+        db = self.input_db
+
+        if not os.path.isfile(db):
+            print("File does not exist:{}".format(db))
+            return
+
+        self.engine = create_engine("sqlite:///" + db)
+        with self.engine.connect() as connection:
+            views = MaterializedViews(self.engine, connection)
+            for view in views.get_views():
+                count = views.refresh_view(view, full=full)
+                print("View:{} entries:{}".format(view.name, count))
+
+    def get_db_files(self):
+        """
+        Input DB can be a list, or text: "2024.db,2025.db", or "archive/*.db"
+        """
+        if isinstance(self.input_db, (list, tuple)):
+            return list(self.input_db)
+
+        files = get_db_files(self.input_db)
+        if len(files) == 0:
+            return [self.input_db]
+        return files
+
+    def get_join_options(self):
+        """
+        Related data which is displayed is joined into one search query.
+        """
+        options = {}
+        for name in ["tags", "social", "source"]:
+            options["with_" + name] = bool(self.args and getattr(self.args, name, False))
+        return options
+
     def is_db_scan(self):
         if self.input_db:
             return True
@@ -327,7 +600,10 @@ class Parser(object):
 
     def parse(self):
         self.parser = argparse.ArgumentParser(description="Data analyzer program")
-        self.parser.add_argument("--db", help="DB to be scanned")
+        self.parser.add_argument(
+            "--db",
+            help="DB to be scanned. Several DBs can be delimited by ',', or provided as glob 'archive/*.db'",
+        )
 
         self.parser.add_argument(
             "--search", help="Search, with syntax same as the main program / site."
@@ -338,6 +614,14 @@ class Parser(object):
         self.parser.add_argument("--asc", action="store_true", help="order ascending")
         self.parser.add_argument("--desc", action="store_true", help="order descending")
         self.parser.add_argument("--table", default="linkdatamodel", help="Table name")
+        self.parser.add_argument(
+            "--view", help="Search view name. Reads entries materialized for the view"
+        )
+        self.parser.add_argument(
+            "--refresh-views",
+            action="store_true",
+            help="Refreshes materialized search views. Only changed entries are evaluated",
+        )
 
         self.parser.add_argument("--title", action="store_true", help="displays title")
         self.parser.add_argument("--votes", action="store_true", help="displays votes")
@@ -347,7 +631,7 @@ class Parser(object):
         self.parser.add_argument(
             "--status", action="store_true", help="displays status"
         )
-        self.parser.add_argument("--tags", action="store_true", help="displays tags")
+        self.parser.add_argument("--tags", action="store_true", help="displays tags of entry, from entrycompactedtags")
         self.parser.add_argument(
             "--social", action="store_true", help="displays social data"
         )
@@ -381,6 +665,20 @@ class Parser(object):
             action="store_true",
             help="JSON format",
         )
+        self.parser.add_argument(
+            "--csv",
+            action="store_true",
+            help="CSV format. Used by --group-by",
+        )
+        self.parser.add_argument(
+            "--group-by",
+            help="Groups search results, for example 'language', or 'year(date_published),domain(link)'",
+        )
+        self.parser.add_argument(
+            "--aggregate",
+            default="count",
+            help="Aggregates for --group-by, for example 'count,sum(page_rating_votes),avg(page_rating_votes)'",
+        )
 
         self.parser.add_argument(
             "-i", "--ignore-case", action="store_true", help="Ignores case"
@@ -389,6 +687,9 @@ class Parser(object):
 
         self.args = self.parser.parse_args()
 
+        if self.args.view and len(get_db_files(self.args.db)) > 1:
+            self.parser.error("--view can be used only with one DB")
+
         return True
 
 
@@ -403,6 +704,16 @@ def main():
     m = DbAnalyzer(input_db=p.args.db, args=p.args)
     if p.args.summary:
         m.print_summary(p.args.columns)
+    elif p.args.refresh_views:
+        m.refresh_views()
+    elif p.args.group_by:
+        error = m.check_aggregate()
+        if error:
+            p.parser.error(error)
+
+        for _ in m.aggregate():
+            pass
+        return
     else:
         for _ in m.search():
             pass
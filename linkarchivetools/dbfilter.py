@@ -1,19 +1,125 @@
 """
 Filters out redundant things from database.
 Normally for views, analysis you do not need no temporary tables.
+
+By default input DB is copied, and rows are deleted from the copy.
+In copy-in mode output DB is created empty, and only rows which are kept
+are copied from input DB. Then no VACUUM is necessary.
+
+Entries can be selected by omnisearch queries, like
+  --keep "bookmarked == True" --drop "link = *youtube.com*"
+All queries are combined into one condition, and applied in one pass.
+
+Several outputs can be produced from one read of input DB, by DbMultiFilter,
+with manifest file. Manifest is a JSON list of outputs:
+  [{"output_db": "internet.db", "truncate": "internet", "keep": ["bookmarked == True"]},
+   {"output_db": "voted.db", "truncate": "no_users", "drop": ["page_rating_votes == 0"]}]
 """
 
 import os
 import sys
 import json
 import time
+import queue
 import shutil
+import threading
 from pathlib import Path
 import argparse
 
-from sqlalchemy import create_engine
-from .utils.reflected import ReflectedTable
-from .tableconfig import get_tables, get_truncate_tables_no_users, get_truncate_tables_internet
+from sqlalchemy import (
+    create_engine,
+    text,
+    MetaData,
+    Table,
+    select,
+    insert,
+    delete,
+    and_,
+    or_,
+    not_,
+    func,
+    false,
+    literal_column,
+)
+from .utils.reflected import ReflectedTable, get_entry_column_name
+from .utils.alchemysearch import AlchemySymbolEvaluator, AlchemyEquationEvaluator
+from .utils.omnisearch import OmniSearch
+from .utils.sqlitecompaction import SqliteCompaction, COMPACT_MODES
+from .utils.snapshotprocessor import SnapshotProcessor
+from .tableconfig import (
+    get_tables,
+    get_truncate_tables_no_users,
+    get_truncate_tables_internet,
+    get_entry_dependent_tables,
+)
+
+
+def get_schema(db_file, types):
+    """
+    @returns list of (type, name, sql) of DB
+    """
+    engine = create_engine(f"sqlite:///{db_file}")
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+            )
+        ).fetchall()
+    engine.dispose()
+
+    return [row for row in rows if row.type in types]
+
+
+def get_query_condition(table, query):
+    """
+    Translates omnisearch query to condition. Values are passed as parameters
+    """
+    symbol_evaluator = AlchemySymbolEvaluator(table)
+    equation_evaluator = AlchemyEquationEvaluator(query, symbol_evaluator)
+
+    search = OmniSearch(query, equation_evaluator=equation_evaluator)
+    return search.get_combined_query()
+
+
+def get_remove_condition(table, keep_queries=None, drop_queries=None, conditions=None):
+    """
+    Combines filters into one condition. Row matching it is removed.
+    Keep queries have to be met all, otherwise entry is removed.
+    @param conditions SQL text conditions
+    @returns None if there are no filters
+    """
+    remove_conditions = [text(f"({condition})") for condition in conditions or []]
+    remove_conditions.extend(
+        get_query_condition(table, query) for query in drop_queries or []
+    )
+
+    if keep_queries:
+        keep_condition = and_(
+            *[get_query_condition(table, query) for query in keep_queries]
+        )
+        # rows for which condition is NULL are not kept
+        remove_conditions.append(not_(func.coalesce(keep_condition, false())))
+
+    if not remove_conditions:
+        return None
+
+    return or_(*remove_conditions)
+
+
+def get_truncate_tables(truncate):
+    """
+    @param truncate "no_users", "internet", or list of tables
+    """
+    if not truncate:
+        return []
+    if truncate == "no_users":
+        return get_truncate_tables_no_users()
+    if truncate == "internet":
+        return get_truncate_tables_internet()
+    if isinstance(truncate, str):
+        raise ValueError(f"Unknown truncate list: {truncate}")
+    return list(truncate)
 
 
 class DbFilter(object):
@@ -21,11 +127,21 @@ class DbFilter(object):
     Filter class
     """
 
-    def __init__(self, input_db, output_db):
+    def __init__(self, input_db, output_db, copy_in=False):
+        """
+        @param copy_in If true, filters and truncates are only recorded. Rows are copied by build()
+        """
         self.input_db = input_db
         self.output_db = output_db
+        self.copy_in = copy_in
         self.engine = None
         self.connection = None
+
+        self.entry_conditions = []
+        self.keep_queries = []
+        self.drop_queries = []
+        self.skipped_tables = set()
+
         self.setup()
 
     def setup(self):
@@ -38,11 +154,110 @@ class DbFilter(object):
         if new_path.exists():
             new_path.unlink()
 
-        shutil.copy(self.input_db, self.output_db)
+        if not self.copy_in:
+            shutil.copy(self.input_db, self.output_db)
 
         self.engine = create_engine(f"sqlite:///{self.output_db}")
         self.connection = self.engine.connect()
 
+        if self.copy_in:
+            self.create_schema()
+
+    def get_schema(self, types):
+        """
+        @returns list of (type, name, sql) of input DB
+        """
+        return get_schema(self.input_db, types)
+
+    def create_schema(self):
+        """
+        Creates empty tables. Indexes are created after data are copied
+        """
+        for row in self.get_schema(["table"]):
+            self.connection.execute(text(row.sql))
+        self.connection.commit()
+
+    def build(self):
+        """
+        Copy-in mode. Copies kept rows from input DB, in one transaction
+        """
+        if not self.copy_in:
+            return
+
+        self.connection.execute(text("ATTACH DATABASE :path AS src"), {"path": self.input_db})
+
+        dependent_columns = {}
+        for table_name, column_name in get_entry_dependent_tables():
+            dependent_columns.setdefault(table_name, []).append(column_name)
+
+        # entries are first, dependent rows are selected by copied entries
+        table_names = [row.name for row in self.get_schema(["table"])]
+        if "linkdatamodel" in table_names:
+            table_names.remove("linkdatamodel")
+            table_names.insert(0, "linkdatamodel")
+
+        reflected_table = ReflectedTable(self.engine, self.connection)
+
+        for table_name in table_names:
+            if table_name in self.skipped_tables:
+                continue
+
+            if table_name == "linkdatamodel":
+                self.copy_entries()
+                continue
+
+            column_names = reflected_table.get_column_names(table_name)
+            columns_text = ", ".join(f'"{column_name}"' for column_name in column_names)
+
+            where = None
+            if table_name in dependent_columns:
+                where = self.get_dependent_copy_conditions(dependent_columns[table_name], column_names)
+
+            sql_text = f'INSERT INTO main."{table_name}" ({columns_text}) SELECT {columns_text} FROM src."{table_name}"'
+            if where:
+                sql_text += f" WHERE {where}"
+
+            self.connection.execute(text(sql_text))
+
+        for row in self.get_schema(["index", "trigger", "view"]):
+            self.connection.execute(text(row.sql))
+
+        self.connection.commit()
+        self.connection.execute(text("DETACH DATABASE src"))
+
+    def copy_entries(self):
+        """
+        Copies entries, which are not removed by filters, from attached input DB
+        """
+        source_table = self.get_entries_table(schema="src")
+        destination_table = self.get_entries_table()
+
+        column_names = [column.name for column in destination_table.columns]
+        stmt = select(*[source_table.c[column_name] for column_name in column_names])
+
+        condition = self.get_remove_condition(source_table)
+        if condition is not None:
+            stmt = stmt.where(not_(func.coalesce(condition, false())))
+
+        self.connection.execute(insert(destination_table).from_select(column_names, stmt))
+
+    def get_entries_table(self, schema=None):
+        return Table("linkdatamodel", MetaData(), schema=schema, autoload_with=self.connection)
+
+    def get_dependent_copy_conditions(self, dependent_column_names, column_names):
+        conditions = []
+        for column_name in dependent_column_names:
+            if column_name is None:
+                column_name = get_entry_column_name(column_names)
+            if column_name is None or column_name not in column_names:
+                continue
+
+            conditions.append(
+                f'("{column_name}" IS NULL OR "{column_name}" IN (SELECT id FROM main.linkdatamodel))'
+            )
+
+        return " AND ".join(conditions)
+
     def is_valid(self) -> bool:
         if not self.engine:
             return False
@@ -57,102 +272,381 @@ class DbFilter(object):
         """
         Removes all users data
         """
-        reflected_table = ReflectedTable(self.engine, self.connection)
-
-        truncate_tables = get_truncate_tables_no_users()
-
-        for table in truncate_tables:
-            reflected_table.truncate_table(table)
+        self.truncate_tables(get_truncate_tables_no_users())
 
     def truncate_internet(self):
         """
         Removes dynamic data not necessary for the internet
         """
-        reflected_table = ReflectedTable(self.engine, self.connection)
+        self.truncate_tables(get_truncate_tables_internet())
 
-        truncate_tables = get_truncate_tables_internet()
+    def truncate_tables(self, truncate_tables):
+        if self.copy_in:
+            self.skipped_tables.update(truncate_tables)
+            return
 
-        for table in truncate_tables:
-            reflected_table.truncate_table(table)
+        processor = SnapshotProcessor(self.engine, self.connection)
+        processor.process(obfuscate=False, truncate_tables=truncate_tables)
 
-    def filter(self, conditions):
-        table = ReflectedTable(self.engine, self.connection)
+    def keep(self, query):
+        """
+        Entries not matching omnisearch query are removed by apply()
+        """
+        self.keep_queries.append(query)
 
-        sql_text = f"DELETE FROM linkdatamodel WHERE {conditions};"
-        # TODO delete depnded things
-        table.run_sql(sql_text)
-        table.vacuum()
-        table.close()
+    def drop(self, query):
+        """
+        Entries matching omnisearch query are removed by apply()
+        """
+        self.drop_queries.append(query)
 
-    def filter_bookmarks(self):
-        table = ReflectedTable(self.engine, self.connection)
+    def apply(self):
+        """
+        Removes entries of all keep / drop queries with one DELETE statement
+        @returns number of removed entries
+        """
+        if self.copy_in:
+            return 0
 
-        sql_text = f"DELETE FROM linkdatamodel WHERE bookmarked=False;"
-        # TODO delete depnded things
-        table.run_sql(sql_text)
-        table.vacuum()
-        table.close()
+        table = self.get_entries_table()
 
-    def filter_votes(self):
-        table = ReflectedTable(self.engine, self.connection)
+        condition = self.get_remove_condition(table)
+        if condition is None:
+            return 0
+
+        result = self.connection.execute(delete(table).where(condition))
+
+        self.delete_orphans()
+        self.connection.commit()
+
+        return result.rowcount
+
+    def get_remove_condition(self, table):
+        return get_remove_condition(
+            table,
+            keep_queries=self.keep_queries,
+            drop_queries=self.drop_queries,
+            conditions=self.entry_conditions,
+        )
+
+    def filter(self, conditions):
+        self.delete_entries(conditions)
+
+    def filter_bookmarks(self):
+        self.delete_entries("bookmarked=False")
 
-        sql_text = f"DELETE FROM linkdatamodel WHERE page_rating_votes=0;"
-        table.run_sql(sql_text)
-        table.vacuum()
-        table.close()
+    def filter_votes(self):
+        self.delete_entries("page_rating_votes=0")
 
     def filter_redundant(self):
         """
         Not bookmarked AND without votes are redundant
         """
-        table = ReflectedTable(self.engine, self.connection)
+        self.delete_entries("bookmarked=False AND page_rating_votes=0")
 
-        sql_text = f"DELETE FROM linkdatamodel WHERE bookmarked=False AND page_rating_votes=0;"
-        table.run_sql(sql_text)
-        table.vacuum()
-        table.close()
+    def delete_entries(self, conditions):
+        """
+        Deletes entries, and rows depending on them, in one transaction
+        """
+        if self.copy_in:
+            self.entry_conditions.append(conditions)
+            return
+
+        sql_text = f"DELETE FROM linkdatamodel WHERE {conditions};"
+        self.connection.execute(text(sql_text))
+
+        self.delete_orphans()
+        self.connection.commit()
 
     def cleanup_tables(self):
         """
-        table = ReflectedGenericTable(self.engine, self.connection, "entrycompactedtags")
-        compacted = table.get_where({})
-        for row in compacted
+        Removes rows pointing at entries, which do not exist
+        """
+        self.delete_orphans()
+        self.connection.commit()
 
+    def delete_orphans(self):
+        """
+        One DELETE statement for every dependent table. Caller commits
+        @returns number of deleted rows
+        """
+        table = ReflectedTable(self.engine, self.connection)
+
+        count = 0
+        for table_name, column_name in get_entry_dependent_tables():
+            count += table.delete_orphans(table_name, column_name, commit=False)
 
-        entrycompactedtags
-        usertags
-        usercompactedtags
-        uservotes
-        usercomments
-        userbookmarks
-        userentrytransitionhistory
-        userentryvisithistory
+        return count
+
+    def vacuum(self):
+        self.compact()
+
+    def compact(self, mode="full", pages=None, output_file=None):
         """
-        pass
+        Filters do not compact DB. It should be done once, after all filters,
+        in copy-in mode after build()
+        @param mode full, incremental, into, none. See SqliteCompaction
+        @returns CompactionReport
+        """
+        compaction = SqliteCompaction(self.engine, self.connection)
+        return compaction.compact(mode=mode, pages=pages, output_file=output_file)
 
-    def obfuscate(destination_engine):
+    def obfuscate(self):
         """
         Remove passwords from the database
         """
-        table_name = 'user'
+        processor = SnapshotProcessor(self.engine, self.connection)
+        processor.process(obfuscate=True)
+
+
+class DbFilterOutput(object):
+    """
+    One output of DbMultiFilter. Rows are written by its own thread
+    """
+
+    FINISHED = None
+
+    def __init__(self, output_db, keep=None, drop=None, truncate=None, queue_size=100):
+        """
+        @param keep list of omnisearch queries, entry has to match all
+        @param drop list of omnisearch queries
+        @param truncate "no_users", "internet", or list of tables
+        @param queue_size How many batches can wait for writing
+        """
+        self.output_db = output_db
+        self.keep_queries = list(keep or [])
+        self.drop_queries = list(drop or [])
+        self.skipped_tables = set(get_truncate_tables(truncate))
+
+        self.rows_queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.exception = None
+        self.entry_ids = set()
+
+    def from_json(output_json):
+        return DbFilterOutput(
+            output_json["output_db"],
+            keep=output_json.get("keep"),
+            drop=output_json.get("drop"),
+            truncate=output_json.get("truncate"),
+        )
+
+    def start(self, schema):
+        self.thread = threading.Thread(target=self.write, args=(schema,), daemon=True)
+        self.thread.start()
+
+    def put(self, table_name, rows):
+        if rows:
+            self.rows_queue.put((table_name, rows))
+
+    def finish(self):
+        self.rows_queue.put(DbFilterOutput.FINISHED)
+        self.thread.join()
+
+    def write(self, schema):
+        """
+        Thread function. Queue is always read to the end, even after error,
+        so that reader is never blocked
+        """
+        engine = None
+        connection = None
+        tables = {}
+
+        try:
+            path = Path(self.output_db)
+            if path.exists():
+                path.unlink()
+
+            engine = create_engine(f"sqlite:///{self.output_db}")
+            connection = engine.connect()
+
+            for row in schema:
+                if row.type == "table":
+                    connection.execute(text(row.sql))
+            connection.commit()
+        except Exception as E:
+            self.exception = E
+
+        while True:
+            item = self.rows_queue.get()
+            if item is DbFilterOutput.FINISHED:
+                break
+            if self.exception:
+                continue
+
+            table_name, rows = item
+            try:
+                if table_name not in tables:
+                    tables[table_name] = Table(table_name, MetaData(), autoload_with=connection)
+                connection.execute(insert(tables[table_name]), rows)
+            except Exception as E:
+                self.exception = E
+
+        try:
+            if not self.exception:
+                for row in schema:
+                    if row.type != "table":
+                        connection.execute(text(row.sql))
+                connection.commit()
+        except Exception as E:
+            self.exception = E
+        finally:
+            if connection:
+                connection.close()
+            if engine:
+                engine.dispose()
+
+
+class DbMultiFilter(object):
+    """
+    Produces several filtered outputs, reading input DB only once.
+    Every row is routed to all outputs, which keep it.
+    """
+
+    def __init__(self, input_db, outputs, batch_size=1000):
+        """
+        @param outputs list of DbFilterOutput
+        """
+        self.input_db = input_db
+        self.outputs = outputs
+        self.batch_size = batch_size
 
-        destination_metadata = MetaData()
-        destination_table = Table(table_name, destination_metadata, autoload_with=destination_engine)
+    def from_manifest(input_db, manifest_file, batch_size=1000):
+        with open(manifest_file, "r") as fh:
+            manifest = json.load(fh)
 
-        columns = destination_table.columns.keys()
-        is_superuser_index = columns.index('is_superuser')
+        outputs = [DbFilterOutput.from_json(output_json) for output_json in manifest]
+        return DbMultiFilter(input_db, outputs, batch_size=batch_size)
 
-        with destination_engine.connect() as destination_connection:
-            result = destination_connection.execute(destination_table.select())
+    def is_valid(self) -> bool:
+        path = Path(self.input_db)
+        if not path.exists():
+            print("File {} does not exist".format(path))
+            return False
+        return True
 
-            for row in result:
-                update_stmt = destination_table.update().where(destination_table.c.id == row[0]).values(password='')
-                destination_connection.execute(update_stmt)
+    def run(self):
+        schema = get_schema(self.input_db, ["table", "index", "trigger", "view"])
+
+        for output in self.outputs:
+            output.start(schema)
+
+        engine = create_engine(f"sqlite:///{self.input_db}")
+        try:
+            with engine.connect() as connection:
+                self.read(connection, schema)
+        finally:
+            for output in self.outputs:
+                output.finish()
+            engine.dispose()
+
+        for output in self.outputs:
+            if output.exception:
+                raise IOError(
+                    "Writing of {} failed: {}".format(output.output_db, output.exception)
+                ) from output.exception
+
+    def read(self, connection, schema):
+        dependent_columns = {}
+        for table_name, column_name in get_entry_dependent_tables():
+            dependent_columns.setdefault(table_name, []).append(column_name)
+
+        # entries are first, dependent rows are routed by kept entries
+        table_names = [row.name for row in schema if row.type == "table"]
+        if "linkdatamodel" in table_names:
+            table_names.remove("linkdatamodel")
+            table_names.insert(0, "linkdatamodel")
+
+        for table_name in table_names:
+            outputs = [
+                output for output in self.outputs if table_name not in output.skipped_tables
+            ]
+            if not outputs:
+                continue
+
+            table = Table(table_name, MetaData(), autoload_with=connection)
+
+            if table_name == "linkdatamodel":
+                self.read_entries(connection, table, outputs)
+            else:
+                column_names = None
+                if table_name in dependent_columns:
+                    column_names = self.get_dependent_column_names(
+                        table, dependent_columns[table_name]
+                    )
+                self.read_table(connection, table, outputs, column_names)
+
+    def read_entries(self, connection, table, outputs):
+        """
+        Keep flag of every output is calculated by SQLite, in the same scan
+        """
+        flags = []
+        for index, output in enumerate(outputs):
+            condition = get_remove_condition(
+                table, keep_queries=output.keep_queries, drop_queries=output.drop_queries
+            )
+            if condition is None:
+                flags.append(literal_column("1").label(f"keep_{index}"))
+            else:
+                flags.append(not_(func.coalesce(condition, false())).label(f"keep_{index}"))
+
+        column_names = [column.name for column in table.columns]
+        columns_count = len(column_names)
+        id_index = column_names.index("id")
+
+        stmt = select(*table.columns, *flags)
+        result = connection.execution_options(yield_per=self.batch_size).execute(stmt)
+
+        for rows in result.partitions():
+            for index, output in enumerate(outputs):
+                kept_rows = [row for row in rows if row[columns_count + index]]
+                output.entry_ids.update(row[id_index] for row in kept_rows)
+                output.put(
+                    table.name,
+                    [dict(zip(column_names, row[:columns_count])) for row in kept_rows],
+                )
+
+    def read_table(self, connection, table, outputs, dependent_column_names=None):
+        """
+        @param dependent_column_names columns pointing at entries
+        """
+        column_names = [column.name for column in table.columns]
+
+        result = connection.execution_options(yield_per=self.batch_size).execute(select(table))
+
+        for rows in result.partitions():
+            rows = [dict(zip(column_names, row)) for row in rows]
+
+            for output in outputs:
+                if dependent_column_names:
+                    output.put(
+                        table.name,
+                        [
+                            row
+                            for row in rows
+                            if self.is_entry_kept(output, row, dependent_column_names)
+                        ],
+                    )
+                else:
+                    output.put(table.name, rows)
+
+    def is_entry_kept(self, output, row, dependent_column_names):
+        for column_name in dependent_column_names:
+            entry_id = row[column_name]
+            if entry_id is not None and entry_id not in output.entry_ids:
+                return False
+        return True
 
-                if is_superuser_index and row[is_superuser_index]:
-                    update_stmt = destination_table.update().where(destination_table.c.id == row[0]).values(username='admin')
+    def get_dependent_column_names(self, table, dependent_column_names):
+        column_names = [column.name for column in table.columns]
 
-            destination_connection.commit()
+        result = []
+        for column_name in dependent_column_names:
+            if column_name is None:
+                column_name = get_entry_column_name(table)
+            if column_name is not None and column_name in column_names:
+                result.append(column_name)
+        return result
 
 
 def parse():
@@ -164,6 +658,15 @@ def parse():
     parser.add_argument("--votes", action="store_true", help="export if votes is > 0")
     parser.add_argument("--truncate-no-users", action="store_true", help="Truncates tables no users")
     parser.add_argument("--truncate-internet", action="store_true", help="Truncates tables for public")
+    parser.add_argument("--keep", action="append", help="Keeps only entries matching omnisearch query, like 'bookmarked == True'. Can be repeated")
+    parser.add_argument("--drop", action="append", help="Removes entries matching omnisearch query, like 'link = *youtube.com*'. Can be repeated")
+    parser.add_argument("--obfuscate", action="store_true", help="Removes passwords of users")
+    parser.add_argument("--manifest", help="JSON file with list of outputs. All outputs are produced from one read of DB")
+    parser.add_argument("--copy-in", action="store_true", help="Creates empty output DB, and copies only kept rows. Faster for small outputs")
+
+    parser.add_argument("--compact", default="full", choices=COMPACT_MODES, help="How output DB is compacted, after all filters. Default full")
+    parser.add_argument("--compact-pages", type=int, help="Number of pages released by incremental compaction. All if not set")
+    parser.add_argument("--compact-into", help="File created by 'into' compaction")
 
     parser.add_argument("-v", "--verbosity", help="Verbosity level")
 
@@ -176,30 +679,68 @@ def main():
     start_time = time.time()
     parser, args = parse()
 
-    thefilter = DbFilter(args.db, args.output_db)
+    if args.compact == "into" and not args.compact_into:
+        parser.error("--compact-into is required for 'into' compaction")
+
+    if args.manifest:
+        if not Path(args.manifest).exists():
+            parser.error("Manifest does not exist: {}".format(args.manifest))
+
+        # outputs, and their filters are defined only by manifest
+        options = [
+            "output_db", "bookmarked", "votes", "truncate_no_users", "truncate_internet",
+            "keep", "drop", "obfuscate", "copy_in", "compact", "compact_pages", "compact_into",
+        ]
+        for option in options:
+            if getattr(args, option) != parser.get_default(option):
+                parser.error("--{} cannot be used with --manifest".format(option.replace("_", "-")))
+
+    if args.manifest:
+        multi_filter = DbMultiFilter.from_manifest(args.db, args.manifest)
+        if not multi_filter.is_valid():
+            return
+
+        multi_filter.run()
+
+        end_time = time.time()
+        print(f"Done in {end_time - start_time:.2f}s")
+        return
+
+    thefilter = DbFilter(args.db, args.output_db, copy_in=args.copy_in)
     if not thefilter.is_valid():
         return
 
-    entries_changed = False
     if args.truncate_no_users:
         thefilter.truncate_no_users()
     if args.truncate_internet:
         thefilter.truncate_internet()
     if args.bookmarked:
-        entries_changed = True
-        thefilter.filter_bookmarks()
+        thefilter.drop("bookmarked == False")
     if args.votes:
-        entries_changed = True
-        thefilter.filter_votes()
-
-    if entries_changed:
-        thefilter.cleanup_tables()
+        thefilter.drop("page_rating_votes == 0")
+    for query in args.keep or []:
+        thefilter.keep(query)
+    for query in args.drop or []:
+        thefilter.drop(query)
+
+    if args.copy_in:
+        thefilter.build()
+    else:
+        removed = thefilter.apply()
+        print(f"Removed {removed} entries")
+
+    if args.obfuscate:
+        thefilter.obfuscate()
+
+    report = thefilter.compact(
+        mode=args.compact, pages=args.compact_pages, output_file=args.compact_into
+    )
+    print(report)
 
-    thefilter.vacuum()
     thefilter.close()
 
     end_time = time.time()
-    print(f"Done in {end_time}")
+    print(f"Done in {end_time - start_time:.2f}s")
 
 
 if __name__ == "__main__":
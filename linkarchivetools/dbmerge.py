@@ -17,16 +17,19 @@ class DbMerge(object):
         input_dbs=None,
         output_db=None,
         verbose=True,
+        batch_size=500,
     ):
         """
         Constructor
         @param read_internet_links Read links to find RSS feeds
         @param update_feed Many things are copied from original entry.
                           If this setting is true, feed entry fetches title, and other properties
+        @param batch_size Number of entries copied at once
         """
         self.input_dbs = input_dbs
         self.output_db = output_db
         self.verbose = verbose
+        self.batch_size = batch_size
 
     def convert(self):
         """
@@ -63,27 +66,38 @@ class DbMerge(object):
                 self.convert_entries()
 
     def convert_entries(self):
+        self.copier = EntryCopier(
+                             src_engine=self.src_engine,
+                             src_connection=self.src_connection,
+                             dst_engine = self.dst_engine,
+                             dst_connection=self.dst_connection)
+        batch = []
+
         src_table = ReflectedEntryTable(self.src_engine, self.src_connection)
         for entry in src_table.get_entries_good():
             dst_table = ReflectedEntryTable(self.dst_engine, self.dst_connection)
             if not dst_table.exists(link=entry.link):
-                self.convert_entry(entry)
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    self.convert_batch(batch)
+                    batch = []
             elif self.verbose:
                 destination_entries = dst_table.get_where({"link" : entry.link})
                 for destination_entry in destination_entries:
                     self.fill_blanks(entry, destination_entry, dst_table)
                 print(f"Entry {entry.link} is already present")
 
-    def convert_entry(self, entry):
+        self.convert_batch(batch)
+
+    def convert_batch(self, entries):
+        """
+        Entries, and their tags, social data are inserted with one executemany per table
+        """
         if self.verbose:
-            print(f"Converting entry {entry.link}")
+            for entry in entries:
+                print(f"Converting entry {entry.link}")
 
-        copier = EntryCopier(
-                             src_engine=self.src_engine,
-                             src_connection=self.src_connection,
-                             dst_engine = self.dst_engine,
-                             dst_connection=self.dst_connection) 
-        copier.copy_entry(entry)
+        self.copier.copy_entries(entries)
 
     def fill_blanks(self, source_entry, destination_entry, destination_table):
         if (not self.is_entry_attribute_set(destination_entry, "thumbnail") and
@@ -1,5 +1,7 @@
 
 from .dbconnection import *
+from .asyncdbconnection import *
+from .concurrentdbconnection import *
 from .entries import *
 from .sources import *
 from .applogging import *
@@ -1,11 +1,21 @@
 """
 TODO remove hardcoded values
 """
+import time
+import logging
+import threading
 import traceback
 from datetime import datetime
+from sqlalchemy import select, delete
+
+from linkarchivetools.utils.reflected import ReflectedGenericTable
+from linkarchivetools.utils.engineregistry import MEMORY_DB
 from .basetable import BaseTable
 
 
+logger = logging.getLogger(__name__)
+
+
 class AppLogging(BaseTable):
     DEBUG = 10
     INFO = 20
@@ -18,7 +28,7 @@ class AppLogging(BaseTable):
         self.connection = connection
         self.set_table("applogging")
 
-    def create_entry(self, info_text, detail_text="", level=INFO, stack=False):
+    def get_entry_json(self, info_text, detail_text="", level=INFO):
         if len(info_text) > 1900:
             info_text = info_text[:1900]
         if len(detail_text) > 2900:
@@ -29,22 +39,38 @@ class AppLogging(BaseTable):
         json_data["detail_text"] = detail_text
         json_data["level"] = level
         json_data["date"] = datetime.now()
+        return json_data
+
+    def create_entry(self, info_text, detail_text="", level=INFO, stack=False):
+        json_data = self.get_entry_json(info_text, detail_text=detail_text, level=level)
 
         self.connection.applogging.insert_json_data(json_data)
 
         self.cleanup_overflow()
 
-    def cleanup_overflow(self):
+    def cleanup_overflow(self, applogging=None):
         """
-        Cleans up
+        Removes the oldest entries over the limit, with one DELETE.
+        @param applogging Reflected table, which is used. Table of connection if None
+        @returns number of removed entries
         """
-        count_elements = self.connection.applogging.count()
-        if count_elements > AppLogging.get_max_log_entries():
-            diff = count_elements - AppLogging.get_max_log_entries()
+        if applogging is None:
+            applogging = self.connection.applogging
 
-            rows = self.connection.applogging.get_where(order_by=[self.connection.applogging.get_table().c.date.asc()], limit=diff)
-            for row in rows:
-                self.connection.applogging.delete(id=row.id)
+        table = applogging.get_table()
+
+        # id of the oldest entry which is kept. None if there are not enough entries
+        oldest_kept_id = (
+            select(table.c.id)
+            .order_by(table.c.id.desc())
+            .offset(AppLogging.get_max_log_entries() - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+        result = applogging.connection.execute(delete(table).where(table.c.id < oldest_kept_id))
+        applogging.connection.commit()
+        return result.rowcount
 
     def get_max_log_entries():
         return 2000
@@ -83,3 +109,162 @@ class AppLogging(BaseTable):
         detail_text = error_text + "\n" + stack_string
 
         self.create_entry(info_text, detail_text=detail_text, level=AppLogging.ERROR, stack=stack)
+
+
+class BufferedAppLogging(AppLogging):
+    """
+    Entries are kept in memory, and written together, with one commit.
+    Buffer is written when it is full, when entry has flush_level,
+    or by timer, max_delay after the first entry was buffered.
+    SQLAlchemy connection is not thread safe, timer writes with its own connection.
+    In-memory DB has only one connection, it is written only by callers.
+    Entries which could not be written are kept in buffer.
+    Call flush, or close when done.
+    """
+
+    def __init__(self, connection, max_entries=100, max_delay=5, flush_level=AppLogging.ERROR):
+        """
+        @param max_entries Buffer is written if it has that many entries
+        @param max_delay Seconds after which buffer is written
+        @param flush_level Entries of this level, or higher, are written immediately
+        """
+        super().__init__(connection)
+        self.max_entries = max_entries
+        self.max_delay = max_delay
+        self.flush_level = flush_level
+
+        self.lock = threading.Lock()
+        # only one thread writes entries at a time
+        self.flush_lock = threading.Lock()
+        self.entries = []
+        self.first_entry_time = None
+        self.timer = None
+        self.use_timer = getattr(connection, "db_file", None) != MEMORY_DB
+
+    def create_entry(self, info_text, detail_text="", level=AppLogging.INFO, stack=False):
+        json_data = self.get_entry_json(info_text, detail_text=detail_text, level=level)
+
+        with self.lock:
+            if not self.entries:
+                self.first_entry_time = time.time()
+            self.entries.append(json_data)
+            if self.timer is None and self.use_timer:
+                self.start_timer(self.first_entry_time + self.max_delay - time.time())
+
+        if self.is_flush_needed(level):
+            self.flush()
+
+    def start_timer(self, delay):
+        """
+        Called with lock held
+        """
+        self.stop_timer()
+        self.timer = threading.Timer(max(0, delay), self.on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop_timer(self):
+        """
+        Called with lock held
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def on_timer(self):
+        with self.lock:
+            if self.timer is threading.current_thread():
+                self.timer = None
+
+        try:
+            with self.connection.engine.connect() as connection:
+                applogging = ReflectedGenericTable(
+                    engine=self.connection.engine, connection=connection, table_name="applogging"
+                )
+                self.flush(applogging)
+        except Exception:
+            logger.exception("Cannot write buffered log entries")
+
+    def is_flush_needed(self, level=AppLogging.INFO):
+        if level >= self.flush_level:
+            return True
+
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                return True
+            if self.first_entry_time and time.time() - self.first_entry_time >= self.max_delay:
+                return True
+
+        return False
+
+    def flush(self, applogging=None):
+        """
+        @param applogging Reflected table, which is used. Table of connection if None
+        @returns number of written entries
+        """
+        if applogging is None:
+            applogging = self.connection.applogging
+
+        with self.flush_lock:
+            with self.lock:
+                entries = self.entries
+                first_entry_time = self.first_entry_time
+                self.entries = []
+                self.first_entry_time = None
+                self.stop_timer()
+
+            if not entries:
+                return 0
+
+            try:
+                applogging.insert_json_data_many(entries)
+            except Exception:
+                with self.lock:
+                    # entries which came during write are after the old ones
+                    self.entries = entries + self.entries
+                    self.first_entry_time = first_entry_time
+                    # write is retried later
+                    if self.use_timer:
+                        self.start_timer(self.max_delay)
+                raise
+
+            self.cleanup_overflow(applogging)
+            return len(entries)
+
+    def close(self):
+        with self.lock:
+            self.stop_timer()
+        self.flush()
+
+
+class AppLoggingHandler(logging.Handler):
+    """
+    Handler of logging module, which writes records with AppLogging, or BufferedAppLogging
+    """
+
+    def __init__(self, app_logging, level=logging.NOTSET):
+        super().__init__(level)
+        self.app_logging = app_logging
+
+    def emit(self, record):
+        # failures of writing entries are not written again
+        if record.name == __name__:
+            return
+
+        try:
+            detail_text = ""
+            if record.exc_info:
+                detail_text = self.format(record)
+
+            # logging levels have the same values as AppLogging levels
+            self.app_logging.create_entry(record.getMessage(), detail_text=detail_text, level=record.levelno)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if hasattr(self.app_logging, "flush"):
+            self.app_logging.flush()
+
+    def close(self):
+        self.flush()
+        super().close()
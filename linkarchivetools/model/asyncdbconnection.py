@@ -0,0 +1,68 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from linkarchivetools.utils.asyncreflected import (
+   AsyncReflectedEntryTable,
+   AsyncReflectedSourceTable,
+   AsyncReflectedSourceOperationalData,
+   AsyncReflectedGenericTable,
+   AsyncReflectedSocialData,
+)
+
+
+class AsyncDbConnection(object):
+    """
+    Async counterpart of DbConnection. Requires aiosqlite.
+
+    Table attributes are the same as in DbConnection, but their methods are coroutines.
+    Connections are taken from the engine pool for every call.
+    """
+
+    def __init__(self, db_file, timeout=30):
+        """
+        @param timeout How many seconds write waits for a locked database
+        """
+        self.db_file = db_file
+
+        self.engine = AsyncDbConnection.create_engine(self.db_file, timeout=timeout)
+
+        self.entries_table = AsyncReflectedEntryTable(engine=self.engine)
+        self.sources_table = AsyncReflectedSourceTable(engine=self.engine)
+
+        self.configurationentry = AsyncReflectedGenericTable(engine=self.engine, table_name="configurationentry")
+        self.applogging = AsyncReflectedGenericTable(engine=self.engine, table_name="applogging")
+        self.backgroundjob = AsyncReflectedGenericTable(engine=self.engine, table_name="backgroundjob")
+        self.backgroundjobhistory = AsyncReflectedGenericTable(engine=self.engine, table_name="backgroundjobhistory")
+        self.blockentry = AsyncReflectedGenericTable(engine=self.engine, table_name="blockentry")
+        self.blockentrylist = AsyncReflectedGenericTable(engine=self.engine, table_name="blockentrylist")
+
+        self.entry_rules = AsyncReflectedGenericTable(engine=self.engine, table_name="entryrules")
+        self.readlater = AsyncReflectedGenericTable(engine=self.engine, table_name="readlater")
+        self.searchview = AsyncReflectedGenericTable(engine=self.engine, table_name="searchview")
+        self.socialdata = AsyncReflectedSocialData(engine=self.engine)
+
+        self.sourceoperationaldata = AsyncReflectedSourceOperationalData(engine=self.engine)
+        self.usertags = AsyncReflectedGenericTable(engine=self.engine, table_name="usertags")
+        self.compactedtags = AsyncReflectedGenericTable(engine=self.engine, table_name="compactedtags")
+        self.usercompactedtags = AsyncReflectedGenericTable(engine=self.engine, table_name="usercompactedtags")
+        self.entrycompactedtags = AsyncReflectedGenericTable(engine=self.engine, table_name="entrycompactedtags")
+        self.uservotes = AsyncReflectedGenericTable(engine=self.engine, table_name="uservotes")
+        self.modelfiles = AsyncReflectedGenericTable(engine=self.engine, table_name="modelfiles")
+
+    def create_engine(db_file, timeout=30):
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{db_file}", connect_args={"timeout": timeout}
+        )
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_sqlite_pragma(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL;")
+            cursor.close()
+
+        return engine
+
+    async def close(self):
+        if self.engine:
+            await self.engine.dispose()
+            self.engine = None
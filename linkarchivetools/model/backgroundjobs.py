@@ -1,9 +1,37 @@
 from datetime import datetime
-from sqlalchemy import and_
+from sqlalchemy import and_, case, select, insert, update, delete, text, tuple_
 import json
 from .basetable import BaseTable
 
 
+# (index name, columns)
+BACKGROUND_JOB_INDEXES = [
+    ("idx_backgroundjob_enabled_priority_date_created", ["enabled", "priority", "date_created"]),
+    ("idx_backgroundjob_job_subject", ["job", "subject"]),
+]
+
+
+def get_job_args_text(args="", cfg=None):
+    args_text = args
+    if args_text == "" and cfg:
+        args_text = json.dumps(cfg)
+    return args_text
+
+
+def get_job_json(job_name, subject, args_text):
+    json_data = {}
+    json_data["job"] = job_name
+    json_data["task"] = ""
+    json_data["subject"] = subject
+    json_data["args"] = args_text
+    json_data["priority"] = 1
+    json_data["errors"] = 0
+    json_data["enabled"] = True
+    json_data["date_created"] = datetime.now()
+    json_data["user_id"] = 0
+    return json_data
+
+
 class BackgroundJob(BaseTable):
     JOB_PROCESS_SOURCE = "process-source"
     JOB_LINK_ADD = "link-add"
@@ -45,24 +73,11 @@ class BackgroundJob(BaseTable):
         self.set_table("backgroundjob")
 
     def create_single_job(self, job_name, subject="", args="", user=None, cfg=None):
-
-        args_text = args
-        if args_text == "" and cfg:
-            args_text = json.dumps(cfg)
+        args_text = get_job_args_text(args, cfg)
 
         is_job = self.is_job(job_name=job_name, subject=subject)
         if not is_job:
-            json_data = {}
-            json_data["job"] = job_name
-            json_data["task"] = ""
-            json_data["subject"] = subject
-            json_data["args"] = args_text
-            json_data["priority"] = 1
-            json_data["errors"] = 0
-            json_data["enabled"] = True
-            json_data["date_created"] = datetime.now()
-            json_data["user_id"] = 0
-
+            json_data = get_job_json(job_name, subject, args_text)
             return self.connection.backgroundjob.insert_json_data(json_data)
 
     def is_job(self, job_name, subject=None):
@@ -73,7 +88,7 @@ class BackgroundJob(BaseTable):
         else:
             conditions = and_(table.c.job==job_name)
 
-        jobs = self.connection.backgroundjob.get_where_ex(conditions=conditions)
+        jobs = self.connection.backgroundjob.get_where_ex(conditions=conditions, limit=1)
         for job in jobs:
             return True
 
@@ -82,6 +97,173 @@ class BackgroundJob(BaseTable):
     def get(self, id):
         return self.connection.backgroundjob.get(id=id)
 
+    def execute(self, stmt, parameters=None):
+        return self.connection.backgroundjob.connection.execute(stmt, parameters)
+
+    def commit(self):
+        self.connection.backgroundjob.connection.commit()
+
+    def create_indexes(self):
+        """
+        Indexes used by queue. Tables of older DBs do not have them, call it once before use
+        """
+        for index_name, column_names in BACKGROUND_JOB_INDEXES:
+            columns = ", ".join(column_names)
+            self.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON backgroundjob ({columns})"))
+        self.commit()
+
+    def enqueue_many(self, jobs, skip_existing=True):
+        """
+        @param jobs list of dicts with job, subject, and optional args, cfg, priority
+        @param skip_existing Jobs with the same job, and subject as queued job are not added
+        @returns number of added jobs
+        """
+        table = self.connection.backgroundjob.get_table()
+
+        rows = []
+        keys = set()
+        for job in jobs:
+            subject = job.get("subject", "")
+            args_text = get_job_args_text(job.get("args", ""), job.get("cfg"))
+
+            key = (job["job"], subject)
+            if skip_existing and key in keys:
+                continue
+            keys.add(key)
+
+            json_data = get_job_json(job["job"], subject, args_text)
+            if "priority" in job:
+                json_data["priority"] = job["priority"]
+            rows.append(json_data)
+
+        if skip_existing and rows:
+            existing = set()
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                stmt = select(table.c.job, table.c.subject).where(
+                    tuple_(table.c.job, table.c.subject).in_(key_list[start:start + 500])
+                )
+                existing.update(tuple(row) for row in self.execute(stmt))
+
+            rows = [row for row in rows if (row["job"], row["subject"]) not in existing]
+
+        return self.connection.backgroundjob.insert_json_data_many(rows)
+
+    def get_queue_order(self, table):
+        """
+        Lower priority value is processed first, then the oldest
+        """
+        return [table.c.priority.asc(), table.c.date_created.asc(), table.c.id.asc()]
+
+    def claim(self, n, worker_id):
+        """
+        Marks jobs as taken by worker: disabled, with worker id in task.
+        Jobs are selected, and marked by one UPDATE ... RETURNING.
+        On PostgreSQL rows locked by other workers are skipped.
+        @returns list of claimed jobs, in queue order
+        """
+        table = self.connection.backgroundjob.get_table()
+
+        ids = (
+            select(table.c.id)
+            .where(table.c.enabled == True)
+            .order_by(*self.get_queue_order(table))
+            .limit(n)
+            .with_for_update(skip_locked=True)
+        )
+
+        values = {"enabled": False, "task": str(worker_id)}
+
+        if self.connection.engine.dialect.update_returning:
+            stmt = update(table).where(table.c.id.in_(ids)).values(**values).returning(*table.c)
+            rows = list(self.execute(stmt))
+            self.commit()
+        else:
+            # SQLite older than 3.35. Jobs claimed by others in the meantime are not updated
+            claimed_ids = [row.id for row in self.execute(ids)]
+            stmt = update(table).where(table.c.id.in_(claimed_ids), table.c.enabled == True).values(**values)
+            self.execute(stmt)
+            self.commit()
+
+            stmt = select(table).where(table.c.id.in_(claimed_ids), table.c.task == str(worker_id))
+            rows = list(self.execute(stmt))
+
+        order = {row.id: (row.priority, row.date_created or datetime.min, row.id) for row in rows}
+        return sorted(rows, key=lambda row: order[row.id])
+
+    def move_to_history(self, job_ids):
+        """
+        @returns number of moved jobs
+        """
+        table = self.connection.backgroundjob.get_table()
+        history_table = self.connection.backgroundjobhistory.get_table()
+
+        rows = list(self.execute(select(table.c.job, table.c.subject).where(table.c.id.in_(job_ids))))
+        if rows:
+            date_created = datetime.now()
+            self.execute(
+                insert(history_table),
+                [{"job": row.job, "subject": row.subject, "date_created": date_created} for row in rows],
+            )
+        self.execute(delete(table).where(table.c.id.in_(job_ids)))
+        self.commit()
+
+        return len(rows)
+
+    def complete(self, job_ids):
+        """
+        @param job_ids id, or list of ids of claimed jobs
+        """
+        if isinstance(job_ids, int):
+            job_ids = [job_ids]
+        return self.move_to_history(job_ids)
+
+    def fail(self, job_ids, max_errors=3):
+        """
+        Failed jobs are queued again, until they fail max_errors times. Then they are moved to history.
+        @returns number of jobs moved to history
+        """
+        if isinstance(job_ids, int):
+            job_ids = [job_ids]
+
+        table = self.connection.backgroundjob.get_table()
+
+        self.execute(
+            update(table)
+            .where(table.c.id.in_(job_ids))
+            .values(
+                errors=table.c.errors + 1,
+                enabled=case((table.c.errors + 1 < max_errors, True), else_=False),
+                task="",
+            )
+        )
+        self.commit()
+
+        failed_ids = [
+            row.id for row in self.execute(
+                select(table.c.id).where(table.c.id.in_(job_ids), table.c.errors >= max_errors)
+            )
+        ]
+        if not failed_ids:
+            return 0
+
+        return self.move_to_history(failed_ids)
+
+    def release(self, worker_id):
+        """
+        Queues again jobs claimed by worker, for example after it was stopped
+        @returns number of released jobs
+        """
+        table = self.connection.backgroundjob.get_table()
+
+        result = self.execute(
+            update(table)
+            .where(table.c.enabled == False, table.c.task == str(worker_id))
+            .values(enabled=True, task="")
+        )
+        self.commit()
+        return result.rowcount
+
     def get_cfg(id, self):
         job = self.get(id)
         if job:
@@ -94,3 +276,33 @@ class BackgroundJob(BaseTable):
                 except TypeError as E:
                     pass
             return cfg
+
+
+class AsyncBackgroundJob(object):
+    """
+    BackgroundJob for AsyncDbConnection
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def create_single_job(self, job_name, subject="", args="", user=None, cfg=None):
+        args_text = get_job_args_text(args, cfg)
+
+        is_job = await self.is_job(job_name=job_name, subject=subject)
+        if not is_job:
+            json_data = get_job_json(job_name, subject, args_text)
+            return await self.connection.backgroundjob.insert_json_data(json_data)
+
+    async def is_job(self, job_name, subject=None):
+        table = await self.connection.backgroundjob.get_table()
+
+        if subject:
+            conditions = and_(table.c.job==job_name, table.c.subject==subject)
+        else:
+            conditions = and_(table.c.job==job_name)
+
+        return await self.connection.backgroundjob.exists_where([conditions])
+
+    async def get(self, id):
+        return await self.connection.backgroundjob.get(id=id)
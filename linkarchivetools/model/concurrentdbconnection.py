@@ -0,0 +1,319 @@
+"""
+DbConnection for many threads: pool of readers, and one serialized writer.
+
+ - reads are run with connections from engine pool, in WAL mode they do not wait for writer
+ - writes are put into queue, and applied by one writer thread.
+   Writes waiting in queue are committed together, in one transaction (group commit).
+   Every write is run in its own savepoint, failing write does not affect others.
+
+Write call returns when its transaction was committed. Reads after write see its result.
+Results of reads are buffered, connection is returned to pool before rows are processed.
+"""
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.elements import TextClause
+
+from linkarchivetools.utils.engineregistry import get_engine_registry, MEMORY_DB
+from .dbconnection import set_reflected_tables
+
+
+READ_PREFIXES = ("SELECT", "WITH", "EXPLAIN")
+
+
+def is_read_statement(statement):
+    if isinstance(statement, TextClause):
+        return statement.text.lstrip().upper().startswith(READ_PREFIXES)
+    return getattr(statement, "is_select", False)
+
+
+class WriteResult(object):
+    """
+    Result of write, available after commit.
+    Rows returned by statement, for example by RETURNING, are buffered
+    """
+
+    def __init__(self, rowcount, result=None, latency_s=0):
+        self.rowcount = rowcount
+        self.result = result
+        self.latency_s = latency_s
+
+    def __getattr__(self, name):
+        result = self.__dict__.get("result")
+        if result is None:
+            raise AttributeError(f"Write does not return rows: {name}")
+        return getattr(result, name)
+
+    def __iter__(self):
+        if self.result is None:
+            return iter([])
+        return iter(self.result)
+
+
+class WriteRequest(object):
+    def __init__(self, statement, parameters=None):
+        self.statement = statement
+        self.parameters = parameters
+        self.future = Future()
+        self.time_queued = time.time()
+
+
+class SerializedWriter(object):
+    FINISHED = None
+
+    def __init__(self, db_file, batch_size=100, max_delay=0, timeout=30):
+        """
+        @param batch_size Max number of writes committed together
+        @param max_delay How many seconds writer waits for more writes before commit.
+               With 0 writes which came during previous commit are grouped
+        @param timeout How many seconds writer waits for a locked database
+        """
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+
+        self.engine = SerializedWriter.create_engine(db_file, timeout)
+
+        self.queue = queue.Queue()
+        self.thread = None
+        # exception which stopped writer thread
+        self.error = None
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=10000)
+        self.writes = 0
+        self.errors = 0
+        self.commits = 0
+
+    def create_engine(db_file, timeout=30):
+        engine = create_engine(
+            f"sqlite:///{db_file}",
+            poolclass=NullPool,
+            connect_args={"check_same_thread": False, "timeout": timeout},
+        )
+
+        # driver does not start transactions on its own, savepoints work
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragma(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL;")
+            cursor.close()
+
+        @event.listens_for(engine, "begin")
+        def do_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        return engine
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, statement, parameters=None):
+        """
+        Waits until write is committed
+        @returns WriteResult
+        """
+        if self.thread is None:
+            raise RuntimeError("Writer is not running")
+        self.check_running()
+
+        request = WriteRequest(statement, parameters)
+        self.queue.put(request)
+
+        while True:
+            try:
+                return request.future.result(timeout=0.5)
+            except TimeoutError:
+                # request could be put after writer failed, it would never be processed
+                self.check_running()
+
+    def check_running(self):
+        if self.error is not None:
+            raise RuntimeError(f"Writer failed: {self.error}") from self.error
+        if not self.thread.is_alive():
+            raise RuntimeError("Writer thread is not running")
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        self.queue.put(SerializedWriter.FINISHED)
+        self.thread.join()
+        self.thread = None
+        self.engine.dispose()
+
+    def get_batch(self):
+        """
+        @returns list of requests, and flag if writer was stopped
+        """
+        request = self.queue.get()
+        if request is SerializedWriter.FINISHED:
+            return [], True
+
+        requests = [request]
+        deadline = time.time() + self.max_delay
+
+        while len(requests) < self.batch_size:
+            try:
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    request = self.queue.get(timeout=remaining)
+                else:
+                    request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if request is SerializedWriter.FINISHED:
+                return requests, True
+            requests.append(request)
+
+        return requests, False
+
+    def run(self):
+        try:
+            with self.engine.connect() as connection:
+                while True:
+                    requests, finished = self.get_batch()
+                    if requests:
+                        self.write(connection, requests)
+                    if finished:
+                        break
+        except Exception as E:
+            print(f"Writer failed: {E}")
+            self.error = E
+            self.fail_queued_requests()
+
+    def fail_queued_requests(self):
+        """
+        Writer is dead, requests waiting in queue will not be written
+        """
+        while True:
+            try:
+                request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if request is not SerializedWriter.FINISHED and not request.future.done():
+                request.future.set_exception(RuntimeError(f"Writer failed: {self.error}"))
+
+    def write(self, connection, requests):
+        results = []
+        try:
+            with connection.begin():
+                for request in requests:
+                    try:
+                        with connection.begin_nested():
+                            result = connection.execute(request.statement, request.parameters)
+                            rows = result.freeze()() if result.returns_rows else None
+                            results.append(WriteResult(result.rowcount, rows))
+                    except Exception as E:
+                        results.append(E)
+        except Exception as E:
+            # commit failed, nothing was written
+            results = [E] * len(requests)
+
+        now = time.time()
+
+        with self.lock:
+            self.commits += 1
+            for request, result in zip(requests, results):
+                latency_s = now - request.time_queued
+                self.latencies.append(latency_s)
+                self.writes += 1
+                if isinstance(result, Exception):
+                    self.errors += 1
+
+        for request, result in zip(requests, results):
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                result.latency_s = now - request.time_queued
+                request.future.set_result(result)
+
+    def get_statistics(self):
+        """
+        @returns dict with number of writes, errors, commits, and write latency in seconds
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+            statistics = {
+                "writes": self.writes,
+                "errors": self.errors,
+                "commits": self.commits,
+            }
+
+        if latencies:
+            statistics["avg_latency_s"] = sum(latencies) / len(latencies)
+            statistics["p95_latency_s"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            statistics["max_latency_s"] = latencies[-1]
+
+        return statistics
+
+
+class ConcurrentConnectionProxy(object):
+    """
+    Used by Reflected tables in place of SQLAlchemy connection
+    """
+
+    def __init__(self, read_engine, writer):
+        self.read_engine = read_engine
+        self.writer = writer
+
+    def execute(self, statement, parameters=None):
+        if is_read_statement(statement):
+            with self.read_engine.connect() as connection:
+                return connection.execute(statement, parameters).freeze()()
+
+        return self.writer.submit(statement, parameters)
+
+    def commit(self):
+        """
+        Writes are committed before execute returns
+        """
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConcurrentDbConnection(object):
+    """
+    DbConnection, which can be used by many threads at the same time.
+    Table attributes are the same as in DbConnection. Only DB files are supported.
+    """
+
+    def __init__(self, db_file, profile="default", batch_size=100, max_delay=0, timeout=30):
+        """
+        @param profile Pooling profile of readers, from engine registry
+        """
+        if db_file == MEMORY_DB:
+            raise ValueError("ConcurrentDbConnection requires DB file")
+
+        self.db_file = db_file
+
+        self.engine = get_engine_registry().get_engine(db_file, profile)
+
+        self.writer = SerializedWriter(db_file, batch_size=batch_size, max_delay=max_delay, timeout=timeout)
+        self.writer.start()
+
+        # readers do not keep transaction open, every read sees latest commit
+        read_engine = self.engine.execution_options(isolation_level="AUTOCOMMIT")
+        self.connection = ConcurrentConnectionProxy(read_engine, self.writer)
+
+        set_reflected_tables(self, self.engine, self.connection)
+
+    def get_write_statistics(self):
+        return self.writer.get_statistics()
+
+    def close(self):
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
@@ -1,4 +1,3 @@
-from sqlalchemy import create_engine
 from sqlalchemy import (
     text,
 )
@@ -13,13 +12,45 @@ from linkarchivetools.utils.reflected import (
    ReflectedGenericTable,
    ReflectedSocialData,
 )
+from linkarchivetools.utils.engineregistry import get_engine_registry
+
+
+def set_reflected_tables(db, engine, connection):
+    """
+    Sets table attributes, which are used by model classes
+    """
+    db.entries_table = ReflectedEntryTable(engine=engine, connection=connection)
+    db.sources_table = ReflectedSourceTable(engine=engine, connection=connection)
+
+    db.configurationentry = ReflectedConfigurationEntry(engine=engine, connection=connection)
+    db.applogging = ReflectedGenericTable(engine=engine, connection=connection, table_name="applogging")
+    db.backgroundjob = ReflectedGenericTable(engine=engine, connection=connection, table_name="backgroundjob")
+    db.backgroundjobhistory = ReflectedGenericTable(engine=engine, connection=connection, table_name="backgroundjobhistory")
+    db.blockentry = ReflectedGenericTable(engine=engine, connection=connection, table_name="blockentry")
+    db.blockentrylist = ReflectedGenericTable(engine=engine, connection=connection, table_name="blockentrylist")
+
+    db.entry_rules = ReflectedEntryRules(engine=engine, connection=connection)
+    db.readlater = ReflectedGenericTable(engine=engine, connection=connection, table_name="readlater")
+    db.searchview = ReflectedGenericTable(engine=engine, connection=connection, table_name="searchview")
+    db.socialdata = ReflectedSocialData(engine=engine, connection=connection)
+
+    db.sourceoperationaldata = ReflectedSourceOperationalData(engine=engine, connection=connection)
+    db.usertags = ReflectedGenericTable(engine=engine, connection=connection, table_name="usertags")
+    db.compactedtags = ReflectedGenericTable(engine=engine, connection=connection, table_name="compactedtags")
+    db.usercompactedtags = ReflectedGenericTable(engine=engine, connection=connection, table_name="usercompactedtags")
+    db.entrycompactedtags = ReflectedGenericTable(engine=engine, connection=connection, table_name="entrycompactedtags")
+    db.uservotes = ReflectedGenericTable(engine=engine, connection=connection, table_name="uservotes")
+    db.modelfiles = ReflectedGenericTable(engine=engine, connection=connection, table_name="modelfiles")
 
 
 class DbConnection(object):
-    def __init__(self, db_file):
+    def __init__(self, db_file, profile="default"):
+        """
+        @param profile Pooling profile of engine registry. ":memory:" uses StaticPool
+        """
         self.db_file = db_file
 
-        self.engine = DbConnection.create_engine(self.db_file)
+        self.engine = DbConnection.create_engine(self.db_file, profile)
 
         self.connection = self.engine.connect()
 
@@ -27,32 +58,13 @@ class DbConnection(object):
         self.connection.execute(text(sql_text))
         self.connection.commit()
 
-        self.entries_table = ReflectedEntryTable(engine=self.engine, connection=self.connection)
-        self.sources_table = ReflectedSourceTable(engine=self.engine, connection=self.connection)
-
-        self.configurationentry = ReflectedConfigurationEntry(engine=self.engine, connection=self.connection)
-        self.applogging = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="applogging")
-        self.backgroundjob = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="backgroundjob")
-        self.backgroundjobhistory = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="backgroundjobhistory")
-        self.blockentry = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="blockentry")
-        self.blockentrylist = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="blockentrylist")
-
-        self.entry_rules = ReflectedEntryRules(engine=self.engine, connection=self.connection)
-        self.readlater = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="readlater")
-        self.searchview = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="searchview")
-        self.socialdata = ReflectedSocialData(engine=self.engine, connection=self.connection)
-
-        self.sourceoperationaldata = ReflectedSourceOperationalData(engine=self.engine, connection=self.connection)
-        self.usertags = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="usertags")
-        self.compactedtags = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="compactedtags")
-        self.usercompactedtags = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="usercompactedtags")
-        self.entrycompactedtags = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="entrycompactedtags")
-        self.uservotes = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="uservotes")
-        self.modelfiles = ReflectedGenericTable(engine=self.engine, connection=self.connection, table_name="modelfiles")
-
-    def create_engine(db_file):
-        engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
-        return engine
+        set_reflected_tables(self, self.engine, self.connection)
+
+    def create_engine(db_file, profile="default"):
+        """
+        Engines are shared. Opening DB which was already used reuses its pool, and reflected tables
+        """
+        return get_engine_registry().get_engine(db_file, profile)
 
     def truncate(self):
         self.entries_table.truncate()
@@ -18,6 +18,7 @@ from sqlalchemy import (
     DateTime,
     LargeBinary,
     Time,
+    Index,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import timedelta, datetime, timezone
@@ -52,6 +53,10 @@ class AppLogging(Base):
 
 class BackgroundJob(Base):
     __tablename__ = "backgroundjob"
+    __table_args__ = (
+        Index("idx_backgroundjob_enabled_priority_date_created", "enabled", "priority", "date_created"),
+        Index("idx_backgroundjob_job_subject", "job", "subject"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
@@ -330,6 +335,20 @@ class SearchView(Base):
     user: Mapped[bool] = mapped_column(default=False)
 
 
+class SearchViewEntries(Base):
+    """
+    Materialized search view. Entry ids matching search view filter
+    """
+    __tablename__ = "searchviewentries"
+    __table_args__ = (
+        Index("idx_searchviewentries_view_id_entry_id", "view_id", "entry_id", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    view_id: Mapped[int]
+    entry_id: Mapped[int]
+
+
 class SocialData(Base):
     __tablename__ = "socialdata"
 
@@ -457,6 +476,33 @@ class EntryVisitHistory(Base):
     entry_id: Mapped[Optional[int]] = mapped_column()
 
 
+class Watermark(Base):
+    """
+    Progress of incremental processing. Which id, date was processed last time
+    """
+    __tablename__ = "watermark"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(1000), unique=True)
+    last_id: Mapped[Optional[int]] = mapped_column()
+    date = mapped_column(DateTime, nullable=True)
+
+
+class FeedDiscoveryCache(Base):
+    """
+    Feeds found for link. Link is stored as hash
+    """
+    __tablename__ = "feeddiscoverycache"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    link_hash: Mapped[str] = mapped_column(String(64), unique=True)
+    feeds: Mapped[Optional[str]]
+    status_code: Mapped[Optional[int]] = mapped_column()
+    date_fetched = mapped_column(DateTime, nullable=True)
+    # how feeds were read. Data read in other mode is not used
+    fetch_mode: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+
+
 def create_tables(engine):
     # Create tables if they don't exist
     Base.metadata.create_all(engine)
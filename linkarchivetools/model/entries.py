@@ -1,8 +1,31 @@
 from datetime import datetime
+from linkarchivetools.utils.reflected import ReflectedTable
 from .socialdata import SocialData
 from .basetable import BaseTable
 
 
+def prepare_entry_json(entry_json, source=None):
+    """
+    Removes crawler properties, which are not entry columns
+    """
+    if source:
+        entry_json["source_url"] = source.url
+        entry_json["source_id"] = source.id
+
+    if "source" in entry_json:
+        del entry_json["source"]
+    if "feed_entry" in entry_json:
+        del entry_json["feed_entry"]
+    if "link_canonical" in entry_json:
+        del entry_json["link_canonical"]
+    if "tags" in entry_json:
+        del entry_json["tags"]
+
+    entry_json["date_created"] = datetime.now()
+
+    return entry_json
+
+
 class Entries(BaseTable):
     def __init__(self, connection):
         self.connection = connection
@@ -12,20 +35,7 @@ class Entries(BaseTable):
         if self.connection.entries_table.exists(link=entry_json["link"]):
             return
 
-        if source:
-            entry_json["source_url"] = source.url
-            entry_json["source_id"] = source.id
-
-        if "source" in entry_json:
-            del entry_json["source"]
-        if "feed_entry" in entry_json:
-            del entry_json["feed_entry"]
-        if "link_canonical" in entry_json:
-            del entry_json["link_canonical"]
-        if "tags" in entry_json:
-            del entry_json["tags"]
-
-        entry_json["date_created"] = datetime.now()
+        prepare_entry_json(entry_json, source)
 
         try:
             entry_id = self.connection.entries_table.insert_json(entry_json)
@@ -55,12 +65,40 @@ class Entries(BaseTable):
         self.connection.entries_table.delete_where(conditions)
 
     def cleanup(self):
-        ids_to_remove = set()
-        for entry in self.connection.entries_table.get_where():
-            if entry.source_id is not None:
-                if not self.connection.sources_table.get(id=entry.source_id):
-                    ids_to_remove.add(entry.id)
+        """
+        Removes entries of sources which do not exist
+        """
+        table = ReflectedTable(self.connection.engine, self.connection.connection)
+        table.delete_orphans("linkdatamodel", "source_id", parent_table_name="sourcedatamodel")
+
+
+class AsyncEntries(object):
+    """
+    Entries for AsyncDbConnection
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def add(self, entry_json, source=None):
+        if await self.connection.entries_table.exists(link=entry_json["link"]):
+            return
+
+        prepare_entry_json(entry_json, source)
+
+        try:
+            entry_id = await self.connection.entries_table.insert_json(entry_json)
+            return entry_id
+        except Exception as E:
+            print(E)
+            print(entry_json)
+            raise
+
+    async def get(self, id):
+        return await self.connection.entries_table.get(id=id)
 
-        for id in ids_to_remove:
-            self.connection.entries_table.delete(id=id)
+    async def exists(self, link=None):
+        return await self.connection.entries_table.exists(link=link)
 
+    async def count(self):
+        return await self.connection.entries_table.count()
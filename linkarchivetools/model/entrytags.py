@@ -1,3 +1,4 @@
+from linkarchivetools.utils.reflected import ReflectedTable
 from .basetable import BaseTable
 
 class EntryTags(BaseTable):
@@ -51,7 +52,8 @@ class EntryTags(BaseTable):
             self.connection.entrycompactedtags.insert_json_data(json_data)
 
     def cleanup(self):
-        compacted_tags = self.connection.entrycompactedtags.get_where({})
-        for compacted_tag in compacted_tags:
-            if self.connection.entries_table.get(compacted_tag.entry_id) is None:
-                self.connection.entrycompactedtags.delete(compacted_tag.id)
+        """
+        Removes tags of entries which do not exist
+        """
+        table = ReflectedTable(self.connection.engine, self.connection.connection)
+        table.delete_orphans("entrycompactedtags", "entry_id")
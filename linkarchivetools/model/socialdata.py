@@ -2,6 +2,7 @@ import json
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from linkarchivetools.utils.reflected import ReflectedTable
 from .basetable import BaseTable
 
 
@@ -44,9 +45,8 @@ class SocialData(BaseTable):
         self.connection.socialdata.delete_where({"entry_id" : entry_id})
 
     def cleanup(self):
-        social_data_container = self.connection.socialdata.get_where({})
-        # TODO  cannot import entries
-        #for social_data in social_data_container:
-        #    entry = Entries.get(id=social_data.entry_id)
-        #    if not entry:
-        #        self.connection.socialdata.delete(id=social_data.id)
+        """
+        Removes social data of entries which do not exist
+        """
+        table = ReflectedTable(self.connection.engine, self.connection.connection)
+        table.delete_orphans("socialdata", "entry_id")
@@ -1,9 +1,27 @@
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
+from linkarchivetools.utils.reflected import ReflectedTable
 from .basetable import BaseTable
 
 
+def is_fetch_period_passed(source, source_data, default_fetch_period_s):
+    """
+    @param source_data operational data of source, None if source was never fetched
+    """
+    if not source_data or not source_data.date_fetched:
+        return True
+
+    fetch_period_s = default_fetch_period_s
+    if source.fetch_period and source.fetch_period > 0:
+        fetch_period_s = source.fetch_period
+
+    if datetime.now() - source_data.date_fetched < timedelta(seconds=fetch_period_s):
+        return False
+
+    return True
+
+
 class SourceData(BaseTable):
     def __init__(self, connection, default_fetch_period_s=3600):
         self.connection = connection
@@ -53,17 +71,7 @@ class SourceData(BaseTable):
             return False
 
         this_source_data = self.get_source_data(source)
-        if this_source_data:
-            date_fetched = this_source_data.date_fetched
-
-            fetch_period_s = self.default_fetch_period_s
-            if source.fetch_period > 0:
-                fetch_period_s = source.fetch_period
-
-            if datetime.now() - date_fetched < timedelta(seconds=fetch_period_s):
-                return False
-
-        return True
+        return is_fetch_period_passed(source, this_source_data, self.default_fetch_period_s)
 
     def get_update_seconds(self, source):
         this_source_data = self.get_source_data(source)
@@ -78,12 +86,28 @@ class SourceData(BaseTable):
         self.connection.sourceoperationaldata.delete_where({"source_obj_id" : source.id})
 
     def cleanup(self):
-        ids_to_remove = []
-        op_datas = self.connection.sourceoperationaldata.get_where()
-        for op_data in op_datas:
-            source = self.connection.sources_table.get(op_data.source_obj_id)
-            if not source:
-                ids_to_remove.append(op_data.id)
+        """
+        Removes operational data of sources which do not exist
+        """
+        table = ReflectedTable(self.connection.engine, self.connection.connection)
+        table.delete_orphans("sourceoperationaldata", "source_obj_id", parent_table_name="sourcedatamodel")
+
+
+class AsyncSourceData(object):
+    """
+    SourceData for AsyncDbConnection
+    """
+
+    def __init__(self, connection, default_fetch_period_s=3600):
+        self.connection = connection
+        self.default_fetch_period_s = default_fetch_period_s
+
+    async def get_source_data(self, source):
+        return await self.connection.sourceoperationaldata.get_for_source(source.id)
+
+    async def is_update_needed(self, source):
+        if not source.enabled:
+            return False
 
-        for id in ids_to_remove:
-            self.connection.sourceoperationaldata.delete(op_data.id)
+        this_source_data = await self.get_source_data(source)
+        return is_fetch_period_passed(source, this_source_data, self.default_fetch_period_s)
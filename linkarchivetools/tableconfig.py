@@ -187,3 +187,56 @@ def get_truncate_tables_internet():
         #"entrytransitionhistory",
     ]
     return tables
+
+
+def get_entry_dependent_tables():
+    """
+    Tables with rows pointing at entries. Table name, and entry column.
+    If column is None, it is detected (entry_id, entry_object_id, entry_object)
+    """
+    tables = [
+        ("entrycompactedtags", None),
+        ("socialdata", None),
+        ("readlater", None),
+        ("usertags", None),
+        ("uservotes", None),
+        ("usercomments", None),
+        ("userbookmarks", None),
+        ("userentryvisithistory", None),
+        ("userentrytransitionhistory", "entry_from_id"),
+        ("userentrytransitionhistory", "entry_to_id"),
+        ("entryvisithistory", None),
+        ("entrytransitionhistory", "entry_from_id"),
+        ("entrytransitionhistory", "entry_to_id"),
+        ("searchviewentries", None),
+    ]
+    return tables
+
+
+def get_table_dependencies():
+    """
+    Table order is important for restore. Table is restored after tables it points at.
+    Tables not listed here do not depend on other tables.
+    """
+    dependencies = {
+        "sourcesubcategories": ["sourcecategories"],
+        "sourcedatamodel": ["sourcecategories", "sourcesubcategories"],
+        "sourceoperationaldata": ["sourcedatamodel"],
+        "linkdatamodel": ["sourcedatamodel", "domains"],
+        "entrycompactedtags": ["linkdatamodel"],
+        "socialdata": ["linkdatamodel"],
+        "blockentry": ["blockentrylist"],
+        "searchviewentries": ["searchview", "linkdatamodel"],
+
+        "readlater": ["linkdatamodel"],
+        "usertags": ["linkdatamodel"],
+        "uservotes": ["linkdatamodel"],
+        "usercomments": ["linkdatamodel"],
+        "userbookmarks": ["linkdatamodel"],
+        "userentrytransitionhistory": ["linkdatamodel"],
+        "userentryvisithistory": ["linkdatamodel"],
+
+        "entryvisithistory": ["linkdatamodel"],
+        "entrytransitionhistory": ["linkdatamodel"],
+    }
+    return dependencies
@@ -1,4 +1,5 @@
-from sqlalchemy import and_, or_, not_, func, MetaData, Table, select
+import re
+from sqlalchemy import and_, or_, not_, func, MetaData, Table, select, inspect, literal, case, Boolean
 
 from .omnisearch import (
     SingleSymbolEvaluator,
@@ -20,18 +21,22 @@ class AlchemySymbolEvaluator(SingleSymbolEvaluator):
         # TODO make todo check if symbol exists in table?
 
         if condition_data[1] == "==":
+            column = self.table.c[condition_data[0]]
+            if isinstance(column.type, Boolean):
+                return column == self.get_boolean_value(condition_data[2])
             if self.ignore_case:
-                column = self.table.c[condition_data[0]]
                 return func.lower(column) == condition_data[2].lower()
             else:
-                return self.table.c[condition_data[0]] == condition_data[2]
+                return column == condition_data[2]
 
         if condition_data[1] == "!=":
+            column = self.table.c[condition_data[0]]
+            if isinstance(column.type, Boolean):
+                return column != self.get_boolean_value(condition_data[2])
             if self.ignore_case:
-                column = self.table.c[condition_data[0]]
                 return func.lower(column) != condition_data[2].lower()
             else:
-                return self.table.c[condition_data[0]] != condition_data[2]
+                return column != condition_data[2]
 
         if condition_data[1] == ">":
             return self.table.c[condition_data[0]] > condition_data[2]
@@ -56,6 +61,12 @@ class AlchemySymbolEvaluator(SingleSymbolEvaluator):
 
         raise IOError("Unsupported operator")
 
+    def get_boolean_value(self, value):
+        """
+        Boolean columns are stored as 0 and 1, text "True" would not match
+        """
+        return value.lower() in ("true", "1")
+
     def evaluate_simple_symbol(self, symbol):
         """
         TODO we could check by default if entry link == symbol, or sth
@@ -88,13 +99,161 @@ class AlchemyEquationEvaluator(EquationEvaluator):
             raise NotImplementedError("Not implemented function: {}".format(function))
 
 
+def get_order_by_clauses(table, order_by_text):
+    """
+    Translates order by text, like "-page_rating_votes, date_published".
+    Leading '-' means descending order.
+    """
+    clauses = []
+    if not order_by_text:
+        return clauses
+
+    for item in order_by_text.split(","):
+        item = item.strip()
+        if item == "":
+            continue
+
+        descending = item.startswith("-")
+        column_name = item.lstrip("-+")
+
+        column = getattr(table.c, column_name, None)
+        if column is None:
+            raise AttributeError(f"Invalid order_by column: {column_name}")
+
+        if descending:
+            clauses.append(column.desc())
+        else:
+            clauses.append(column.asc())
+
+    return clauses
+
+
+class AlchemyAggregateEvaluator(object):
+    """
+    Translates group by and aggregate expressions into SQL.
+
+    Group by examples: "language", "year(date_published)", "domain(link)"
+    Aggregate examples: "count", "sum(page_rating_votes)", "avg(page_rating_votes)"
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def get_group_functions(self):
+        return ["year", "month", "day", "domain"]
+
+    def get_aggregate_functions(self):
+        return ["count", "sum", "avg", "min", "max"]
+
+    def split_expressions(self, text):
+        """
+        Splits "count,sum(votes)" into ["count", "sum(votes)"]
+        """
+        if not text:
+            return []
+
+        return [item.strip() for item in text.split(",") if item.strip() != ""]
+
+    def split_function(self, expression):
+        """
+        Splits "sum(votes)" into ["sum", "votes"]. Column "votes" is returned as [None, "votes"]
+        """
+        wh = re.match(r"^(\w+)\s*\(\s*(\w*)\s*\)$", expression)
+        if wh:
+            return [wh.group(1).lower(), wh.group(2)]
+
+        if re.match(r"^\w+$", expression):
+            return [None, expression]
+
+        raise NotImplementedError("Not implemented expression: {}".format(expression))
+
+    def get_column(self, column_name):
+        column = getattr(self.table.c, column_name, None)
+        if column is None:
+            raise AttributeError(f"Invalid column: {column_name}")
+        return column
+
+    def get_group_by(self, text):
+        expressions = []
+        for expression in self.split_expressions(text):
+            function, column_name = self.split_function(expression)
+            column = self.get_column(column_name)
+
+            if function is None:
+                expressions.append(column.label(expression))
+            elif function == "year":
+                expressions.append(func.strftime("%Y", column).label(expression))
+            elif function == "month":
+                expressions.append(func.strftime("%Y-%m", column).label(expression))
+            elif function == "day":
+                expressions.append(func.strftime("%Y-%m-%d", column).label(expression))
+            elif function == "domain":
+                expressions.append(self.get_domain(column).label(expression))
+            else:
+                raise NotImplementedError("Not implemented function: {}".format(function))
+
+        return expressions
+
+    def get_domain(self, column):
+        """
+        https://www.domain.com/path -> www.domain.com
+        """
+        rest = case(
+            (func.instr(column, "://") > 0, func.substr(column, func.instr(column, "://") + 3)),
+            else_=column,
+        )
+        return case(
+            (func.instr(rest, "/") > 0, func.substr(rest, 1, func.instr(rest, "/") - 1)),
+            else_=rest,
+        )
+
+    def get_aggregates(self, text):
+        expressions = []
+        for expression in self.split_expressions(text):
+            function, column_name = self.split_function(expression)
+
+            if function is None and column_name.lower() == "count":
+                expressions.append(func.count().label(expression))
+                continue
+
+            if function not in self.get_aggregate_functions():
+                raise NotImplementedError("Not implemented function: {}".format(function))
+
+            if function == "count" and column_name == "":
+                expressions.append(func.count().label(expression))
+                continue
+
+            column = self.get_column(column_name)
+            sql_function = getattr(func, function)
+            expressions.append(sql_function(column).label(expression))
+
+        return expressions
+
+
 class AlchemyRowHandler(object):
     def handle_row(self, row):
         pass
 
 
 class AlchemySearch(object):
-    def __init__(self, db, search_term, row_handler=None, args=None, connection=None):
+    def __init__(
+        self,
+        db,
+        search_term,
+        row_handler=None,
+        args=None,
+        connection=None,
+        with_tags=False,
+        with_social=False,
+        with_source=False,
+        view=None,
+    ):
+        """
+        @param with_tags Joins aggregated entry tags, available as row.tags
+        @param with_social Joins social data, available as row.social_<column>
+        @param with_source Joins source, available as row.source_title
+        @param view Search view row. Search is limited to its materialized entries
+        """
         self.db = db
         self.connection = connection
         self.search_term = search_term
@@ -102,6 +261,11 @@ class AlchemySearch(object):
 
         self.args = args
 
+        self.with_tags = with_tags
+        self.with_social = with_social
+        self.with_source = with_source
+        self.view = view
+
         self.get_destination_table()
 
     def search(self):
@@ -123,6 +287,120 @@ class AlchemySearch(object):
                 "linkdatamodel", destination_metadata, autoload_with=self.db
             )
 
+    def aggregate(self, group_by, aggregates="count"):
+        """
+        Groups filtered rows. Grouping is performed by the DB, rows are streamed.
+
+        @param group_by can be passed as "language", or "year(date_published),language"
+        @param aggregates can be passed as "count,sum(page_rating_votes)"
+        """
+        stmt = self.get_aggregate_select(group_by, aggregates)
+
+        result = self.connection.execute(stmt)
+        for row in result:
+            self.alchemy_row_handler.handle_row(row)
+            yield row
+
+    def get_aggregate_select(self, group_by, aggregates="count"):
+        evaluator = AlchemyAggregateEvaluator(self.destination_table)
+
+        group_columns = evaluator.get_group_by(group_by)
+        aggregate_columns = evaluator.get_aggregates(aggregates)
+
+        if len(group_columns) == 0:
+            raise AttributeError("Group by was not specified")
+
+        stmt = select(*group_columns, *aggregate_columns)
+
+        combined_query_conditions = self.get_query_conditions()
+        if combined_query_conditions is not None:
+            stmt = stmt.where(combined_query_conditions)
+
+        stmt = stmt.group_by(*group_columns)
+
+        order_by_columns = group_columns
+        if self.args and self.args.order_by:
+            for column in group_columns + aggregate_columns:
+                if column.name == self.args.order_by:
+                    order_by_columns = [column]
+
+        if self.args and self.args.desc:
+            stmt = stmt.order_by(*[column.desc() for column in order_by_columns])
+        else:
+            stmt = stmt.order_by(*[column.asc() for column in order_by_columns])
+
+        return stmt
+
+    def get_related_table(self, table_name):
+        """
+        Returns reflected table, or None if it does not exist in DB
+        """
+        if not inspect(self.db).has_table(table_name):
+            return None
+
+        metadata = MetaData()
+        return Table(table_name, metadata, autoload_with=self.db)
+
+    def get_select(self):
+        """
+        Returns select of destination table.
+
+        Related data is joined in the same statement, so that displaying
+        rows does not require additional queries for every row.
+        """
+        table = self.destination_table
+
+        columns = [table]
+        from_clause = table
+
+        if table.name != "linkdatamodel":
+            return select(*columns)
+
+        view_condition = None
+        if self.view is not None:
+            view_entries = self.get_related_table("searchviewentries")
+            from_clause = from_clause.join(
+                view_entries, view_entries.c.entry_id == table.c.id
+            )
+            view_condition = view_entries.c.view_id == self.view.id
+
+        if self.with_tags:
+            tags_table = self.get_related_table("entrycompactedtags")
+            if tags_table is not None:
+                tags = (
+                    select(
+                        tags_table.c.entry_id,
+                        func.group_concat(literal("#") + tags_table.c.tag, ", ").label("tags"),
+                    )
+                    .group_by(tags_table.c.entry_id)
+                    .subquery()
+                )
+                from_clause = from_clause.outerjoin(tags, tags.c.entry_id == table.c.id)
+                columns.append(tags.c.tags)
+
+        if self.with_social:
+            social_table = self.get_related_table("socialdata")
+            if social_table is not None:
+                from_clause = from_clause.outerjoin(
+                    social_table, social_table.c.entry_id == table.c.id
+                )
+                for column in social_table.columns:
+                    columns.append(column.label("social_" + column.name))
+
+        if self.with_source:
+            source_table = self.get_related_table("sourcedatamodel")
+            if source_table is not None:
+                from_clause = from_clause.outerjoin(
+                    source_table, source_table.c.id == table.c.source_id
+                )
+                columns.append(source_table.c.title.label("source_title"))
+
+        stmt = select(*columns).select_from(from_clause)
+        if view_condition is not None:
+            stmt = stmt.where(view_condition)
+
+        return stmt
+
     def get_query_conditions(self):
         ignore_case = False
         if self.args and self.args.ignore_case:
@@ -162,16 +440,19 @@ class AlchemySearch(object):
             order_by_clause = order_by_column.asc()
 
         # Use select() for SQLAlchemy Core
-        stmt = (
-            select(self.destination_table)
-            .where(combined_query_conditions)
-            .order_by(order_by_clause)
-        )
+        stmt = self.get_select()
+        if combined_query_conditions is not None:
+            stmt = stmt.where(combined_query_conditions)
 
-        # Execute the query
-        result = self.connection.execute(stmt)
+        if self.view is not None and self.view.order_by:
+            stmt = stmt.order_by(*get_order_by_clauses(self.destination_table, self.view.order_by))
+        else:
+            stmt = stmt.order_by(order_by_clause)
 
-        # Fetch all results
-        rows = result.fetchall()
+        if self.view is not None and self.view.entry_limit:
+            stmt = stmt.limit(self.view.entry_limit)
+
+        # Execute the query. Rows are streamed, not fetched all at once
+        result = self.connection.execute(stmt)
 
-        return rows
+        return result
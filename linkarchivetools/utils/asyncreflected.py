@@ -0,0 +1,250 @@
+"""
+Async counterpart of reflected tables, for asyncio applications.
+
+Every call takes a connection from async engine pool, therefore many tasks
+can use the same table object at once, without blocking the event loop.
+Requires aiosqlite.
+"""
+import asyncio
+from sqlalchemy import (
+    MetaData,
+    Table,
+    select,
+    delete,
+    or_,
+    and_,
+    exists,
+    text,
+    insert,
+    update,
+)
+
+from .reflected import set_entry_json_defaults
+
+
+class AsyncReflectedGenericTable(object):
+    def __init__(self, engine, table_name=None):
+        """
+        @param engine async engine
+        """
+        self.engine = engine
+        self.table_name = table_name
+        self.table = None
+        self.table_lock = asyncio.Lock()
+
+        if self.table_name is None:
+            self.table_name = self.get_table_name()
+
+    def get_table_name(self):
+        return self.table_name
+
+    async def get_table(self):
+        if self.table is not None:
+            return self.table
+
+        async with self.table_lock:
+            if self.table is None:
+                async with self.engine.connect() as connection:
+                    self.table = await connection.run_sync(self.reflect_table)
+
+        return self.table
+
+    def reflect_table(self, sync_connection):
+        destination_metadata = MetaData()
+        return Table(self.table_name, destination_metadata, autoload_with=sync_connection)
+
+    async def truncate(self):
+        async with self.engine.begin() as connection:
+            await connection.execute(text(f"DELETE FROM {self.table_name};"))
+
+    async def insert_json_data(self, json_data: dict):
+        table = await self.get_table()
+
+        stmt = (
+            insert(table)
+            .values(**json_data)
+            .returning(table.c.id)
+        )
+
+        async with self.engine.begin() as connection:
+            result = await connection.execute(stmt)
+            return result.scalar_one()
+
+    async def update_json_data(self, id, json_data):
+        table = await self.get_table()
+
+        stmt = (
+            update(table)
+            .where(table.c.id == id)
+            .values(**json_data)
+        )
+
+        async with self.engine.begin() as connection:
+            await connection.execute(stmt)
+
+    async def count(self):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(text(f"SELECT COUNT(*) FROM {self.table_name}"))
+            return result.scalar()
+
+    async def get(self, id):
+        destination_table = await self.get_table()
+
+        stmt = select(destination_table).where(destination_table.c.id == id)
+
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return result.first()
+
+    async def get_where(self,
+                  conditions_map: dict=None,
+                  conditions=None,
+                  order_by=None,
+                  limit:int|None=None,
+                  offset:int=0):
+        """
+        Same as ReflectedGenericTable.get_where, but returns list
+        """
+        destination_table = await self.get_table()
+
+        if not conditions:
+            conditions = []
+
+        if not conditions and conditions_map:
+            for column_name, value in conditions_map.items():
+                if not hasattr(destination_table.c, column_name):
+                    raise ValueError(f"Unknown column: {column_name}")
+
+                column = getattr(destination_table.c, column_name)
+
+                if value is None:
+                    conditions.append(column.is_(None))
+                else:
+                    conditions.append(column == value)
+
+        stmt = select(destination_table)
+
+        if conditions:
+            stmt = stmt.where(or_(*conditions))
+        if order_by is not None:
+            stmt = stmt.order_by(*order_by)
+        if offset:
+            stmt = stmt.offset(offset)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return result.fetchall()
+
+    async def delete(self, id):
+        destination_table = await self.get_table()
+
+        stmt = delete(destination_table).where(destination_table.c.id == id)
+
+        async with self.engine.begin() as connection:
+            result = await connection.execute(stmt)
+            return result.rowcount
+
+    async def delete_where(self, conditions: dict):
+        destination_table = await self.get_table()
+
+        filters = []
+        for column_name, value in conditions.items():
+            if not hasattr(destination_table.c, column_name):
+                raise ValueError(f"Unknown column: {column_name}")
+
+            filters.append(getattr(destination_table.c, column_name) == value)
+
+        stmt = delete(destination_table).where(and_(*filters))
+
+        async with self.engine.begin() as connection:
+            result = await connection.execute(stmt)
+            return result.rowcount
+
+    async def exists_where(self, conditions):
+        """
+        @param conditions list of conditions, any of them has to be met
+        """
+        if not conditions:
+            return False
+
+        stmt = select(exists().where(or_(*conditions)))
+
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return result.scalar()
+
+
+class AsyncReflectedEntryTable(AsyncReflectedGenericTable):
+    def get_table_name(self):
+        return "linkdatamodel"
+
+    async def insert_json(self, entry_json):
+        if "link" not in entry_json:
+            return
+
+        set_entry_json_defaults(entry_json)
+
+        return await self.insert_json_data(entry_json)
+
+    async def exists(self, *, id=None, link=None):
+        table = await self.get_table()
+
+        conditions = []
+        if id is not None:
+            conditions.append(table.c.id == id)
+        if link is not None:
+            conditions.append(table.c.link == link)
+
+        return await self.exists_where(conditions)
+
+
+class AsyncReflectedSourceTable(AsyncReflectedGenericTable):
+    def get_table_name(self):
+        return "sourcedatamodel"
+
+    async def insert_json(self, source_json):
+        if "url" not in source_json:
+            source_json["url"] = ""
+
+        return await self.insert_json_data(source_json)
+
+    async def exists(self, *, id=None, url=None):
+        table = await self.get_table()
+
+        conditions = []
+        if id is not None:
+            conditions.append(table.c.id == id)
+        if url is not None:
+            conditions.append(table.c.url == url)
+
+        return await self.exists_where(conditions)
+
+
+class AsyncReflectedSocialData(AsyncReflectedGenericTable):
+    def get_table_name(self):
+        return "socialdata"
+
+    async def get(self, entry_id):
+        destination_table = await self.get_table()
+
+        stmt = select(destination_table).where(destination_table.c.entry_id == entry_id)
+
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return result.first()
+
+
+class AsyncReflectedSourceOperationalData(AsyncReflectedGenericTable):
+    def get_table_name(self):
+        return "sourceoperationaldata"
+
+    async def get_for_source(self, source_id):
+        destination_table = await self.get_table()
+
+        stmt = select(destination_table).where(destination_table.c.source_obj_id == source_id)
+
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return result.first()
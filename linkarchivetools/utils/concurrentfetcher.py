@@ -0,0 +1,80 @@
+"""
+Concurrent fetching of remote data.
+
+Network calls are performed by a pool of threads. Results are returned
+to the calling thread, therefore one thread can write all of them into DB.
+"""
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class HostRateLimiter(object):
+    """
+    Spaces calls for the same host by interval. Calls for different hosts are not delayed.
+    """
+
+    def __init__(self, interval_s=0):
+        self.interval_s = interval_s
+        self.lock = threading.Lock()
+        self.next_call_times = {}
+
+    def get_host(self, url):
+        return urlparse(url).netloc.lower()
+
+    def wait(self, url):
+        if not self.interval_s:
+            return
+
+        host = self.get_host(url)
+
+        with self.lock:
+            now = time.monotonic()
+            call_time = max(now, self.next_call_times.get(host, now))
+            self.next_call_times[host] = call_time + self.interval_s
+
+        delay = call_time - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ConcurrentFetcher(object):
+    """
+    Calls fetch function for items in thread pool.
+    """
+
+    def __init__(self, fetch_function, max_in_flight=8):
+        """
+        @param fetch_function function called with one item, in worker thread
+        @param max_in_flight How many items can be fetched at the same time
+        """
+        self.fetch_function = fetch_function
+        self.max_in_flight = max(1, max_in_flight)
+
+    def fetch(self, items):
+        """
+        Yields (item, result, exception) tuples, in order of completion.
+        Items are read lazily, only when there is a free slot.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = set()
+
+            for item in items:
+                pending.add(executor.submit(self.call, item))
+
+                if len(pending) >= self.max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def call(self, item):
+        try:
+            return item, self.fetch_function(item), None
+        except Exception as E:
+            return item, None, E
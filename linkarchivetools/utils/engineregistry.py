@@ -0,0 +1,253 @@
+"""
+Process wide registry of SQLite engines, keyed by DB file, and profile.
+
+Opening a DB which was already used returns the same engine, with its pool of connections,
+and the same reflected metadata. Tables are reflected once, not for every wrapper.
+
+Profiles define pooling:
+ - default: QueuePool, for DB files
+ - memory: StaticPool, one connection, for in-memory DBs in tests
+ - nopool: NullPool, connection is closed when returned
+
+Pooled connections which were not used for idle_timeout seconds are closed by evict_idle,
+which is run when engines are requested.
+If DB file is replaced, for example removed, and created again, new engine is created.
+Reflected tables are dropped when schema version, or identity of file change.
+Schema version is read at most once in schema_check_interval seconds, writes of data
+do not change it.
+"""
+import os
+import time
+import threading
+from sqlalchemy import create_engine, MetaData, Table, text
+from sqlalchemy.pool import QueuePool, StaticPool, NullPool
+
+
+PROFILES = {
+    "default": {"poolclass": QueuePool, "pool_size": 5, "max_overflow": 10},
+    "memory": {"poolclass": StaticPool},
+    "nopool": {"poolclass": NullPool},
+}
+
+MEMORY_DB = ":memory:"
+
+
+def get_file_identity(db_file):
+    """
+    @returns identity of file, which changes if file is created again. None if it does not exist
+    """
+    if db_file == MEMORY_DB:
+        return None
+
+    try:
+        stat = os.stat(db_file)
+    except OSError:
+        return None
+
+    return (stat.st_dev, stat.st_ino)
+
+
+class EngineEntry(object):
+    def __init__(self, db_file, profile, engine, schema_check_interval=1):
+        """
+        @param schema_check_interval seconds during which reflected tables are used without check
+        """
+        self.db_file = db_file
+        self.profile = profile
+        self.engine = engine
+        self.schema_check_interval = schema_check_interval
+        self.identity = get_file_identity(db_file)
+        self.metadata = MetaData()
+        self.schema_state = None
+        self.schema_check_time = None
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+
+    def get_schema_version(self):
+        with self.engine.connect() as connection:
+            return connection.execute(text("PRAGMA schema_version")).scalar()
+
+    def is_schema_check_needed(self, identity, now):
+        """
+        Called with lock held. File replaced in place has different identity
+        """
+        if self.schema_state is None or self.schema_state[1] != identity:
+            return True
+        return now - self.schema_check_time >= self.schema_check_interval
+
+    def get_table(self, table_name):
+        """
+        Table is reflected once, into metadata shared by all users of engine.
+        Metadata is dropped if schema changed
+        """
+        now = time.time()
+        identity = get_file_identity(self.db_file)
+
+        with self.lock:
+            check_needed = self.is_schema_check_needed(identity, now)
+
+        schema_state = None
+        if check_needed:
+            schema_state = (self.get_schema_version(), identity)
+
+        with self.lock:
+            self.last_used = now
+
+            if schema_state is not None:
+                self.schema_check_time = now
+                if schema_state != self.schema_state:
+                    self.metadata = MetaData()
+                    self.schema_state = schema_state
+
+            if table_name in self.metadata.tables:
+                return self.metadata.tables[table_name]
+
+            return Table(table_name, self.metadata, autoload_with=self.engine)
+
+    def invalidate(self):
+        """
+        Schema is checked on the next lookup
+        """
+        with self.lock:
+            self.schema_state = None
+
+    def is_valid(self):
+        """
+        Engine of file, which was replaced, points to removed file
+        """
+        if self.identity is None:
+            self.identity = get_file_identity(self.db_file)
+            return True
+
+        return get_file_identity(self.db_file) == self.identity
+
+
+class EngineRegistry(object):
+    def __init__(self, idle_timeout=300, schema_check_interval=1):
+        """
+        @param idle_timeout seconds after which pooled connections of unused engine are closed
+        @param schema_check_interval seconds during which reflected tables are used without check
+        """
+        self.idle_timeout = idle_timeout
+        self.schema_check_interval = schema_check_interval
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.engines = {}
+        self.last_eviction = time.time()
+
+    def get_key(self, db_file, profile):
+        if db_file != MEMORY_DB:
+            db_file = os.path.abspath(db_file)
+        return (db_file, profile)
+
+    def create_engine(self, db_file, profile):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown engine profile: {profile}")
+
+        return create_engine(
+            f"sqlite:///{db_file}",
+            connect_args={"check_same_thread": False},
+            **PROFILES[profile],
+        )
+
+    def get_entry(self, db_file, profile="default"):
+        if db_file == MEMORY_DB and profile == "default":
+            profile = "memory"
+
+        key = self.get_key(db_file, profile)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not entry.is_valid():
+                self.remove_entry(key)
+                entry = None
+
+            if entry is None:
+                entry = EngineEntry(
+                    key[0],
+                    profile,
+                    self.create_engine(key[0], profile),
+                    schema_check_interval=self.schema_check_interval,
+                )
+                self.entries[key] = entry
+                self.engines[entry.engine] = entry
+
+            entry.last_used = time.time()
+
+            evict = entry.last_used - self.last_eviction >= self.idle_timeout / 2
+            if evict:
+                self.last_eviction = entry.last_used
+
+        if evict:
+            self.evict_idle()
+
+        return entry
+
+    def get_engine(self, db_file, profile="default"):
+        return self.get_entry(db_file, profile).engine
+
+    def get_engine_entry(self, engine):
+        """
+        @returns None if engine was not created by registry
+        """
+        with self.lock:
+            return self.engines.get(engine)
+
+    def get_table(self, engine, table_name):
+        """
+        Engines from registry share metadata. Other engines reflect into new metadata
+        """
+        entry = self.get_engine_entry(engine)
+        if entry is None:
+            return Table(table_name, MetaData(), autoload_with=engine)
+
+        return entry.get_table(table_name)
+
+    def invalidate(self, engine):
+        """
+        Called after schema was changed by this process, tables are reflected again if needed
+        """
+        entry = self.get_engine_entry(engine)
+        if entry is not None:
+            entry.invalidate()
+
+    def evict_idle(self, now=None):
+        """
+        Closes pooled connections of engines not used for idle_timeout. Engines stay usable
+        @returns number of evicted engines
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            entries = [
+                entry for entry in self.entries.values()
+                if now - entry.last_used >= self.idle_timeout and entry.profile != "memory"
+            ]
+
+        for entry in entries:
+            # checked out connections are closed when they are returned
+            entry.engine.dispose()
+
+        return len(entries)
+
+    def remove_entry(self, key):
+        entry = self.entries.pop(key)
+        del self.engines[entry.engine]
+        entry.engine.dispose()
+
+    def dispose(self, db_file=None):
+        """
+        @param db_file Disposes engines of this file. All if None
+        """
+        with self.lock:
+            for key in list(self.entries.keys()):
+                if db_file is None or key[0] == self.get_key(db_file, key[1])[0]:
+                    self.remove_entry(key)
+
+
+engine_registry = EngineRegistry()
+
+
+def get_engine_registry():
+    return engine_registry
@@ -0,0 +1,166 @@
+"""
+Search over several SQLite files, like archives split per year, or per workspace.
+
+Every file is searched concurrently, in its own thread, with its own connection.
+Files return rows sorted by the same column, therefore streams are merged with heap.
+Global order is preserved, and results do not have to be loaded into memory.
+"""
+import glob
+import heapq
+import queue
+import threading
+from sqlalchemy import create_engine
+
+from .alchemysearch import AlchemySearch, AlchemyRowHandler
+
+
+def get_db_files(db_text):
+    """
+    Returns list of files. Files can be delimited by ',', or provided as glob "archive/*.db"
+    """
+    files = []
+    if not db_text:
+        return files
+
+    for item in db_text.split(","):
+        item = item.strip()
+        if item == "":
+            continue
+
+        if glob.has_magic(item):
+            files.extend(sorted(glob.glob(item)))
+        else:
+            files.append(item)
+
+    return files
+
+
+class FederatedSearchError(object):
+    def __init__(self, db_file, exception):
+        self.db_file = db_file
+        self.exception = exception
+
+
+class FederatedSearch(object):
+    FINISHED = None
+
+    def __init__(
+        self,
+        db_files,
+        search_term,
+        row_handler=None,
+        args=None,
+        queue_size=1000,
+        **search_options
+    ):
+        """
+        @param search_options Options passed to AlchemySearch, like with_tags
+        @param queue_size How many rows can be read ahead from one file
+        """
+        self.db_files = db_files
+        self.search_term = search_term
+        self.alchemy_row_handler = row_handler
+        self.args = args
+        self.queue_size = queue_size
+        self.search_options = search_options
+
+        self.stop_event = threading.Event()
+
+    def search(self):
+        queues = []
+        threads = []
+
+        for db_file in self.db_files:
+            rows_queue = queue.Queue(maxsize=self.queue_size)
+            thread = threading.Thread(
+                target=self.search_file, args=(db_file, rows_queue), daemon=True
+            )
+            queues.append(rows_queue)
+            threads.append(thread)
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            streams = [self.read_queue(rows_queue) for rows_queue in queues]
+
+            merged = heapq.merge(
+                *streams, key=self.get_row_key, reverse=self.is_descending()
+            )
+
+            for row in merged:
+                if self.alchemy_row_handler:
+                    self.alchemy_row_handler.handle_row(row)
+                yield row
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+    def search_file(self, db_file, rows_queue):
+        """
+        Thread function. Writes rows of one file into queue
+        """
+        try:
+            engine = create_engine("sqlite:///" + db_file)
+            with engine.connect() as connection:
+                searcher = AlchemySearch(
+                    engine,
+                    self.search_term,
+                    row_handler=AlchemyRowHandler(),
+                    args=self.args,
+                    connection=connection,
+                    **self.search_options,
+                )
+
+                for row in searcher.search():
+                    if not self.put(rows_queue, row):
+                        break
+            engine.dispose()
+        except Exception as E:
+            self.put(rows_queue, FederatedSearchError(db_file, E))
+
+        self.put(rows_queue, FederatedSearch.FINISHED)
+
+    def put(self, rows_queue, item):
+        """
+        Returns False if search was stopped by reader
+        """
+        while not self.stop_event.is_set():
+            try:
+                rows_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def read_queue(self, rows_queue):
+        while True:
+            item = rows_queue.get()
+            if item is FederatedSearch.FINISHED:
+                return
+
+            if isinstance(item, FederatedSearchError):
+                raise IOError(
+                    "Search of {} failed: {}".format(item.db_file, item.exception)
+                ) from item.exception
+
+            yield item
+
+    def get_order_by_column_name(self):
+        if self.args and self.args.order_by:
+            return self.args.order_by
+        return "id"
+
+    def is_descending(self):
+        if self.args and not self.args.asc and self.args.desc:
+            return True
+        return False
+
+    def get_row_key(self, row):
+        """
+        NULL values are first in ascending order, as in SQLite
+        """
+        value = getattr(row, self.get_order_by_column_name())
+        return (value is not None, value)
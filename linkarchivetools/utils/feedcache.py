@@ -0,0 +1,123 @@
+"""
+Cache of feeds discovered for links.
+
+Reading feeds may require calls to crawling server. Results are stored
+in 'feeddiscoverycache' table, therefore next runs process only links,
+which are new, or which were fetched too long ago.
+Data is stored with fetch mode. Data fetched in other mode, for example without
+remote server, or without feed properties, is not used.
+"""
+import json
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+
+from linkarchivetools.model.definitions import FeedDiscoveryCache
+from .reflected import ReflectedFeedDiscoveryCache
+from .engineregistry import get_engine_registry
+
+
+class FeedCache(object):
+    def __init__(self, engine, connection, ttl_days=30, refresh_older_than=None, fetch_mode=None):
+        """
+        @param ttl_days Cached data older than this number of days is fetched again. None - never expires
+        @param refresh_older_than Cached data fetched before this date is fetched again
+        @param fetch_mode Text describing how feeds are fetched. Cached data with other mode is fetched again
+        """
+        self.engine = engine
+        self.connection = connection
+        self.ttl_days = ttl_days
+        self.refresh_older_than = refresh_older_than
+        self.fetch_mode = fetch_mode
+
+        self.create_tables()
+
+        self.table = ReflectedFeedDiscoveryCache(engine=self.engine, connection=self.connection)
+
+    def create_tables(self):
+        FeedDiscoveryCache.__table__.create(self.connection, checkfirst=True)
+
+        # cache files created by older versions
+        column_names = [column["name"] for column in inspect(self.connection).get_columns("feeddiscoverycache")]
+        if "fetch_mode" not in column_names:
+            self.connection.execute(text("ALTER TABLE feeddiscoverycache ADD COLUMN fetch_mode VARCHAR(100)"))
+            self.connection.commit()
+            get_engine_registry().invalidate(self.engine)
+
+        self.connection.commit()
+
+    def get_link_hash(self, link):
+        return hashlib.sha256(link.encode("utf-8")).hexdigest()
+
+    def get_expiry_date(self):
+        """
+        Data fetched before this date is not valid
+        """
+        expiry_date = None
+        if self.ttl_days is not None:
+            expiry_date = datetime.now() - timedelta(days=self.ttl_days)
+
+        if self.refresh_older_than:
+            if expiry_date is None or self.refresh_older_than > expiry_date:
+                expiry_date = self.refresh_older_than
+
+        return expiry_date
+
+    def get(self, link):
+        """
+        @returns list of (feed, feed properties) tuples, or None if link is not cached, or expired
+        """
+        row = self.table.get_for_hash(self.get_link_hash(link))
+        if row is None:
+            return
+
+        if row.fetch_mode != self.fetch_mode:
+            return
+
+        expiry_date = self.get_expiry_date()
+        if expiry_date and (row.date_fetched is None or row.date_fetched < expiry_date):
+            return
+
+        return self.read_feeds(row.feeds)
+
+    def set(self, link, feeds, status_code=None):
+        json_data = {}
+        json_data["link_hash"] = self.get_link_hash(link)
+        json_data["feeds"] = self.write_feeds(feeds)
+        json_data["status_code"] = status_code
+        json_data["date_fetched"] = datetime.now()
+        json_data["fetch_mode"] = self.fetch_mode
+
+        row = self.table.get_for_hash(json_data["link_hash"])
+        if row:
+            self.table.update_json_data(row.id, json_data)
+            return row.id
+        else:
+            return self.table.insert_json_data(json_data)
+
+    def write_feeds(self, feeds):
+        data = []
+        for feed, feed_properties in feeds:
+            data.append({"link": feed, "properties": feed_properties})
+
+        return json.dumps(data, default=self.write_value)
+
+    def write_value(self, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    def read_feeds(self, feeds_text):
+        feeds = []
+        if not feeds_text:
+            return feeds
+
+        for item in json.loads(feeds_text):
+            feed_properties = item.get("properties")
+            if feed_properties and feed_properties.get("date_published"):
+                feed_properties["date_published"] = datetime.fromisoformat(
+                    feed_properties["date_published"]
+                )
+            feeds.append((item["link"], feed_properties))
+
+        return feeds
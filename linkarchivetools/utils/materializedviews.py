@@ -0,0 +1,224 @@
+"""
+Materialized search views.
+
+Search view rows store filter statement, order, and day limits.
+Entry ids matching the filter are stored in 'searchviewentries' table,
+therefore reading view does not require to scan all entries.
+
+Refresh is incremental. Only entries created, or updated after the last
+refresh are evaluated again. Watermark name contains hash of view definition,
+if filter, or day limits of view are changed, view is refreshed fully.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import (
+    MetaData,
+    Table,
+    select,
+    delete,
+    insert,
+    literal,
+    func,
+    or_,
+    and_,
+)
+
+from linkarchivetools.model.definitions import SearchViewEntries, Watermark
+from .alchemysearch import AlchemySearch
+from .reflected import ReflectedWatermark
+
+
+class MaterializedViews(object):
+    def __init__(self, engine, connection, ignore_case=False):
+        self.engine = engine
+        self.connection = connection
+        self.ignore_case = ignore_case
+
+        self.create_tables()
+
+        metadata = MetaData()
+        self.entries_table = Table("linkdatamodel", metadata, autoload_with=self.connection)
+        self.views_table = Table("searchview", metadata, autoload_with=self.connection)
+        self.view_entries_table = Table("searchviewentries", metadata, autoload_with=self.connection)
+
+        self.watermarks = ReflectedWatermark(engine=self.engine, connection=self.connection)
+
+    def create_tables(self):
+        SearchViewEntries.__table__.create(self.connection, checkfirst=True)
+        Watermark.__table__.create(self.connection, checkfirst=True)
+        self.connection.commit()
+
+    def get_views(self):
+        stmt = select(self.views_table).order_by(self.views_table.c.priority)
+        return self.connection.execute(stmt).fetchall()
+
+    def get_view(self, name):
+        stmt = select(self.views_table).where(self.views_table.c.name == name)
+        return self.connection.execute(stmt).first()
+
+    def get_watermark_prefix(self, view):
+        return "searchview_{}".format(view.id)
+
+    def get_definition_hash(self, view):
+        definition = "\n".join(
+            str(value)
+            for value in [
+                view.filter_statement,
+                view.date_published_day_limit,
+                view.date_created_day_limit,
+            ]
+        )
+        return hashlib.sha256(definition.encode("utf-8")).hexdigest()[:16]
+
+    def get_watermark_name(self, view):
+        return "{}_{}".format(self.get_watermark_prefix(view), self.get_definition_hash(view))
+
+    def remove_watermarks(self, view):
+        """
+        Removes watermarks of view, also the ones of previous definitions
+        """
+        table = self.watermarks.get_table()
+        prefix = self.get_watermark_prefix(view)
+        self.connection.execute(
+            delete(table).where(
+                or_(table.c.name == prefix, table.c.name.startswith(prefix + "_", autoescape=True))
+            )
+        )
+
+    def is_materialized(self, view):
+        watermark = self.watermarks.get_watermark(self.get_watermark_name(view))
+        return watermark is not None
+
+    def refresh(self, full=False):
+        """
+        API. Refreshes all views
+        """
+        for view in self.get_views():
+            self.refresh_view(view, full=full)
+
+    def refresh_view(self, view, full=False):
+        """
+        @param full If true, all entries are evaluated, not only the ones changed after last refresh
+        @returns number of entries in view
+        """
+        date_refreshed = datetime.now()
+        last_id = self.connection.execute(select(func.max(self.entries_table.c.id))).scalar()
+
+        watermark = self.watermarks.get_watermark(self.get_watermark_name(view))
+        if watermark is None:
+            # not refreshed yet, or view definition changed
+            full = True
+
+        entries = self.entries_table
+        view_entries = self.view_entries_table
+        in_view = view_entries.c.view_id == view.id
+
+        candidates = None
+        if full:
+            self.connection.execute(delete(view_entries).where(in_view))
+            self.remove_watermarks(view)
+        else:
+            candidates = self.get_changed_conditions(watermark)
+            changed_ids = select(entries.c.id).where(candidates)
+            self.connection.execute(
+                delete(view_entries).where(in_view, view_entries.c.entry_id.in_(changed_ids))
+            )
+
+            # removed entries
+            self.connection.execute(
+                delete(view_entries).where(
+                    in_view, view_entries.c.entry_id.not_in(select(entries.c.id))
+                )
+            )
+
+            # entries that got too old for day limits
+            expired = self.get_expired_conditions(view, date_refreshed)
+            if expired is not None:
+                expired_ids = select(entries.c.id).where(expired)
+                self.connection.execute(
+                    delete(view_entries).where(in_view, view_entries.c.entry_id.in_(expired_ids))
+                )
+
+        conditions = self.get_view_conditions(view, date_refreshed)
+        if candidates is not None:
+            conditions.append(candidates)
+
+        entries_select = select(literal(view.id), entries.c.id)
+        if conditions:
+            entries_select = entries_select.where(and_(*conditions))
+
+        self.connection.execute(
+            insert(view_entries).from_select(["view_id", "entry_id"], entries_select)
+        )
+        self.connection.commit()
+
+        self.watermarks.set_watermark(self.get_watermark_name(view), last_id=last_id, date=date_refreshed)
+
+        return self.count(view)
+
+    def get_changed_conditions(self, watermark):
+        entries = self.entries_table
+
+        conditions = []
+        if watermark.last_id is not None:
+            conditions.append(entries.c.id > watermark.last_id)
+        if watermark.date is not None:
+            conditions.append(entries.c.date_created > watermark.date)
+            conditions.append(entries.c.date_update_last > watermark.date)
+
+        if len(conditions) == 0:
+            return entries.c.id.is_not(None)
+
+        return or_(*conditions)
+
+    def get_view_conditions(self, view, date_refreshed):
+        entries = self.entries_table
+
+        conditions = []
+        if view.filter_statement:
+            searcher = AlchemySearch(self.engine, view.filter_statement, connection=self.connection)
+            searcher.destination_table = entries
+            conditions.append(searcher.get_query_conditions())
+
+        if view.date_published_day_limit and view.date_published_day_limit > 0:
+            date_limit = date_refreshed - timedelta(days=view.date_published_day_limit)
+            conditions.append(entries.c.date_published >= date_limit)
+
+        if view.date_created_day_limit and view.date_created_day_limit > 0:
+            date_limit = date_refreshed - timedelta(days=view.date_created_day_limit)
+            conditions.append(entries.c.date_created >= date_limit)
+
+        return conditions
+
+    def get_expired_conditions(self, view, date_refreshed):
+        entries = self.entries_table
+
+        conditions = []
+        if view.date_published_day_limit and view.date_published_day_limit > 0:
+            date_limit = date_refreshed - timedelta(days=view.date_published_day_limit)
+            conditions.append(
+                or_(entries.c.date_published.is_(None), entries.c.date_published < date_limit)
+            )
+
+        if view.date_created_day_limit and view.date_created_day_limit > 0:
+            date_limit = date_refreshed - timedelta(days=view.date_created_day_limit)
+            conditions.append(
+                or_(entries.c.date_created.is_(None), entries.c.date_created < date_limit)
+            )
+
+        if len(conditions) == 0:
+            return None
+
+        return or_(*conditions)
+
+    def count(self, view):
+        stmt = select(func.count()).where(self.view_entries_table.c.view_id == view.id)
+        return self.connection.execute(stmt).scalar()
+
+    def get_entry_ids(self, view):
+        stmt = select(self.view_entries_table.c.entry_id).where(
+            self.view_entries_table.c.view_id == view.id
+        )
+        result = self.connection.execute(stmt)
+        for row in result:
+            yield row.entry_id
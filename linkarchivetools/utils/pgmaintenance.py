@@ -0,0 +1,159 @@
+"""
+PostgreSQL maintenance: ANALYZE, VACUUM, REINDEX, sequence update.
+
+Commands are run with connections from one engine pool, not with psql process for every table.
+VACUUM cannot be run in transaction, it is run in autocommit.
+For every table time, and statistics from pg_stat_user_tables before, and after are reported.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+
+
+MAINTENANCE_COMMANDS = {
+    "analyze": "ANALYZE {table}",
+    "vacuum": "VACUUM {table}",
+    "reindex": "REINDEX TABLE {table}",
+    "sequence": "SELECT setval('{table}_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 1))",
+}
+
+# cannot be run inside transaction block
+AUTOCOMMIT_COMMANDS = ["vacuum"]
+
+STATISTICS_SQL = """
+SELECT n_live_tup, n_dead_tup, pg_total_relation_size(relid) AS total_bytes
+FROM pg_stat_user_tables
+WHERE relname = :table
+"""
+
+
+class MaintenanceReport(object):
+    def __init__(self, command, table_name, before=None, after=None, time_s=0, error=None):
+        """
+        @param before, after dicts with n_live_tup, n_dead_tup, total_bytes. None if not known
+        """
+        self.command = command
+        self.table_name = table_name
+        self.before = before
+        self.after = after
+        self.time_s = time_s
+        self.error = error
+
+    def get_statistic_change(self, name):
+        if not self.before or not self.after:
+            return 0
+        return (self.before[name] or 0) - (self.after[name] or 0)
+
+    def get_dead_rows_removed(self):
+        return self.get_statistic_change("n_dead_tup")
+
+    def get_bytes_freed(self):
+        return self.get_statistic_change("total_bytes")
+
+    def __str__(self):
+        if self.error:
+            return f"{self.command} {self.table_name}: error {self.error}"
+
+        text = f"{self.command} {self.table_name}: in {self.time_s:.2f}s"
+        if self.before and self.after:
+            text += (
+                f", dead rows {self.before['n_dead_tup']} -> {self.after['n_dead_tup']}"
+                f", size {self.before['total_bytes']} -> {self.after['total_bytes']} bytes"
+            )
+        return text
+
+
+class PgMaintenance(object):
+    def __init__(self, engine, statistics=True):
+        """
+        @param statistics If set, pg_stat_user_tables is read before, and after command
+        """
+        self.engine = engine
+        self.statistics = statistics
+        self.lock = threading.Lock()
+        self.reports = []
+
+    def get_command_sql(self, command, table_name):
+        """
+        @param command Name from MAINTENANCE_COMMANDS, or SQL with {table}
+        """
+        sql_text = MAINTENANCE_COMMANDS.get(command, command)
+        return sql_text.replace("{table}", table_name)
+
+    def get_table_statistics(self, connection, table_name):
+        if not self.statistics or connection.dialect.name != "postgresql":
+            return None
+
+        row = connection.execute(text(STATISTICS_SQL), {"table": table_name}).mappings().first()
+        # statistics snapshot is kept until the end of transaction
+        connection.commit()
+
+        if row:
+            return dict(row)
+
+    def run_table(self, command, table_name):
+        """
+        @returns MaintenanceReport
+        """
+        report = MaintenanceReport(command, table_name)
+        sql_text = self.get_command_sql(command, table_name)
+
+        with self.engine.connect() as connection:
+            if command in AUTOCOMMIT_COMMANDS:
+                connection.execution_options(isolation_level="AUTOCOMMIT")
+
+            try:
+                report.before = self.get_table_statistics(connection, table_name)
+
+                start_time = time.time()
+                connection.execute(text(sql_text))
+                connection.commit()
+                report.time_s = time.time() - start_time
+
+                report.after = self.get_table_statistics(connection, table_name)
+            except Exception as E:
+                connection.rollback()
+                report.error = str(E)
+
+        print(report)
+
+        with self.lock:
+            self.reports.append(report)
+
+        return report
+
+    def run(self, command, table_names, jobs=1):
+        """
+        @param jobs How many tables are processed at the same time
+        @returns list of MaintenanceReport
+        """
+        if jobs <= 1:
+            return [self.run_table(command, table_name) for table_name in table_names]
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(lambda table_name: self.run_table(command, table_name), table_names))
+
+    def is_successful(self):
+        with self.lock:
+            return all(report.error is None for report in self.reports)
+
+    def print_summary(self):
+        with self.lock:
+            reports = list(self.reports)
+
+        if not reports:
+            return
+
+        errors = [report for report in reports if report.error]
+        time_s = sum(report.time_s for report in reports)
+        dead_rows = sum(report.get_dead_rows_removed() for report in reports)
+        bytes_freed = sum(report.get_bytes_freed() for report in reports)
+
+        print(
+            f"Tables: {len(reports)}, errors: {len(errors)}, time: {time_s:.2f}s, "
+            f"dead rows removed: {dead_rows}, bytes freed: {bytes_freed}"
+        )
+
+        for report in sorted(reports, key=lambda report: report.time_s, reverse=True)[:5]:
+            print(f" - {report.table_name}: {report.time_s:.2f}s")
@@ -19,6 +19,45 @@ from sqlalchemy import (
     Index,
 )
 
+from .engineregistry import get_engine_registry
+
+
+def set_entry_json_defaults(entry_json):
+    """
+    Fills values of entry columns which cannot be null
+    """
+    if "source_url" not in entry_json:
+        entry_json["source_url"] = ""
+    if "permanent" not in entry_json:
+        entry_json["permanent"] = False
+    if "bookmarked" not in entry_json:
+        entry_json["bookmarked"] = False
+    if "status_code" not in entry_json:
+        entry_json["status_code"] = 0
+    if "contents_type" not in entry_json:
+        entry_json["contents_type"] = 0
+    if "page_rating_contents" not in entry_json:
+        entry_json["page_rating_contents"] = 0
+    if "page_rating_visits" not in entry_json:
+        entry_json["page_rating_visits"] = 0
+    if "page_rating_votes" not in entry_json:
+        entry_json["page_rating_votes"] = 0
+    if "page_rating" not in entry_json:
+        entry_json["page_rating"] = 0
+
+    return entry_json
+
+
+def get_entry_column_name(table):
+    """
+    Tables use different names of entry foreign key
+    @param table Table, or list of column names
+    """
+    columns = table.c if isinstance(table, Table) else table
+    for column_name in ["entry_id", "entry_object_id", "entry_object"]:
+        if column_name in columns:
+            return column_name
+
 
 class ReflectedTable(object):
     def __init__(self, engine, connection):
@@ -26,11 +65,7 @@ class ReflectedTable(object):
         self.connection = connection
 
     def get_table(self, table_name):
-        destination_metadata = MetaData()
-        destination_table = Table(
-            table_name, destination_metadata, autoload_with=self.engine
-        )
-        return destination_table
+        return get_engine_registry().get_table(self.engine, table_name)
 
     def truncate_table(self, table_name):
         if not self.is_table(table_name):
@@ -115,6 +150,41 @@ class ReflectedTable(object):
         self.connection.execute(text(sql_text))
         self.connection.commit()
 
+    def delete_orphans(self, table_name, column_name=None, parent_table_name="linkdatamodel", parent_column_name="id", commit=True):
+        """
+        Deletes rows which point at rows not existing in parent table, with one statement.
+        @param column_name Column pointing at parent. If None, entry column is detected
+        @param commit If False, caller has to commit. Allows to run many deletes in one transaction
+        @returns number of deleted rows
+        """
+        inspector = inspect(self.connection)
+        table_names = inspector.get_table_names()
+        if table_name not in table_names or parent_table_name not in table_names:
+            return 0
+
+        metadata = MetaData()
+        table = Table(table_name, metadata, autoload_with=self.connection)
+        parent_table = Table(parent_table_name, metadata, autoload_with=self.connection)
+
+        if column_name is None:
+            column_name = get_entry_column_name(table)
+        if column_name is None or column_name not in table.c:
+            return 0
+
+        column = table.c[column_name]
+        parent_column = parent_table.c[parent_column_name]
+
+        stmt = delete(table).where(
+            column.is_not(None),
+            ~exists().where(parent_column == column),
+        )
+
+        result = self.connection.execute(stmt)
+        if commit:
+            self.connection.commit()
+
+        return result.rowcount
+
 
 class ReflectedGenericTable(object):
     def __init__(self, engine, connection, table_name=None):
@@ -133,10 +203,7 @@ class ReflectedGenericTable(object):
         if self.table is not None:
             return self.table
 
-        destination_metadata = MetaData()
-        self.table = Table(
-            self.table_name, destination_metadata, autoload_with=self.engine
-        )
+        self.table = get_engine_registry().get_table(self.engine, self.table_name)
         return self.table
 
     def truncate(self):
@@ -170,6 +237,40 @@ class ReflectedGenericTable(object):
 
         return inserted_id
 
+    def insert_json_data_many(self, json_data_list, return_ids=False):
+        """
+        Inserts rows in one transaction, with one executemany. All rows need to have the same keys.
+        @param return_ids If true, ids are returned with multi row INSERT ... RETURNING
+        @returns list of inserted ids, in order of rows, or number of rows
+        """
+        if not json_data_list:
+            return [] if return_ids else 0
+
+        table = self.get_table()
+
+        if not return_ids:
+            self.connection.execute(insert(table), json_data_list)
+            self.connection.commit()
+            return len(json_data_list)
+
+        if "id" in json_data_list[0]:
+            self.connection.execute(insert(table), json_data_list)
+            self.connection.commit()
+            return [json_data["id"] for json_data in json_data_list]
+
+        # SQLite limits number of bound parameters in one statement
+        rows_per_statement = max(1, 30000 // len(json_data_list[0]))
+
+        inserted_ids = []
+        for start in range(0, len(json_data_list), rows_per_statement):
+            rows = json_data_list[start:start + rows_per_statement]
+            stmt = insert(table).values(rows).returning(table.c.id)
+            # rows of one statement get increasing ids, in order of values
+            inserted_ids.extend(sorted(self.connection.execute(stmt).scalars()))
+        self.connection.commit()
+
+        return inserted_ids
+
     def update_json_data(self, id, json_data):
         table = self.get_table()
 
@@ -328,24 +429,7 @@ class ReflectedEntryTable(ReflectedGenericTable):
         if "link" not in entry_json:
             return
 
-        if "source_url" not in entry_json:
-            entry_json["source_url"] = ""
-        if "permanent" not in entry_json:
-            entry_json["permanent"] = False
-        if "bookmarked" not in entry_json:
-            entry_json["bookmarked"] = False
-        if "status_code" not in entry_json:
-            entry_json["status_code"] = 0
-        if "contents_type" not in entry_json:
-            entry_json["contents_type"] = 0
-        if "page_rating_contents" not in entry_json:
-            entry_json["page_rating_contents"] = 0
-        if "page_rating_visits" not in entry_json:
-            entry_json["page_rating_visits"] = 0
-        if "page_rating_votes" not in entry_json:
-            entry_json["page_rating_votes"] = 0
-        if "page_rating" not in entry_json:
-            entry_json["page_rating"] = 0
+        set_entry_json_defaults(entry_json)
 
         return self.insert_json_data(entry_json)
 
@@ -394,6 +478,39 @@ class ReflectedEntryTable(ReflectedGenericTable):
         for entry in entries:
             yield entry
 
+    def get_entries_good_after(self, last_id=None, date=None):
+        """
+        Good entries added after last_id, or after date. Ordered by id
+        """
+        destination_table = self.get_table()
+
+        conditions = []
+        if last_id is not None:
+            conditions.append(destination_table.c.id > last_id)
+        if date is not None:
+            conditions.append(destination_table.c.date_created > date)
+
+        entries_select = (
+            select(destination_table)
+            .where(destination_table.c.page_rating_votes > 0)
+            .order_by(destination_table.c.id)
+        )
+        if conditions:
+            entries_select = entries_select.where(or_(*conditions))
+
+        result = self.connection.execute(entries_select)
+
+        for entry in result:
+            yield entry
+
+    def get_links(self):
+        destination_table = self.get_table()
+
+        result = self.connection.execute(select(destination_table.c.link))
+
+        for row in result:
+            yield row.link
+
     def exists(self, *, id=None, link=None):
         table = self.get_table()
 
@@ -686,11 +803,158 @@ class ReflectedConfigurationEntry(ReflectedGenericTable):
         self.insert_json_data(json_data)
 
 
+class ReflectedWatermark(ReflectedGenericTable):
+    def get_table_name(self):
+        return "watermark"
+
+    def get_watermark(self, name):
+        destination_table = self.get_table()
+
+        stmt = select(destination_table).where(destination_table.c.name == name)
+
+        result = self.connection.execute(stmt)
+        return result.first()
+
+    def set_watermark(self, name, last_id=None, date=None):
+        json_data = {}
+        json_data["name"] = name
+        json_data["last_id"] = last_id
+        json_data["date"] = date
+
+        watermark = self.get_watermark(name)
+        if watermark:
+            self.update_json_data(watermark.id, json_data)
+            return watermark.id
+        else:
+            return self.insert_json_data(json_data)
+
+
+class ReflectedFeedDiscoveryCache(ReflectedGenericTable):
+    def get_table_name(self):
+        return "feeddiscoverycache"
+
+    def get_for_hash(self, link_hash):
+        destination_table = self.get_table()
+
+        stmt = select(destination_table).where(destination_table.c.link_hash == link_hash)
+
+        result = self.connection.execute(stmt)
+        return result.first()
+
+
 class ReflectedAppLogging(ReflectedGenericTable):
     def get_table_name(self):
         return "applogging"
 
 
+class EntryRelationsCopier(object):
+    """
+    Copies rows related to entries, like tags, social data.
+
+    Rows are read for many entries with one select, and written with one
+    executemany for every table.
+    """
+
+    def __init__(self, src_engine, src_connection, dst_engine, dst_connection, table_names=None, batch_size=500):
+        """
+        @param batch_size How many entry ids are used in one select
+        """
+        self.src_engine = src_engine
+        self.src_connection = src_connection
+
+        self.dst_engine = dst_engine
+        self.dst_connection = dst_connection
+
+        self.table_names = table_names
+        if self.table_names is None:
+            self.table_names = self.get_table_names()
+        self.batch_size = batch_size
+
+        self.tables = {}
+
+    def get_table_names(self):
+        return ["entrycompactedtags", "socialdata", "usertags", "uservotes"]
+
+    def get_tables(self, table_name):
+        """
+        @returns source and destination table, or None if table does not exist in any of them
+        """
+        if table_name not in self.tables:
+            src_reflected = ReflectedTable(self.src_engine, self.src_connection)
+            dst_reflected = ReflectedTable(self.dst_engine, self.dst_connection)
+
+            tables = None
+            if src_reflected.is_table(table_name) and dst_reflected.is_table(table_name):
+                tables = (
+                    ReflectedGenericTable(self.src_engine, self.src_connection, table_name),
+                    ReflectedGenericTable(self.dst_engine, self.dst_connection, table_name),
+                )
+            self.tables[table_name] = tables
+
+        return self.tables[table_name]
+
+    def copy(self, entry_id_pairs):
+        """
+        @param entry_id_pairs list of (source entry id, destination entry id)
+        @returns number of copied rows
+        """
+        new_ids = {}
+        for old_id, new_id in entry_id_pairs:
+            new_ids.setdefault(old_id, []).append(new_id)
+
+        if not new_ids:
+            return 0
+
+        count = 0
+        for table_name in self.table_names:
+            count += self.copy_table(table_name, new_ids)
+
+        return count
+
+    def copy_table(self, table_name, new_ids):
+        tables = self.get_tables(table_name)
+        if tables is None:
+            return 0
+
+        src_table = tables[0].get_table()
+        dst_table = tables[1]
+
+        src_column_name = get_entry_column_name(src_table)
+        dst_column_name = get_entry_column_name(dst_table.get_table())
+        if src_column_name is None or dst_column_name is None:
+            return 0
+
+        dst_column_names = set(dst_table.get_column_names())
+        dst_column_names.discard("id")
+
+        src_column = getattr(src_table.c, src_column_name)
+
+        old_ids = list(new_ids.keys())
+        count = 0
+
+        for index in range(0, len(old_ids), self.batch_size):
+            batch = old_ids[index : index + self.batch_size]
+
+            rows = self.src_connection.execute(select(src_table).where(src_column.in_(batch)))
+
+            json_data_list = []
+            for row in rows:
+                data = {}
+                for key, value in row._mapping.items():
+                    if key in dst_column_names and key != src_column_name:
+                        data[key] = value
+
+                for new_id in new_ids[getattr(row, src_column_name)]:
+                    row_data = dict(data)
+                    row_data[dst_column_name] = new_id
+                    json_data_list.append(row_data)
+
+            dst_table.insert_json_data_many(json_data_list)
+            count += len(json_data_list)
+
+        return count
+
+
 class EntryCopier(object):
     def __init__(self, src_engine, src_connection, dst_engine, dst_connection):
         self.src_engine = src_engine
@@ -699,36 +963,45 @@ class EntryCopier(object):
         self.dst_engine = dst_engine
         self.dst_connection = dst_connection
 
+        self.relations_copier = EntryRelationsCopier(
+            src_engine, src_connection, dst_engine, dst_connection
+        )
+
     def copy_entry(self, entry):
         """
         """
+        new_entry_ids = self.copy_entries([entry])
+        if new_entry_ids:
+            return new_entry_ids[0]
+
+    def copy_entries(self, entries):
+        """
+        Copies entries with related rows. Entries with links present in destination are skipped.
+        @returns list of new entry ids
+        """
         entry_table = ReflectedEntryTable(self.dst_engine, self.dst_connection)
-        data = entry_table.row_to_json_data(entry)
-        del data["id"]
-        new_entry_id = entry_table.insert_json(data)
-        if new_entry_id is not None:
-            self.copy_tags(entry, new_entry_id)
-            self.copy_social_data(entry, new_entry_id)
-        return new_entry_id
-
-    def copy_tags(self, entry, new_entry_id):
-        source_entry_compacted_tags = ReflectedEntryCompactedTags(self.src_engine, self.src_connection)
-        tags = source_entry_compacted_tags.get_tags(entry.id)
-
-        entry_tag_data = {}
-        for tag in tags:
-            entry_tag_data["tag"] = tag
-            entry_tag_data["entry_id"] = new_entry_id
-            destination_entry_compacted_tags = ReflectedEntryCompactedTags(self.dst_engine, self.dst_connection)
-            destination_entry_compacted_tags.insert_json_data(entry_tag_data)
-
-    def copy_social_data(self, entry, new_entry_id):
-        source_entry_social_data = ReflectedSocialData(self.src_engine, self.src_connection)
-        social_data = source_entry_social_data.get_json(entry.id)
-        if social_data:
-            if "id" in social_data:
-                del social_data["id"]
-            social_data["entry_id"] = new_entry_id
-
-            destination_entry_social_data = ReflectedSocialData(self.dst_engine, self.dst_connection)
-            destination_entry_social_data.insert_json_data(social_data)
+        table = entry_table.get_table()
+
+        links = [entry.link for entry in entries]
+        existing_links = set(
+            self.dst_connection.execute(select(table.c.link).where(table.c.link.in_(links))).scalars()
+        )
+
+        copied_entries = []
+        json_data_list = []
+        for entry in entries:
+            if entry.link in existing_links:
+                continue
+            existing_links.add(entry.link)
+
+            data = entry_table.row_to_json_data(entry)
+            del data["id"]
+            json_data_list.append(set_entry_json_defaults(data))
+            copied_entries.append(entry)
+
+        new_entry_ids = entry_table.insert_json_data_many(json_data_list, return_ids=True)
+
+        entry_id_pairs = [(entry.id, new_id) for entry, new_id in zip(copied_entries, new_entry_ids)]
+        self.relations_copier.copy(entry_id_pairs)
+
+        return new_entry_ids
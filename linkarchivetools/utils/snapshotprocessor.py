@@ -0,0 +1,113 @@
+"""
+Prepares SQLite DB for publishing: removes passwords, truncates private tables, creates indexes.
+
+Everything is done with set based statements, in one transaction. Either all is applied, or nothing.
+Used by backup, and DbFilter.
+"""
+from sqlalchemy import MetaData, Table, text, inspect
+
+from .sqlitecompaction import SqliteCompaction
+
+
+class SnapshotProcessor(object):
+    def __init__(self, engine, connection):
+        self.engine = engine
+        self.connection = connection
+
+    def get_table_names(self):
+        return inspect(self.connection).get_table_names()
+
+    def get_column_names(self, table_name):
+        return [column["name"] for column in inspect(self.connection).get_columns(table_name)]
+
+    def obfuscate_users(self, table_name="user"):
+        """
+        Removes passwords. Superusers are renamed to admin.
+        @returns number of updated users
+        """
+        if table_name not in self.get_table_names():
+            return 0
+
+        column_names = self.get_column_names(table_name)
+
+        count = 0
+        if "password" in column_names:
+            result = self.connection.execute(text(f'UPDATE "{table_name}" SET password = \'\''))
+            count = result.rowcount
+
+        if "is_superuser" in column_names and "username" in column_names:
+            # superusers are renamed to admin_<id> first, which frees name admin
+            admin_id_name = f'\'admin_\' || "{table_name}".id'
+            self.connection.execute(
+                text(
+                    f'UPDATE "{table_name}" SET username = {admin_id_name} '
+                    f'WHERE is_superuser AND {self.get_free_name_condition(table_name, admin_id_name)}'
+                )
+            )
+            # only the first superuser is called admin
+            admin_name = "'admin'"
+            self.connection.execute(
+                text(
+                    f'UPDATE "{table_name}" SET username = {admin_name} '
+                    f'WHERE id = (SELECT MIN(id) FROM "{table_name}" WHERE is_superuser) '
+                    f'AND {self.get_free_name_condition(table_name, admin_name)}'
+                )
+            )
+
+        return count
+
+    def get_free_name_condition(self, table_name, name_sql):
+        """
+        Usernames are unique. Name used by other user is not assigned
+        """
+        return (
+            f'NOT EXISTS (SELECT 1 FROM "{table_name}" AS other '
+            f'WHERE other.username = {name_sql} AND other.id != "{table_name}".id)'
+        )
+
+    def truncate_tables(self, table_names):
+        existing_tables = set(self.get_table_names())
+
+        for table_name in table_names:
+            if table_name not in existing_tables:
+                print(f"SQLite table does not exist: {table_name}")
+                continue
+
+            self.connection.execute(text(f'DELETE FROM "{table_name}"'))
+
+    def create_indexes(self, indexes):
+        """
+        @param indexes list of (table name, column name)
+        """
+        existing_tables = set(self.get_table_names())
+
+        for table_name, column_name in indexes:
+            if table_name not in existing_tables:
+                continue
+
+            index_name = f"idx_{table_name}_{column_name}"
+            self.connection.execute(
+                text(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{column_name}")')
+            )
+
+    def process(self, obfuscate=True, truncate_tables=None, indexes=None, vacuum_into=None):
+        """
+        @param vacuum_into If set, compacted copy is written into this file
+        @returns CompactionReport if vacuum_into is set
+        """
+        try:
+            if obfuscate:
+                self.obfuscate_users()
+            if truncate_tables:
+                self.truncate_tables(truncate_tables)
+            if indexes:
+                self.create_indexes(indexes)
+
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+        if vacuum_into:
+            compaction = SqliteCompaction(self.engine, self.connection)
+            return compaction.compact(mode="into", output_file=vacuum_into)
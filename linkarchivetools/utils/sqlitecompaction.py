@@ -0,0 +1,136 @@
+"""
+Compaction of SQLite files, after rows were removed.
+
+ - full: VACUUM, file is rewritten
+ - incremental: PRAGMA incremental_vacuum(N), only free pages are released.
+   Requires auto_vacuum=INCREMENTAL. If it is not set, full VACUUM is performed, which enables it
+ - into: VACUUM INTO file, compacted copy is produced, input file is not changed
+ - none: nothing is done
+"""
+import time
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+
+COMPACT_MODES = ["full", "incremental", "into", "none"]
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class CompactionReport(object):
+    def __init__(self, mode, page_size=0, pages_before=0, pages_after=0, free_pages_before=0, free_pages_after=0, time_s=0):
+        self.mode = mode
+        self.page_size = page_size
+        self.pages_before = pages_before
+        self.pages_after = pages_after
+        self.free_pages_before = free_pages_before
+        self.free_pages_after = free_pages_after
+        self.time_s = time_s
+
+    def get_pages_freed(self):
+        return self.pages_before - self.pages_after
+
+    def get_bytes_freed(self):
+        return self.get_pages_freed() * self.page_size
+
+    def __str__(self):
+        return (
+            f"Compaction {self.mode}: pages {self.pages_before} -> {self.pages_after}, "
+            f"freed {self.get_pages_freed()} pages ({self.get_bytes_freed()} bytes), "
+            f"free pages left {self.free_pages_after}, "
+            f"in {self.time_s:.2f}s"
+        )
+
+
+class SqliteCompaction(object):
+    def __init__(self, engine, connection):
+        self.engine = engine
+        self.connection = connection
+
+    def get_pragma(self, name, connection=None):
+        if connection is None:
+            connection = self.connection
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+    def is_incremental(self):
+        return self.get_pragma("auto_vacuum") == AUTO_VACUUM_INCREMENTAL
+
+    def enable_incremental(self):
+        """
+        Takes effect for new DB, or after next VACUUM
+        """
+        self.connection.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+
+    def compact(self, mode="full", pages=None, output_file=None):
+        """
+        @param pages For incremental mode, how many pages are released. All if None
+        @param output_file For into mode, file which is created
+        @returns CompactionReport
+        """
+        if mode not in COMPACT_MODES:
+            raise ValueError(f"Unknown compaction mode: {mode}")
+
+        # VACUUM cannot be run in transaction
+        self.connection.commit()
+
+        report = CompactionReport(mode)
+        report.page_size = self.get_pragma("page_size")
+        report.pages_before = self.get_pragma("page_count")
+        report.free_pages_before = self.get_pragma("freelist_count")
+
+        start_time = time.time()
+
+        if mode == "full":
+            self.vacuum()
+        elif mode == "incremental":
+            if self.is_incremental():
+                self.incremental_vacuum(pages)
+            else:
+                print("auto_vacuum is not INCREMENTAL. Full VACUUM enables it")
+                self.enable_incremental()
+                self.vacuum()
+        elif mode == "into":
+            self.vacuum_into(output_file)
+
+        report.time_s = time.time() - start_time
+
+        if mode == "into":
+            report.pages_after, report.free_pages_after = self.get_file_pages(output_file)
+        else:
+            report.pages_after = self.get_pragma("page_count")
+            report.free_pages_after = self.get_pragma("freelist_count")
+
+        return report
+
+    def vacuum(self):
+        self.connection.execute(text("VACUUM"))
+
+    def incremental_vacuum(self, pages=None):
+        if pages is None:
+            sql_text = "PRAGMA incremental_vacuum"
+        else:
+            sql_text = f"PRAGMA incremental_vacuum({int(pages)})"
+
+        # one page is released per step. Driver steps statement only once,
+        # executescript runs it to completion
+        self.connection.commit()
+        self.connection.connection.driver_connection.executescript(sql_text)
+
+    def vacuum_into(self, output_file):
+        if not output_file:
+            raise ValueError("Output file is required for VACUUM INTO")
+
+        path = Path(output_file)
+        if path.exists():
+            path.unlink()
+
+        self.connection.execute(text("VACUUM INTO :path"), {"path": str(output_file)})
+
+    def get_file_pages(self, file_name):
+        engine = create_engine(f"sqlite:///{file_name}")
+        with engine.connect() as connection:
+            page_count = self.get_pragma("page_count", connection)
+            free_pages = self.get_pragma("freelist_count", connection)
+        engine.dispose()
+
+        return page_count, free_pages
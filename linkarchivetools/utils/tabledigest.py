@@ -0,0 +1,139 @@
+"""
+Digest of table contents: row count, max id and hash of all rows.
+
+Rows are read ordered by id, in batches, therefore tables of any size can be hashed.
+Values are converted to text in the same way for PostgreSQL and SQLite,
+so a table and its SQLite backup have the same digest.
+"""
+import json
+import hashlib
+import threading
+from datetime import datetime, date
+from decimal import Decimal
+from pathlib import Path
+from sqlalchemy import select
+
+
+def get_digest_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, datetime):
+        # SQLite backup does not store time zone
+        return value.replace(tzinfo=None).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def get_table_digest(connection, table, column_names=None, batch_size=1000):
+    """
+    @param column_names Columns which are hashed. All columns, sorted by name, if not set
+    @returns dict with rows, max_id, hash and columns
+    """
+    if column_names is None:
+        column_names = sorted(column.name for column in table.columns)
+
+    stmt = select(*[table.c[column_name] for column_name in column_names])
+    if "id" in table.c:
+        stmt = stmt.order_by(table.c.id)
+
+    result = connection.execution_options(
+        stream_results=True, max_row_buffer=batch_size, yield_per=batch_size
+    ).execute(stmt)
+
+    id_index = column_names.index("id") if "id" in column_names else None
+
+    digest = hashlib.sha256()
+    rows_count = 0
+    max_id = None
+
+    for rows in result.partitions():
+        for row in rows:
+            digest.update("\t".join(get_digest_value(value) for value in row).encode("utf-8"))
+            digest.update(b"\n")
+
+            if id_index is not None and row[id_index] is not None:
+                if max_id is None or row[id_index] > max_id:
+                    max_id = row[id_index]
+
+        rows_count += len(rows)
+
+    return {
+        "rows": rows_count,
+        "max_id": max_id,
+        "hash": digest.hexdigest(),
+        "columns": list(column_names),
+    }
+
+
+def get_digest_differences(expected, actual):
+    """
+    @returns list of names of differing properties
+    """
+    differences = []
+    for key in ["rows", "max_id", "hash"]:
+        if expected.get(key) != actual.get(key):
+            differences.append(key)
+    return differences
+
+
+class BackupManifest(object):
+    """
+    JSON file with digests of backed up tables. Tables can be set from many threads
+    """
+
+    def __init__(self, file_name):
+        self.file_name = Path(file_name)
+        self.lock = threading.Lock()
+        self.data = {"tables": {}}
+
+    def set_info(self, **info):
+        with self.lock:
+            self.data.update(info)
+
+    def set_table(self, table_name, digest):
+        with self.lock:
+            self.data["tables"][table_name] = digest
+
+    def get_table(self, table_name):
+        with self.lock:
+            return self.data["tables"].get(table_name)
+
+    def get_tables(self):
+        with self.lock:
+            return dict(self.data["tables"])
+
+    def read(self):
+        """
+        @returns False if manifest does not exist
+        """
+        if not self.file_name.exists():
+            return False
+
+        with open(self.file_name, "r") as fh:
+            data = json.load(fh)
+
+        with self.lock:
+            self.data = data
+            self.data.setdefault("tables", {})
+        return True
+
+    def write(self):
+        self.file_name.parent.mkdir(parents=True, exist_ok=True)
+
+        with self.lock:
+            text = json.dumps(self.data, indent=4, default=str)
+
+        with open(self.file_name, "w") as fh:
+            fh.write(text)
+        return True
@@ -0,0 +1,157 @@
+"""
+Runs tasks in thread pool, respecting dependencies between them.
+
+Task is started when all tasks it depends on finished successfully.
+Tasks which use the same resource, for example the same SQLite file, are not run at the same time.
+If task fails, tasks depending on it are skipped.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Task(object):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, name, function, args=None, depends_on=None, resource=None):
+        """
+        @param function Called with args. Returns False if task failed
+        @param depends_on list of task names
+        @param resource Tasks with the same resource are run one after another
+        """
+        self.name = name
+        self.function = function
+        self.args = args or []
+        self.depends_on = list(depends_on or [])
+        self.resource = resource
+
+        self.status = Task.PENDING
+        self.time_s = None
+
+    def run(self):
+        start_time = time.time()
+        try:
+            result = self.function(*self.args)
+        except Exception as E:
+            print(f"{self.name}: exception {E}")
+            result = False
+        self.time_s = time.time() - start_time
+
+        return result is not False
+
+
+class TaskScheduler(object):
+    def __init__(self, jobs=1, stop_on_error=True):
+        """
+        @param jobs How many tasks can run at the same time
+        @param stop_on_error If a task fails, no new tasks are started
+        """
+        self.jobs = max(1, jobs)
+        self.stop_on_error = stop_on_error
+        self.tasks = {}
+
+    def add_task(self, name, function, *args, depends_on=None, resource=None):
+        if name in self.tasks:
+            raise ValueError(f"Task already exists: {name}")
+
+        self.tasks[name] = Task(name, function, args, depends_on=depends_on, resource=resource)
+        return name
+
+    def run(self):
+        """
+        @returns True if all tasks were successful
+        """
+        self.check_dependencies()
+
+        errors = False
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while True:
+                self.skip_blocked_tasks()
+
+                if not (errors and self.stop_on_error):
+                    for task in self.get_ready_tasks(running.values()):
+                        if len(running) >= self.jobs:
+                            break
+                        task.status = Task.RUNNING
+                        running[executor.submit(task.run)] = task
+
+                if not running:
+                    break
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    if future.result():
+                        task.status = Task.DONE
+                    else:
+                        task.status = Task.FAILED
+                        errors = True
+                    print(f"{task.name}: {task.status} in {task.time_s:.2f}s")
+
+        for task in self.tasks.values():
+            if task.status == Task.PENDING:
+                task.status = Task.SKIPPED
+
+        return all(task.status == Task.DONE for task in self.tasks.values())
+
+    def check_dependencies(self):
+        for task in self.tasks.values():
+            for name in task.depends_on:
+                if name not in self.tasks:
+                    raise ValueError(f"Task {task.name} depends on unknown task {name}")
+
+        # every task has to be reachable, otherwise there is a cycle
+        done = set()
+        remaining = dict(self.tasks)
+        while remaining:
+            ready = [
+                name for name, task in remaining.items()
+                if all(dependency in done for dependency in task.depends_on)
+            ]
+            if not ready:
+                raise ValueError("Dependency cycle in tasks: {}".format(", ".join(remaining)))
+
+            for name in ready:
+                done.add(name)
+                del remaining[name]
+
+    def skip_blocked_tasks(self):
+        changed = True
+        while changed:
+            changed = False
+            for task in self.tasks.values():
+                if task.status != Task.PENDING:
+                    continue
+
+                for name in task.depends_on:
+                    if self.tasks[name].status in (Task.FAILED, Task.SKIPPED):
+                        task.status = Task.SKIPPED
+                        print(f"{task.name}: skipped, {name} did not succeed")
+                        changed = True
+                        break
+
+    def get_ready_tasks(self, running_tasks):
+        """
+        Tasks are returned in order of adding
+        """
+        busy_resources = set(task.resource for task in running_tasks if task.resource)
+
+        ready = []
+        for task in self.tasks.values():
+            if task.status != Task.PENDING:
+                continue
+            if task.resource and task.resource in busy_resources:
+                continue
+            if not all(self.tasks[name].status == Task.DONE for name in task.depends_on):
+                continue
+
+            ready.append(task)
+            if task.resource:
+                busy_resources.add(task.resource)
+
+        return ready
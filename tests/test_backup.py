@@ -0,0 +1,247 @@
+import io
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+from sqlalchemy import create_engine, text
+
+from linkarchivetools.backup import (
+    copy_table,
+    get_copy_value,
+    get_copy_data,
+    add_restore_tasks,
+    add_sql_tasks,
+    backup_table_sqlite,
+    create_destionation_table,
+    get_engine_table,
+    report_verification,
+    verify_dumps,
+)
+from linkarchivetools.utils.tabledigest import BackupManifest
+from linkarchivetools.utils.taskscheduler import TaskScheduler
+from linkarchivetools.utils.reflected import ReflectedEntryTable, set_entry_json_defaults
+from .dbtestcase import DbTestCase
+
+
+class BackupTest(DbTestCase):
+    def create_workspace_db(self, file_name):
+        """
+        Source DB has tables prefixed with workspace name, as in postgres
+        """
+        self.create_db(file_name)
+
+        engine = create_engine(f"sqlite:///{file_name}")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            for index in range(25):
+                table.insert_json(self.get_default_entry_data("https://google.com/{}".format(index)))
+
+            connection.execute(text("ALTER TABLE linkdatamodel RENAME TO workspace_linkdatamodel"))
+            connection.commit()
+
+    def test_copy_table(self):
+        self.create_workspace_db("input.db")
+        self.create_db("output.db")
+
+        source_engine = create_engine("sqlite:///input.db")
+        destination_engine = create_engine("sqlite:///output.db")
+
+        # call tested function
+        count = copy_table("workspace", "linkdatamodel", source_engine, destination_engine, override=True, batch_size=10)
+
+        self.assertEqual(count, 25)
+
+        with destination_engine.connect() as connection:
+            table = ReflectedEntryTable(engine=destination_engine, connection=connection)
+            self.assertEqual(table.count(), 25)
+
+    def test_copy_table__existing_rows(self):
+        self.create_workspace_db("input.db")
+        self.create_db("output.db")
+
+        source_engine = create_engine("sqlite:///input.db")
+        destination_engine = create_engine("sqlite:///output.db")
+
+        copy_table("workspace", "linkdatamodel", source_engine, destination_engine, override=True, batch_size=10)
+
+        # call tested function
+        copy_table("workspace", "linkdatamodel", source_engine, destination_engine, override=False, commit_every_row=True, batch_size=10)
+
+        with destination_engine.connect() as connection:
+            table = ReflectedEntryTable(engine=destination_engine, connection=connection)
+            self.assertEqual(table.count(), 25)
+
+    def test_get_copy_value(self):
+        self.assertEqual(get_copy_value(None), "\\N")
+        self.assertEqual(get_copy_value(True), "t")
+        self.assertEqual(get_copy_value(5), "5")
+        self.assertEqual(get_copy_value("a\tb\nc\\d"), "a\\tb\\nc\\\\d")
+        self.assertEqual(get_copy_value(b"\x01\xff"), "\\\\x01ff")
+        self.assertEqual(get_copy_value(datetime(2024, 5, 1, 10, 0, 0)), "2024-05-01T10:00:00")
+
+        data = get_copy_data([(1, None, "x")])
+        self.assertEqual(data.read(), "1\t\\N\tx\n")
+
+    def test_add_restore_tasks(self):
+        run_info = {
+            "workspace": "places",
+            "user": "user",
+            "database": "db",
+            "host": "127.0.0.1",
+            "format": "sqlite",
+            "password": "",
+            "empty": False,
+            "append": False,
+        }
+
+        scheduler = TaskScheduler(jobs=4)
+        # call tested function
+        name = add_restore_tasks(scheduler, run_info)
+
+        self.assertEqual(name, "places:restore")
+
+        task = scheduler.tasks["places:restore:linkdatamodel"]
+        self.assertIn("places:truncate", task.depends_on)
+        self.assertIn("places:restore:sourcedatamodel", task.depends_on)
+
+        task = scheduler.tasks["places:restore:entrycompactedtags"]
+        self.assertIn("places:restore:linkdatamodel", task.depends_on)
+
+        scheduler.check_dependencies()
+
+    def test_add_sql_tasks(self):
+        run_info = {
+            "workspace": "places",
+            "user": "user",
+            "database": "db",
+            "host": "127.0.0.1",
+            "password": "",
+        }
+
+        scheduler = TaskScheduler(jobs=4)
+        # call tested function
+        name = add_sql_tasks(scheduler, run_info, "vacuum", "vacuum")
+
+        self.assertEqual(name, "places:vacuum")
+        self.assertIn("places:vacuum:linkdatamodel", scheduler.tasks[name].depends_on)
+
+        task = scheduler.tasks["places:vacuum:linkdatamodel"]
+        self.assertEqual(task.args[1:], ("vacuum", "places_linkdatamodel"))
+
+        scheduler.check_dependencies()
+
+    def test_backup_table_sqlite__incremental(self):
+        self.create_workspace_db("input.db")
+        self.clean_out()
+
+        source_engine = create_engine("sqlite:///input.db")
+        destination_engine = create_engine("sqlite:///output.db")
+
+        source_table = get_engine_table("workspace", "linkdatamodel", source_engine)
+        create_destionation_table("linkdatamodel", source_table, destination_engine)
+
+        backup_table_sqlite("workspace", "linkdatamodel", source_engine, destination_engine)
+
+        with source_engine.connect() as connection:
+            data = self.get_default_entry_data("https://yahoo.com")
+            set_entry_json_defaults(data)
+            connection.execute(source_table.insert(), [data])
+            connection.execute(
+                source_table.update()
+                .where(source_table.c.link == "https://google.com/3")
+                .values(title="changed", date_update_last=datetime.now() + timedelta(days=1))
+            )
+            connection.commit()
+
+        # call tested function
+        backup_table_sqlite("workspace", "linkdatamodel", source_engine, destination_engine, incremental=True)
+
+        with destination_engine.connect() as connection:
+            table = ReflectedEntryTable(engine=destination_engine, connection=connection)
+            self.assertEqual(table.count(), 26)
+
+            entry = next(entry for entry in table.get_entries() if entry.link == "https://google.com/3")
+            self.assertEqual(entry.title, "changed")
+
+    def test_backup_table_sqlite__twice(self):
+        self.create_workspace_db("input.db")
+        self.clean_out()
+
+        source_engine = create_engine("sqlite:///input.db")
+        destination_engine = create_engine("sqlite:///output.db")
+
+        source_table = get_engine_table("workspace", "linkdatamodel", source_engine)
+        create_destionation_table("linkdatamodel", source_table, destination_engine)
+
+        backup_table_sqlite("workspace", "linkdatamodel", source_engine, destination_engine)
+
+        with source_engine.connect() as connection:
+            connection.execute(source_table.delete().where(source_table.c.link == "https://google.com/3"))
+            connection.commit()
+
+        # call tested function
+        backup_table_sqlite("workspace", "linkdatamodel", source_engine, destination_engine)
+
+        with destination_engine.connect() as connection:
+            table = ReflectedEntryTable(engine=destination_engine, connection=connection)
+            self.assertEqual(table.count(), 24)
+
+    def test_report_verification(self):
+        run_info = {"workspace": "places"}
+
+        digest = {"rows": 2, "max_id": 2, "hash": "abc", "columns": ["id"]}
+        manifest = BackupManifest("manifest.json")
+        manifest.set_table("linkdatamodel", digest)
+
+        results = {
+            ("source", "linkdatamodel"): dict(digest),
+            ("backup", "linkdatamodel"): dict(digest),
+        }
+
+        # call tested function
+        self.assertTrue(report_verification(run_info, manifest, results, ["source", "backup"]))
+
+        results[("backup", "linkdatamodel")]["hash"] = "def"
+        self.assertFalse(report_verification(run_info, manifest, results, ["source", "backup"]))
+
+        del results[("source", "linkdatamodel")]
+        self.assertFalse(report_verification(run_info, manifest, results, ["source"]))
+
+    def test_verify_dumps__plain(self):
+        run_info = {"workspace": "places", "format": "plain"}
+
+        manifest = BackupManifest("manifest.json")
+        for table_name in ["linkdatamodel", "sourcedatamodel", "usertags"]:
+            manifest.set_table(table_name, {"rows": 1, "max_id": 1, "hash": "abc", "columns": ["id"]})
+
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch("linkarchivetools.backup.output_directory", Path(directory)):
+                dump_dir = Path(directory) / "data" / "backup_plain" / "places"
+                dump_dir.mkdir(parents=True)
+
+                complete = "-- Data for Name: places_linkdatamodel; Type: TABLE DATA\n-- PostgreSQL database dump complete\n"
+                (dump_dir / "instance_linkdatamodel").write_text(complete)
+                # truncated dump
+                (dump_dir / "instance_sourcedatamodel").write_text("-- Data for Name: places_sourcedatamodel; Type: TABLE DATA\n")
+
+                results = {}
+                # call tested function
+                verify_dumps(run_info, manifest, results)
+
+        self.assertEqual(results[("dump", "linkdatamodel")], True)
+        self.assertEqual(results[("dump", "sourcedatamodel")], "dump is not complete")
+        self.assertIn("does not exist", results[("dump", "usertags")])
+
+        for table_name in ["linkdatamodel", "sourcedatamodel", "usertags"]:
+            results[("source", table_name)] = manifest.get_table(table_name)
+
+        self.assertFalse(report_verification(run_info, manifest, results, ["source", "dump"]))
+
+        results[("dump", "sourcedatamodel")] = True
+        results[("dump", "usertags")] = True
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertTrue(report_verification(run_info, manifest, results, ["source", "dump"]))
+        self.assertIn("NOT verified", output.getvalue())
@@ -1,5 +1,11 @@
+import json
+import time
+import threading
+from unittest import mock
 from datetime import datetime
 from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 from sqlalchemy import create_engine
 
 from linkarchivetools import (
@@ -12,7 +18,55 @@ from linkarchivetools.utils.reflected import (
 from .dbtestcase import DbTestCase
 
 
+class CrawlingServerHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in of crawling server. Every page has one feed.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        time.sleep(0.05)
+
+        query = parse_qs(urlparse(self.path).query)
+        url = query.get("url", [""])[0]
+
+        all_properties = [
+            {"name": "Properties", "data": {"link": url, "title": "Remote title", "feeds": [url + "/feed.xml"]}},
+            {"name": "Response", "data": {"url": url, "status_code": 200}},
+        ]
+
+        text = json.dumps(all_properties).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(text)))
+        self.end_headers()
+        self.wfile.write(text)
+
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
 class Db2FeedsTest(DbTestCase):
+    def start_crawling_server(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CrawlingServerHandler)
+        server.lock = threading.Lock()
+        server.requests = 0
+        server.in_flight = 0
+        server.max_in_flight = 0
+
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
     def test_constructor(self):
         self.create_db("input.db")
         self.clean_out()
@@ -127,3 +181,144 @@ class Db2FeedsTest(DbTestCase):
             #self.assertTrue(entry.body_hash)
             #self.assertTrue(entry.meta_hash)
             self.assertTrue(entry.title)
+
+    def test_convert__concurrent(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            for index in range(8):
+                table.insert_json(self.get_default_entry_data(url=f"https://site{index}.com"))
+
+        server = self.start_crawling_server()
+        remote_server = "http://127.0.0.1:{}".format(server.server_address[1])
+
+        try:
+            feeds = Db2Feeds(
+                input_db="input.db",
+                output_db="output.db",
+                verbose=False,
+                remote_server=remote_server,
+                read_internet_links=True,
+                workers=4,
+                timeout_s=5,
+            )
+            # call tested function
+            feeds.convert()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertTrue(server.max_in_flight > 1)
+        self.assertTrue(server.max_in_flight <= 4)
+
+        engine = create_engine(f"sqlite:///output.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            self.assertEqual(table.count(), 8)
+            self.assertTrue(table.exists(link="https://site3.com/feed.xml"))
+
+    def test_convert__cache(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        path = Path("cache.db")
+        if path.exists():
+            path.unlink()
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            for index in range(3):
+                table.insert_json(self.get_default_entry_data(url=f"https://site{index}.com"))
+
+        server = self.start_crawling_server()
+        remote_server = "http://127.0.0.1:{}".format(server.server_address[1])
+
+        def convert(refresh_older_than=None, server_location=remote_server):
+            feeds = Db2Feeds(
+                input_db="input.db",
+                output_db="output.db",
+                verbose=False,
+                clean=True,
+                remote_server=server_location,
+                read_internet_links=True,
+                cache_db="cache.db",
+                refresh_older_than=refresh_older_than,
+            )
+            feeds.convert()
+
+        try:
+            # results without remote server are not used, when remote server is set
+            convert(server_location="")
+            self.assertEqual(server.requests, 0)
+
+            convert()
+            self.assertEqual(server.requests, 3)
+
+            # call tested function
+            convert()
+            self.assertEqual(server.requests, 3)
+
+            convert(refresh_older_than=datetime.now())
+            self.assertEqual(server.requests, 6)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        engine = create_engine(f"sqlite:///output.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            self.assertEqual(table.count(), 3)
+            self.assertTrue(table.exists(link="https://site1.com/feed.xml"))
+
+    def test_cache_entry__error_status(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        feeds = Db2Feeds(input_db="input.db", output_db="output.db")
+        feeds.cache = mock.Mock()
+        entry = mock.Mock(link="https://site1.com")
+
+        # call tested function
+        feeds.cache_entry(entry, [], 404)
+        feeds.cache_entry(entry, [], 503)
+
+        feeds.cache.set.assert_not_called()
+
+        feeds.cache_entry(entry, [], 200)
+        feeds.cache.set.assert_called_once()
+
+    def test_convert__incremental(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        self.add_entry_with_tags("input.db")
+
+        feeds = Db2Feeds(input_db="input.db", output_db="output.db", verbose=False, incremental=True)
+        feeds.convert()
+
+        engine = create_engine(f"sqlite:///output.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            self.assertEqual(table.count(), 1)
+
+            # removed feed is not added again, because its entry was already processed
+            table.truncate()
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            table.insert_json(self.get_default_entry_data(url="https://youtube.com/channel/new"))
+
+        feeds = Db2Feeds(input_db="input.db", output_db="output.db", verbose=False, incremental=True)
+        # call tested function
+        feeds.convert()
+
+        engine = create_engine(f"sqlite:///output.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            self.assertEqual(table.count(), 1)
+            self.assertTrue(table.exists(link="https://www.youtube.com/feeds/videos.xml?channel_id=new"))
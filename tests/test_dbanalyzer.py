@@ -1,9 +1,15 @@
+import io
 import unittest
+from contextlib import redirect_stdout
 from types import SimpleNamespace
+from pathlib import Path
+from sqlalchemy import create_engine, text
 
 from linkarchivetools import (
    DbAnalyzer,
 )
+from linkarchivetools.dbanalyzer import DisplayRowHandler
+from linkarchivetools.utils.reflected import ReflectedGenericTable
 from .dbtestcase import DbTestCase
 
 
@@ -65,3 +71,170 @@ class Db2AnalyzerTest(DbTestCase):
             entries.append(entry)
 
         self.assertTrue(len(entries) > 0)
+
+    def test_get_entries__joined(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+        search = "*youtube.com*"
+        args = SimpleNamespace(search=search, ignore_case = True, verbosity=0, table=False, order_by=None, asc=True, desc=False,
+                               tags=True, social=True, source=True)
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        entries = []
+        for entry in analyzer.get_entries():
+            entries.append(entry)
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].tags, "#test tag")
+        self.assertEqual(entries[0].social_stars, 123)
+        self.assertEqual(entries[0].source_title, None)
+
+    def test_search__joined(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+        args = SimpleNamespace(search="*youtube.com*", ignore_case = True, verbosity=1, table=False, order_by=None, asc=True, desc=False,
+                               tags=True, social=True, source=True, json=False, rss=False, channels=False,
+                               votes=True, title=True, description=False, date_published=False, status=False)
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        entries = list(analyzer.search())
+
+        self.assertEqual(len(entries), 1)
+
+    def test_search__tags(self):
+        """
+        Tags are read from entrycompactedtags, tags of every user, not from usertags
+        """
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+        args = SimpleNamespace(search="*youtube.com*", ignore_case = True, verbosity=1, table=False, order_by=None, asc=True, desc=False,
+                               tags=True, social=False, source=False, json=False, rss=False, channels=False,
+                               votes=False, title=False, description=False, date_published=False, status=False)
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            # call tested function
+            entries = list(analyzer.search())
+
+        self.assertEqual(len(entries), 1)
+        self.assertIn("https://youtube.com/channel/12345678\n#test tag\n", output.getvalue())
+
+    def test_get_tags__not_joined(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine("sqlite:///input.db")
+        with engine.connect() as connection:
+            entry = connection.execute(text("SELECT * FROM linkdatamodel WHERE link LIKE '%youtube%'")).first()
+
+            handler = DisplayRowHandler(args=SimpleNamespace(), engine=engine, connection=connection)
+
+            # call tested function
+            tags = handler.get_tags(entry)
+
+        self.assertEqual(tags, "#test tag")
+
+    def test_aggregate(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+        self.add_entry_with_tags2("input.db")
+        args = SimpleNamespace(search=None, ignore_case = True, verbosity=0, table=False, order_by="count", asc=False, desc=True,
+                               group_by="domain(link)", aggregate="count,sum(page_rating_votes)", json=False, csv=False)
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        rows = list(analyzer.aggregate())
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]._mapping["domain(link)"], "youtube.com")
+        self.assertEqual(rows[0]._mapping["count"], 2)
+        self.assertEqual(rows[0]._mapping["sum(page_rating_votes)"], 160)
+
+    def test_aggregate__search(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+        args = SimpleNamespace(search="*youtube.com*", ignore_case = True, verbosity=0, table=False, order_by=None, asc=True, desc=False,
+                               group_by="status_code", aggregate="count,avg(page_rating_votes)", json=True, csv=False)
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        rows = list(analyzer.aggregate())
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].status_code, 200)
+        self.assertEqual(rows[0].count, 1)
+
+    def test_check_aggregate(self):
+        self.create_db("input.db")
+        args = SimpleNamespace(search=None, table=False, group_by="year(date_published)", aggregate="count,sum(page_rating_votes)")
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        # call tested function
+        self.assertIsNone(analyzer.check_aggregate())
+
+        args.group_by = "notexisting"
+        self.assertEqual(analyzer.check_aggregate(), "Invalid column: notexisting")
+
+        args.group_by = "week(date_published)"
+        self.assertEqual(analyzer.check_aggregate(), "Not implemented function: week")
+
+        args.group_by = "language"
+        args.aggregate = "median(page_rating_votes)"
+        self.assertEqual(analyzer.check_aggregate(), "Not implemented function: median")
+
+    def test_get_entries__view(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            table = ReflectedGenericTable(engine=engine, connection=connection, table_name="searchview")
+            table.insert_json_data({"name": "google", "default": False, "priority": 0,
+                                    "filter_statement": "link=*google*", "order_by": "-page_rating_votes",
+                                    "entry_limit": 0, "auto_fetch": False, "date_published_day_limit": 0,
+                                    "date_created_day_limit": 0, "user": False})
+
+        args = SimpleNamespace(search=None, ignore_case = True, verbosity=0, table=False, order_by=None, asc=True, desc=False,
+                               view="google")
+
+        analyzer = DbAnalyzer(input_db="input.db", args=args)
+
+        entries = list(analyzer.get_entries())
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].link, "https://google.com")
+
+    def test_get_entries__several_dbs(self):
+        self.create_db("input1.db")
+        self.create_db("input2.db")
+        self.add_entry_with_tags("input1.db")
+        self.add_entry_with_tags2("input2.db")
+        args = SimpleNamespace(search="*youtube.com*", ignore_case = True, verbosity=0, table=False, order_by="link", asc=True, desc=False,
+                               tags=True)
+
+        analyzer = DbAnalyzer(input_db="input1.db,input2.db", args=args)
+
+        entries = list(analyzer.get_entries())
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0].link, "https://youtube.com/channel/12345678")
+        self.assertEqual(entries[1].link, "https://youtube.com/channel/123456789")
+        self.assertEqual(entries[1].tags, "#test tag")
+
+    def test_get_entries__several_dbs_missing(self):
+        self.create_db("input1.db")
+        Path("input2.db").unlink(missing_ok=True)
+        args = SimpleNamespace(search=None, ignore_case = True, verbosity=0, table=False, order_by="link", asc=True, desc=False)
+
+        analyzer = DbAnalyzer(input_db="input1.db,input2.db", args=args)
+
+        # call tested function
+        entries = list(analyzer.get_entries())
+
+        self.assertEqual(entries, [])
+        self.assertFalse(Path("input2.db").exists())
@@ -2,7 +2,7 @@ import unittest
 from pathlib import Path
 from sqlalchemy import create_engine
 
-from linkarchivetools import DbFilter
+from linkarchivetools import DbFilter, DbMultiFilter, DbFilterOutput
 from linkarchivetools.utils.reflected import ReflectedGenericTable, ReflectedEntryTable
 from .dbtestcase import DbTestCase
 
@@ -126,6 +126,194 @@ class DbFilterTest(DbTestCase):
             self.assertIn("https://yahoo.com", links)
             self.assertNotIn("https://bing.com", links)
 
+    def test_filter_votes__dependent_rows(self):
+        self.create_db("input.db")
+        self.clean_out()
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine("sqlite:///input.db")
+        with engine.connect() as connection:
+            entry_table = ReflectedEntryTable(engine, connection)
+
+            data = self.get_default_entry_data("https://yahoo.com")
+            data["page_rating_votes"] = 0
+            entry_id = entry_table.insert_json(data)
+
+            ReflectedGenericTable(engine, connection, "entrycompactedtags").insert_json_data(
+                {"entry_id": entry_id, "tag": "removed"}
+            )
+            ReflectedGenericTable(engine, connection, "socialdata").insert_json_data(
+                {"entry_id": entry_id, "stars": 1}
+            )
+            ReflectedGenericTable(engine, connection, "uservotes").insert_json_data(
+                {"entry_id": entry_id, "vote": 1, "user_id": 1}
+            )
+
+        db_filter = DbFilter(input_db="input.db", output_db="output.db")
+        # call tested function
+        db_filter.filter_votes()
+        db_filter.close()
+
+        self.assertEqual(self.get_row_count("output.db", "linkdatamodel"), 2)
+        self.assertEqual(self.get_row_count("output.db", "entrycompactedtags"), 1)
+        self.assertEqual(self.get_row_count("output.db", "socialdata"), 1)
+        self.assertEqual(self.get_row_count("output.db", "uservotes"), 0)
+
+    def test_build__copy_in(self):
+        self.create_db("input.db")
+        self.clean_out()
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine("sqlite:///input.db")
+        with engine.connect() as connection:
+            entry_table = ReflectedEntryTable(engine, connection)
+
+            data = self.get_default_entry_data("https://yahoo.com")
+            data["page_rating_votes"] = 0
+            entry_id = entry_table.insert_json(data)
+
+            ReflectedGenericTable(engine, connection, "entrycompactedtags").insert_json_data(
+                {"entry_id": entry_id, "tag": "removed"}
+            )
+
+        db_filter = DbFilter(input_db="input.db", output_db="output.db", copy_in=True)
+        db_filter.filter_votes()
+        db_filter.truncate_no_users()
+        # call tested function
+        db_filter.build()
+        db_filter.close()
+
+        self.assertEqual(self.get_row_count("output.db", "linkdatamodel"), 2)
+        self.assertEqual(self.get_row_count("output.db", "entrycompactedtags"), 1)
+        self.assertEqual(self.get_row_count("output.db", "socialdata"), 1)
+        self.assertEqual(self.get_row_count("output.db", "user"), 0)
+        self.assertEqual(
+            self.get_row_count("output.db", "searchview"),
+            self.get_row_count("input.db", "searchview"),
+        )
+
+        engine = create_engine("sqlite:///output.db")
+        with engine.connect() as connection:
+            entry_table = ReflectedEntryTable(engine, connection)
+            self.assertFalse(entry_table.exists(link="https://yahoo.com"))
+
+            # unique constraints are preserved
+            with self.assertRaises(Exception):
+                entry_table.insert_json(self.get_default_entry_data("https://google.com"))
+
+    def add_filter_entries(self, file_name):
+        engine = create_engine(f"sqlite:///{file_name}")
+        with engine.connect() as connection:
+            entry_table = ReflectedEntryTable(engine, connection)
+
+            data = self.get_default_entry_data("https://google.com")
+            data["bookmarked"] = True
+            entry_table.insert_json(data)
+
+            data = self.get_default_entry_data("https://youtube.com/watch?v=1")
+            data["bookmarked"] = True
+            entry_table.insert_json(data)
+
+            data = self.get_default_entry_data("https://yahoo.com")
+            data["bookmarked"] = False
+            entry_table.insert_json(data)
+
+    def get_links(self, db_path):
+        engine = create_engine(f"sqlite:///{db_path}")
+        with engine.connect() as connection:
+            entry_table = ReflectedEntryTable(engine, connection)
+            return sorted(entry.link for entry in entry_table.get_entries())
+
+    def test_apply(self):
+        self.create_db("input.db")
+        self.clean_out()
+        self.add_filter_entries("input.db")
+
+        db_filter = DbFilter(input_db="input.db", output_db="output.db")
+        db_filter.keep("bookmarked == True")
+        db_filter.drop("link = *youtube.com*")
+        # call tested function
+        removed = db_filter.apply()
+        db_filter.close()
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(self.get_links("output.db"), ["https://google.com"])
+
+    def test_apply__copy_in(self):
+        self.create_db("input.db")
+        self.clean_out()
+        self.add_filter_entries("input.db")
+
+        db_filter = DbFilter(input_db="input.db", output_db="output.db", copy_in=True)
+        db_filter.keep("bookmarked == True")
+        db_filter.drop("link = *youtube.com*")
+        db_filter.apply()
+        # call tested function
+        db_filter.build()
+        db_filter.close()
+
+        self.assertEqual(self.get_links("output.db"), ["https://google.com"])
+
+    def test_compact__copy_in(self):
+        self.create_db("input.db")
+        self.clean_out()
+        self.add_filter_entries("input.db")
+
+        db_filter = DbFilter(input_db="input.db", output_db="output.db", copy_in=True)
+        db_filter.keep("bookmarked == True")
+        db_filter.build()
+        # call tested function
+        report = db_filter.compact(mode="into", output_file="compacted.db")
+        db_filter.close()
+
+        self.assertTrue(report is not None)
+        self.assertEqual(self.get_links("compacted.db"), ["https://google.com", "https://youtube.com/watch?v=1"])
+        Path("compacted.db").unlink()
+
+    def test_multi_filter(self):
+        self.create_db("input.db")
+        self.add_filter_entries("input.db")
+
+        engine = create_engine("sqlite:///input.db")
+        with engine.connect() as connection:
+            entry_table = ReflectedEntryTable(engine, connection)
+            entry = next(entry for entry in entry_table.get_entries() if entry.link == "https://yahoo.com")
+
+            ReflectedGenericTable(engine, connection, "entrycompactedtags").insert_json_data(
+                {"entry_id": entry.id, "tag": "yahoo"}
+            )
+
+        outputs = [
+            DbFilterOutput("output.db", keep=["bookmarked == True"], truncate="no_users"),
+            DbFilterOutput("output2.db", drop=["link = *youtube.com*"], truncate="internet"),
+        ]
+
+        multi_filter = DbMultiFilter("input.db", outputs, batch_size=2)
+        # call tested function
+        multi_filter.run()
+
+        self.assertEqual(
+            self.get_links("output.db"),
+            ["https://google.com", "https://youtube.com/watch?v=1"],
+        )
+        self.assertEqual(self.get_links("output2.db"), ["https://google.com", "https://yahoo.com"])
+
+        self.assertEqual(self.get_row_count("output.db", "entrycompactedtags"), 0)
+        self.assertEqual(self.get_row_count("output2.db", "entrycompactedtags"), 1)
+
+        self.assertEqual(self.get_row_count("output.db", "browser"), 0)
+        self.assertEqual(self.get_row_count("output.db", "userconfig"), 0)
+        self.assertEqual(
+            self.get_row_count("output2.db", "userconfig"),
+            self.get_row_count("input.db", "userconfig"),
+        )
+        self.assertEqual(
+            self.get_row_count("output.db", "searchview"),
+            self.get_row_count("input.db", "searchview"),
+        )
+
+        Path("output2.db").unlink()
+
     def test_truncate_no_users(self):
         self.create_db("input.db")
         self.clean_out()
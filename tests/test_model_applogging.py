@@ -1,6 +1,12 @@
+import time
+import logging
+from unittest import mock
+
 from linkarchivetools.model import (
    DbConnection,
    AppLogging,
+   BufferedAppLogging,
+   AppLoggingHandler,
 )
 
 from .dbtestcase import DbTestCase
@@ -15,3 +21,133 @@ class AppLoggingTest(DbTestCase):
 
         logs = AppLogging(connection=connection)
         self.assertEqual(logs.count(), 0)
+
+    def test_cleanup_overflow(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+        logs = AppLogging(connection=connection)
+
+        entries = [logs.get_entry_json(f"Test {index}") for index in range(10)]
+        connection.applogging.insert_json_data_many(entries)
+
+        with mock.patch.object(AppLogging, "get_max_log_entries", return_value=4):
+            # call tested function
+            removed = logs.cleanup_overflow()
+
+        self.assertEqual(removed, 6)
+        self.assertEqual(logs.count(), 4)
+
+        texts = [row.info_text for row in connection.applogging.get_where()]
+        self.assertEqual(sorted(texts), ["Test 6", "Test 7", "Test 8", "Test 9"])
+
+    def test_buffered(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+        logs = BufferedAppLogging(connection=connection, max_entries=5, max_delay=60)
+
+        # call tested function
+        for index in range(4):
+            logs.info(f"Test {index}")
+
+        self.assertEqual(logs.count(), 0)
+
+        logs.info("Test 4")
+        self.assertEqual(logs.count(), 5)
+
+        logs.info("Test 5")
+        self.assertEqual(logs.count(), 5)
+
+        logs.error("Error")
+        self.assertEqual(logs.count(), 7)
+
+        logs.info("Test 6")
+        logs.close()
+        self.assertEqual(logs.count(), 8)
+
+    def test_handler(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+        logs = BufferedAppLogging(connection=connection)
+
+        logger = logging.getLogger("test_applogging_handler")
+        logger.propagate = False
+        handler = AppLoggingHandler(logs)
+        logger.addHandler(handler)
+
+        # call tested function
+        logger.warning("Warning %s", "text")
+
+        handler.flush()
+        logger.removeHandler(handler)
+
+        rows = list(connection.applogging.get_where())
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].info_text, "Warning text")
+        self.assertEqual(rows[0].level, AppLogging.WARNING)
+
+    def test_buffered__max_delay(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+        logs = BufferedAppLogging(connection=connection, max_entries=5, max_delay=0.1)
+
+        # call tested function
+        logs.info("Test")
+
+        self.assertEqual(logs.count(), 0)
+
+        # no new entry is added, buffer is written by timer
+        for _ in range(50):
+            if logs.count() == 1:
+                break
+            time.sleep(0.1)
+
+        self.assertEqual(logs.count(), 1)
+        logs.close()
+
+    def test_buffered__timer_failed(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+        logs = BufferedAppLogging(connection=connection, max_entries=5, max_delay=60)
+
+        logs.info("Test")
+
+        with mock.patch.object(BufferedAppLogging, "flush", side_effect=Exception("Failed")):
+            with self.assertLogs("linkarchivetools.model.applogging", level="ERROR"):
+                # call tested function
+                logs.on_timer()
+
+        logs.close()
+        self.assertEqual(logs.count(), 1)
+
+    def test_buffered__insert_failed(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+        logs = BufferedAppLogging(connection=connection, max_entries=5, max_delay=60)
+
+        logs.info("Test 0")
+        logs.info("Test 1")
+
+        with mock.patch.object(connection.applogging, "insert_json_data_many", side_effect=Exception("Failed")):
+            # call tested function
+            with self.assertRaises(Exception):
+                logs.flush()
+
+        self.assertEqual(logs.count(), 0)
+        self.assertEqual(len(logs.entries), 2)
+
+        logs.close()
+
+        texts = [row.info_text for row in connection.applogging.get_where()]
+        self.assertEqual(sorted(texts), ["Test 0", "Test 1"])
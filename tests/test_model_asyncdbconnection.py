@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+
+from linkarchivetools.model import (
+   AsyncDbConnection,
+   AsyncEntries,
+   AsyncSourceData,
+   AsyncBackgroundJob,
+   DbConnection,
+   Sources,
+   SourceData,
+)
+
+from .dbtestcase import DbTestCase
+
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class AsyncDbConnectionTest(DbTestCase):
+    def test_entries_add(self):
+        self.create_db("input.db")
+
+        async def run():
+            connection = AsyncDbConnection("input.db")
+            entries = AsyncEntries(connection=connection)
+
+            links = ["https://google.com/{}".format(index) for index in range(20)]
+
+            # call tested function
+            ids = await asyncio.gather(
+                *[entries.add(entry_json={"link": link}) for link in links]
+            )
+
+            exists = await entries.exists(link="https://google.com/5")
+            count = await entries.count()
+
+            duplicate_id = await entries.add(entry_json={"link": "https://google.com/5"})
+
+            await connection.close()
+            return ids, exists, count, duplicate_id
+
+        ids, exists, count, duplicate_id = asyncio.run(run())
+
+        self.assertEqual(len(set(ids)), 20)
+        self.assertTrue(exists)
+        self.assertEqual(count, 20)
+        self.assertEqual(duplicate_id, None)
+
+    def test_sourcedata_is_update_needed(self):
+        self.create_db("input.db")
+
+        sync_connection = DbConnection("input.db")
+        sources = Sources(connection=sync_connection)
+        sources.truncate()
+        source_id = sources.set(source_url="https://google.com", source_properties={})
+        source = sources.get(source_id)
+        sync_connection.close()
+
+        async def run():
+            connection = AsyncDbConnection("input.db")
+            source_data = AsyncSourceData(connection=connection)
+
+            before = await source_data.is_update_needed(source)
+
+            await connection.close()
+            return before
+
+        self.assertTrue(asyncio.run(run()))
+
+        sync_connection = DbConnection("input.db")
+        SourceData(connection=sync_connection).mark_read(source)
+        sync_connection.close()
+
+        async def run_after():
+            connection = AsyncDbConnection("input.db")
+            source_data = AsyncSourceData(connection=connection)
+
+            after = await source_data.is_update_needed(source)
+
+            await connection.close()
+            return after
+
+        self.assertFalse(asyncio.run(run_after()))
+
+    def test_backgroundjob_create_single_job(self):
+        self.create_db("input.db")
+
+        async def run():
+            connection = AsyncDbConnection("input.db")
+            await connection.backgroundjob.truncate()
+
+            jobs = AsyncBackgroundJob(connection=connection)
+
+            # call tested function
+            job_id = await jobs.create_single_job("link-add", subject="https://google.com")
+            second_id = await jobs.create_single_job("link-add", subject="https://google.com")
+
+            count = await connection.backgroundjob.count()
+
+            await connection.close()
+            return job_id, second_id, count
+
+        job_id, second_id, count = asyncio.run(run())
+
+        self.assertTrue(job_id is not None)
+        self.assertEqual(second_id, None)
+        self.assertEqual(count, 1)
@@ -94,3 +94,86 @@ class BackgroundJobTest(DbTestCase):
         self.assertTrue(jobs.is_job(job_name="test-job", subject="test subject"))
         # call tested function
         self.assertFalse(jobs.is_job(job_name="test-job", subject="test subject 2"))
+
+    def test_enqueue_many(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+
+        jobs = BackgroundJob(connection=connection)
+        jobs.truncate()
+        jobs.create_indexes()
+
+        jobs.create_single_job(job_name="test-job", subject="subject 0")
+
+        # call tested function
+        count = jobs.enqueue_many([
+            {"job": "test-job", "subject": "subject 0"},
+            {"job": "test-job", "subject": "subject 1"},
+            {"job": "test-job", "subject": "subject 1"},
+            {"job": "test-job", "subject": "subject 2", "priority": 0, "cfg": {"a": 1}},
+        ])
+
+        self.assertEqual(count, 2)
+        self.assertEqual(jobs.count(), 3)
+
+    def test_claim(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+
+        jobs = BackgroundJob(connection=connection)
+        jobs.truncate()
+        jobs.enqueue_many([
+            {"job": "test-job", "subject": "low", "priority": 5},
+            {"job": "test-job", "subject": "first", "priority": 1},
+            {"job": "test-job", "subject": "second", "priority": 1},
+            {"job": "test-job", "subject": "high", "priority": 0},
+        ])
+
+        # call tested function
+        claimed = jobs.claim(3, worker_id="worker-1")
+
+        self.assertEqual([job.subject for job in claimed], ["high", "first", "second"])
+        self.assertTrue(all(job.task == "worker-1" for job in claimed))
+
+        claimed = jobs.claim(3, worker_id="worker-2")
+        self.assertEqual([job.subject for job in claimed], ["low"])
+
+        self.assertEqual(jobs.claim(3, worker_id="worker-3"), [])
+
+        self.assertEqual(jobs.release("worker-2"), 1)
+        self.assertEqual(len(jobs.claim(3, worker_id="worker-3")), 1)
+
+    def test_complete_fail(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+
+        jobs = BackgroundJob(connection=connection)
+        jobs.truncate()
+        connection.backgroundjobhistory.truncate()
+        jobs.enqueue_many([
+            {"job": "test-job", "subject": "ok"},
+            {"job": "test-job", "subject": "failing"},
+        ])
+
+        ok_job, failing_job = sorted(jobs.claim(2, worker_id="worker"), key=lambda job: job.subject, reverse=True)
+
+        # call tested function
+        self.assertEqual(jobs.complete(ok_job.id), 1)
+
+        self.assertEqual(jobs.count(), 1)
+        self.assertEqual(connection.backgroundjobhistory.count(), 1)
+
+        # failed job is queued again
+        self.assertEqual(jobs.fail(failing_job.id, max_errors=2), 0)
+        claimed = jobs.claim(1, worker_id="worker")
+        self.assertEqual([job.id for job in claimed], [failing_job.id])
+
+        self.assertEqual(jobs.fail(failing_job.id, max_errors=2), 1)
+        self.assertEqual(jobs.count(), 0)
+        self.assertEqual(connection.backgroundjobhistory.count(), 2)
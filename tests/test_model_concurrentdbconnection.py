@@ -0,0 +1,81 @@
+import threading
+import time
+from sqlalchemy import text
+
+from linkarchivetools.model import (
+   ConcurrentDbConnection,
+   SerializedWriter,
+   Entries,
+   AppLogging,
+)
+
+from .dbtestcase import DbTestCase
+
+
+class ConcurrentDbConnectionTest(DbTestCase):
+    def test_add__threads(self):
+        self.create_db("input.db")
+
+        connection = ConcurrentDbConnection("input.db")
+        errors = []
+
+        def add_entries(thread_index):
+            try:
+                entries = Entries(connection=connection)
+                for index in range(10):
+                    entry_json = self.get_default_entry_data(f"https://google.com/{thread_index}/{index}")
+                    self.assertIsNotNone(entries.add(entry_json))
+            except Exception as E:
+                errors.append(E)
+
+        threads = [threading.Thread(target=add_entries, args=(index,)) for index in range(4)]
+
+        # call tested function
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(connection.entries_table.count(), 40)
+
+        statistics = connection.get_write_statistics()
+        self.assertEqual(statistics["writes"], 40)
+        self.assertEqual(statistics["errors"], 0)
+        self.assertLessEqual(statistics["commits"], 40)
+        self.assertIn("p95_latency_s", statistics)
+
+        connection.close()
+
+    def test_write__error(self):
+        self.create_db("input.db")
+
+        connection = ConcurrentDbConnection("input.db")
+
+        logs = AppLogging(connection=connection)
+        logs.info("Test")
+
+        # call tested function
+        with self.assertRaises(Exception):
+            connection.applogging.insert_json_data({"level": 10})
+
+        self.assertEqual(connection.applogging.count(), 1)
+        self.assertEqual(connection.get_write_statistics()["errors"], 1)
+
+        connection.close()
+
+    def test_submit__writer_failed(self):
+        writer = SerializedWriter("does_not_exist/input.db")
+        writer.start()
+
+        start_time = time.time()
+
+        # call tested function
+        with self.assertRaises(RuntimeError):
+            writer.submit(text("DELETE FROM applogging"))
+
+        self.assertLess(time.time() - start_time, 5)
+        self.assertIsNotNone(writer.error)
+        self.assertFalse(writer.thread.is_alive())
+
+        writer.stop()
@@ -19,3 +19,17 @@ class DbConnectionTest(DbTestCase):
 
         self.connection.truncate()
         self.connection.close()
+
+    def test_constructor__shared_engine(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        # call tested function
+        first = DbConnection("input.db")
+        second = DbConnection("input.db")
+
+        self.assertIs(first.engine, second.engine)
+        self.assertIs(first.entries_table.get_table(), second.entries_table.get_table())
+
+        first.close()
+        second.close()
@@ -46,3 +46,25 @@ class SocialDataTest(DbTestCase):
         socialdata.add(entry_id, social_data_json)
 
         self.assertEqual(socialdata.count(), 1)
+
+    def test_cleanup(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        connection = DbConnection("input.db")
+
+        entries = Entries(connection=connection)
+        socialdata = SocialData(connection=connection)
+        socialdata.truncate()
+
+        entry_id = entries.add({"link": "https://google.com"})
+        socialdata.add(entry_id, {"stars": 1})
+        socialdata.add(entry_id + 1, {"stars": 2})
+
+        self.assertEqual(socialdata.count(), 2)
+
+        # call tested function
+        socialdata.cleanup()
+
+        self.assertEqual(socialdata.count(), 1)
+        self.assertTrue(socialdata.get(entry_id))
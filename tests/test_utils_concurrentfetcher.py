@@ -0,0 +1,38 @@
+import time
+from unittest import TestCase
+
+from linkarchivetools.utils.concurrentfetcher import ConcurrentFetcher, HostRateLimiter
+
+
+class ConcurrentFetcherTest(TestCase):
+    def test_fetch(self):
+        def fetch(item):
+            if item == 3:
+                raise ValueError("Cannot fetch")
+            return item * 2
+
+        fetcher = ConcurrentFetcher(fetch, max_in_flight=3)
+
+        # call tested function
+        results = list(fetcher.fetch(range(6)))
+
+        self.assertEqual(len(results), 6)
+
+        values = {item: value for item, value, exception in results if exception is None}
+        self.assertEqual(values, {0: 0, 1: 2, 2: 4, 4: 8, 5: 10})
+
+        errors = [item for item, value, exception in results if exception is not None]
+        self.assertEqual(errors, [3])
+
+    def test_rate_limiter(self):
+        limiter = HostRateLimiter(interval_s=0.05)
+
+        start = time.monotonic()
+
+        # call tested function
+        limiter.wait("https://google.com/1")
+        limiter.wait("https://linkedin.com/1")
+        limiter.wait("https://google.com/2")
+        limiter.wait("https://google.com/3")
+
+        self.assertTrue(time.monotonic() - start >= 0.1)
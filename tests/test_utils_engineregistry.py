@@ -0,0 +1,212 @@
+import os
+import time
+import shutil
+from unittest import mock
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool, QueuePool
+
+from linkarchivetools.utils.engineregistry import EngineRegistry
+from .dbtestcase import DbTestCase
+
+
+class EngineRegistryTest(DbTestCase):
+    def test_get_engine(self):
+        self.create_db("input.db")
+        registry = EngineRegistry()
+
+        # call tested function
+        engine = registry.get_engine("input.db")
+
+        self.assertIs(registry.get_engine("input.db"), engine)
+        self.assertIs(registry.get_engine(os.path.abspath("input.db")), engine)
+        self.assertIsNot(registry.get_engine("input.db", "nopool"), engine)
+        self.assertIsInstance(engine.pool, QueuePool)
+
+        registry.dispose()
+
+    def test_get_engine__file_replaced(self):
+        self.create_db("input.db")
+        registry = EngineRegistry()
+        engine = registry.get_engine("input.db")
+
+        # pooled connection keeps removed file open
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        os.remove("input.db")
+        self.create_db("input.db")
+
+        # call tested function
+        self.assertIsNot(registry.get_engine("input.db"), engine)
+
+        registry.dispose()
+
+    def test_get_engine__memory(self):
+        registry = EngineRegistry()
+
+        # call tested function
+        engine = registry.get_engine(":memory:")
+
+        self.assertIsInstance(engine.pool, StaticPool)
+
+        with engine.connect() as connection:
+            connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+            connection.commit()
+
+        # the same DB is seen by all connections
+        table = registry.get_table(registry.get_engine(":memory:"), "items")
+        self.assertIn("id", table.c)
+
+        registry.dispose()
+
+    def test_get_table(self):
+        self.create_db("input.db")
+        registry = EngineRegistry()
+        engine = registry.get_engine("input.db")
+
+        # call tested function
+        table = registry.get_table(engine, "linkdatamodel")
+
+        self.assertIs(registry.get_table(engine, "linkdatamodel"), table)
+
+        other_engine = create_engine("sqlite:///input.db")
+        self.assertIsNot(registry.get_table(other_engine, "linkdatamodel"), table)
+        other_engine.dispose()
+
+        registry.dispose()
+
+    def test_evict_idle(self):
+        self.create_db("input.db")
+        registry = EngineRegistry(idle_timeout=10)
+        engine = registry.get_engine("input.db")
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        self.assertEqual(engine.pool.checkedin(), 1)
+
+        entry = registry.get_engine_entry(engine)
+
+        # call tested function
+        self.assertEqual(registry.evict_idle(now=entry.last_used + 1), 0)
+        self.assertEqual(registry.evict_idle(now=entry.last_used + 20), 1)
+
+        self.assertEqual(engine.pool.checkedin(), 0)
+        self.assertIs(registry.get_engine("input.db"), engine)
+
+        registry.dispose()
+
+    def test_get_table__file_overwritten(self):
+        self.create_db("input.db")
+        registry = EngineRegistry(schema_check_interval=0)
+        engine = registry.get_engine("input.db")
+
+        table = registry.get_table(engine, "linkdatamodel")
+        self.assertNotIn("extra_column", table.c)
+
+        self.create_db("output.db")
+        output_engine = create_engine("sqlite:///output.db")
+        with output_engine.connect() as connection:
+            connection.execute(text("ALTER TABLE linkdatamodel ADD COLUMN extra_column INTEGER"))
+            connection.commit()
+        output_engine.dispose()
+
+        shutil.copy("output.db", "input.db")
+
+        # call tested function
+        table = registry.get_table(registry.get_engine("input.db"), "linkdatamodel")
+
+        self.assertIn("extra_column", table.c)
+
+        registry.dispose()
+        self.clean_out()
+
+    def test_get_table__schema_changed(self):
+        self.create_db("input.db")
+        registry = EngineRegistry(schema_check_interval=0)
+        engine = registry.get_engine("input.db")
+
+        registry.get_table(engine, "linkdatamodel")
+
+        other_engine = create_engine("sqlite:///input.db")
+        with other_engine.connect() as connection:
+            connection.execute(text("ALTER TABLE linkdatamodel ADD COLUMN extra_column INTEGER"))
+            connection.commit()
+        other_engine.dispose()
+
+        # call tested function
+        table = registry.get_table(engine, "linkdatamodel")
+
+        self.assertIn("extra_column", table.c)
+
+        registry.dispose()
+
+    def test_get_table__data_changed(self):
+        self.create_db("input.db")
+        registry = EngineRegistry(schema_check_interval=0)
+        engine = registry.get_engine("input.db")
+
+        table = registry.get_table(engine, "linkdatamodel")
+
+        with engine.connect() as connection:
+            connection.execute(table.delete())
+            connection.commit()
+
+        # call tested function
+        self.assertIs(registry.get_table(engine, "linkdatamodel"), table)
+
+        registry.dispose()
+
+    def test_get_table__schema_check_interval(self):
+        self.create_db("input.db")
+        registry = EngineRegistry(schema_check_interval=60)
+        engine = registry.get_engine("input.db")
+
+        table = registry.get_table(engine, "linkdatamodel")
+        entry = registry.get_engine_entry(engine)
+
+        with mock.patch.object(entry, "get_schema_version") as get_schema_version:
+            # call tested function
+            self.assertIs(registry.get_table(engine, "linkdatamodel"), table)
+
+        get_schema_version.assert_not_called()
+
+        registry.dispose()
+
+    def test_invalidate(self):
+        self.create_db("input.db")
+        registry = EngineRegistry(schema_check_interval=60)
+        engine = registry.get_engine("input.db")
+
+        registry.get_table(engine, "linkdatamodel")
+
+        with engine.connect() as connection:
+            connection.execute(text("ALTER TABLE linkdatamodel ADD COLUMN extra_column INTEGER"))
+            connection.commit()
+
+        # call tested function
+        registry.invalidate(engine)
+
+        table = registry.get_table(engine, "linkdatamodel")
+        self.assertIn("extra_column", table.c)
+
+        registry.dispose()
+
+    def test_get_engine__evicts_idle(self):
+        self.create_db("input.db")
+        self.create_db("output.db")
+        registry = EngineRegistry(idle_timeout=0.2)
+
+        engine = registry.get_engine("input.db")
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        self.assertEqual(engine.pool.checkedin(), 1)
+
+        time.sleep(0.3)
+
+        # call tested function
+        registry.get_engine("output.db")
+
+        self.assertEqual(engine.pool.checkedin(), 0)
+
+        registry.dispose()
+        self.clean_out()
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+
+from linkarchivetools.utils.federatedsearch import FederatedSearch, get_db_files
+from linkarchivetools.utils.reflected import (
+   ReflectedEntryTable,
+)
+from .dbtestcase import DbTestCase
+
+
+class FederatedSearchTest(DbTestCase):
+    def add_entry(self, file_name, url, votes):
+        engine = create_engine(f"sqlite:///{file_name}")
+        with engine.connect() as connection:
+            data = self.get_default_entry_data(url=url)
+            data["page_rating_votes"] = votes
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            table.insert_json(data)
+
+    def test_get_db_files(self):
+        self.assertEqual(get_db_files("input1.db, input2.db"), ["input1.db", "input2.db"])
+        self.assertEqual(get_db_files(""), [])
+
+    def test_get_db_files__glob(self):
+        self.create_db("input1.db")
+        self.create_db("input2.db")
+
+        files = get_db_files("input*.db")
+
+        self.assertIn("input1.db", files)
+        self.assertIn("input2.db", files)
+
+    def test_search__desc(self):
+        self.create_db("input1.db")
+        self.create_db("input2.db")
+
+        self.add_entry("input1.db", "https://one.com", 30)
+        self.add_entry("input1.db", "https://two.com", 10)
+        self.add_entry("input2.db", "https://three.com", 20)
+        self.add_entry("input2.db", "https://four.com", 5)
+
+        args = SimpleNamespace(search="*.com*", ignore_case=True, table=False, order_by="page_rating_votes", asc=False, desc=True)
+
+        searcher = FederatedSearch(["input1.db", "input2.db"], args.search, args=args)
+
+        # call tested function
+        links = [row.link for row in searcher.search()]
+
+        self.assertEqual(links, ["https://one.com", "https://three.com", "https://two.com", "https://four.com"])
+
+    def test_search__asc(self):
+        self.create_db("input1.db")
+        self.create_db("input2.db")
+
+        self.add_entry("input1.db", "https://one.com", 30)
+        self.add_entry("input2.db", "https://three.com", 20)
+
+        args = SimpleNamespace(search="*.com*", ignore_case=True, table=False, order_by="page_rating_votes", asc=True, desc=False)
+
+        searcher = FederatedSearch(["input1.db", "input2.db"], args.search, args=args)
+
+        # call tested function
+        links = [row.link for row in searcher.search()]
+
+        self.assertEqual(links, ["https://three.com", "https://one.com"])
+
+    def test_search__not_existing_table(self):
+        self.create_db("input1.db")
+
+        args = SimpleNamespace(search="*.com*", ignore_case=True, table="not_existing", order_by="id", asc=True, desc=False)
+
+        searcher = FederatedSearch(["input1.db"], args.search, args=args)
+
+        with self.assertRaises(IOError):
+            list(searcher.search())
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+
+from linkarchivetools.utils.feedcache import FeedCache
+from .dbtestcase import DbTestCase
+
+
+class FeedCacheTest(DbTestCase):
+    def test_set_get(self):
+        self.create_db("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            cache = FeedCache(engine, connection)
+
+            date_published = datetime(2024, 5, 1, 10, 0, 0)
+            feeds = [("https://google.com/feed.xml", {"title": "Google", "date_published": date_published})]
+
+            # call tested function
+            cache.set("https://google.com", feeds, status_code=200)
+
+            self.assertEqual(cache.get("https://google.com"), feeds)
+            self.assertEqual(cache.get("https://linkedin.com"), None)
+
+    def test_get__expired(self):
+        self.create_db("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            cache = FeedCache(engine, connection, ttl_days=30)
+            cache.set("https://google.com", [], status_code=200)
+
+            self.assertEqual(cache.get("https://google.com"), [])
+
+            cache.refresh_older_than = datetime.now() + timedelta(seconds=1)
+
+            # call tested function
+            self.assertEqual(cache.get("https://google.com"), None)
+
+    def test_get__other_fetch_mode(self):
+        self.create_db("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            cache = FeedCache(engine, connection, fetch_mode="local")
+            cache.set("https://google.com", [("https://google.com/feed.xml", None)], status_code=None)
+
+            # call tested function
+            self.assertEqual(cache.get("https://google.com"), [("https://google.com/feed.xml", None)])
+
+            cache.fetch_mode = "remote-read,update-feed"
+            self.assertEqual(cache.get("https://google.com"), None)
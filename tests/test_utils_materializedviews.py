@@ -0,0 +1,123 @@
+from datetime import datetime
+from sqlalchemy import create_engine
+
+from linkarchivetools.utils.materializedviews import MaterializedViews
+from linkarchivetools.utils.reflected import (
+   ReflectedEntryTable,
+   ReflectedGenericTable,
+)
+from .dbtestcase import DbTestCase
+
+
+class MaterializedViewsTest(DbTestCase):
+    def add_view(self, engine, connection, name, filter_statement, order_by="", entry_limit=0):
+        table = ReflectedGenericTable(engine=engine, connection=connection, table_name="searchview")
+        json_data = {}
+        json_data["name"] = name
+        json_data["default"] = False
+        json_data["priority"] = 0
+        json_data["filter_statement"] = filter_statement
+        json_data["hover_text"] = ""
+        json_data["icon"] = ""
+        json_data["order_by"] = order_by
+        json_data["entry_limit"] = entry_limit
+        json_data["auto_fetch"] = False
+        json_data["date_published_day_limit"] = 0
+        json_data["date_created_day_limit"] = 0
+        json_data["user"] = False
+        return table.insert_json_data(json_data)
+
+    def test_refresh_view(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            self.add_view(engine, connection, "youtube", "link=*youtube.com*")
+
+            views = MaterializedViews(engine, connection)
+            view = views.get_view("youtube")
+            self.assertFalse(views.is_materialized(view))
+
+            # call tested function
+            count = views.refresh_view(view)
+
+            self.assertEqual(count, 1)
+            self.assertTrue(views.is_materialized(view))
+
+            entries_table = ReflectedEntryTable(engine=engine, connection=connection)
+            entry_ids = list(views.get_entry_ids(view))
+            self.assertEqual(entries_table.get(entry_ids[0]).link, "https://youtube.com/channel/12345678")
+
+    def test_refresh_view__incremental(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            self.add_view(engine, connection, "youtube", "link=*youtube.com*")
+
+            views = MaterializedViews(engine, connection)
+            view = views.get_view("youtube")
+            views.refresh_view(view)
+
+            entries_table = ReflectedEntryTable(engine=engine, connection=connection)
+
+            data = self.get_default_entry_data(url="https://youtube.com/channel/new")
+            data["date_created"] = datetime.now()
+            new_id = entries_table.insert_json(data)
+
+            data = self.get_default_entry_data(url="https://other.com")
+            data["date_created"] = datetime.now()
+            entries_table.insert_json(data)
+
+            for entry in entries_table.get_where({"link": "https://youtube.com/channel/12345678"}):
+                entries_table.delete(entry.id)
+
+            # call tested function
+            count = views.refresh_view(view)
+
+            self.assertEqual(count, 1)
+            self.assertEqual(list(views.get_entry_ids(view)), [new_id])
+
+    def test_refresh_view__no_filter(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            self.add_view(engine, connection, "all", "")
+
+            views = MaterializedViews(engine, connection)
+            view = views.get_view("all")
+
+            # call tested function
+            count = views.refresh_view(view)
+
+            self.assertEqual(count, 2)
+
+    def test_refresh_view__filter_changed(self):
+        self.create_db("input.db")
+        self.add_entry_with_tags("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            view_id = self.add_view(engine, connection, "youtube", "link=*youtube.com*")
+
+            views = MaterializedViews(engine, connection)
+            views.refresh_view(views.get_view("youtube"))
+
+            table = ReflectedGenericTable(engine=engine, connection=connection, table_name="searchview")
+            table.update_json_data(view_id, {"filter_statement": "link=*other*"})
+
+            view = views.get_view("youtube")
+            self.assertFalse(views.is_materialized(view))
+
+            # call tested function
+            count = views.refresh_view(view)
+
+            self.assertEqual(count, 0)
+            self.assertTrue(views.is_materialized(view))
+
+            watermarks = ReflectedGenericTable(engine=engine, connection=connection, table_name="watermark")
+            self.assertEqual(watermarks.count(), 1)
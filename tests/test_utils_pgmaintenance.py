@@ -0,0 +1,41 @@
+from sqlalchemy import create_engine
+
+from linkarchivetools.utils.pgmaintenance import PgMaintenance, MaintenanceReport
+from .dbtestcase import DbTestCase
+
+
+class PgMaintenanceTest(DbTestCase):
+    def test_get_command_sql(self):
+        maintenance = PgMaintenance(None)
+
+        self.assertEqual(maintenance.get_command_sql("vacuum", "places_linkdatamodel"), "VACUUM places_linkdatamodel")
+        self.assertEqual(maintenance.get_command_sql("SELECT COUNT(*) FROM {table}", "t"), "SELECT COUNT(*) FROM t")
+
+    def test_run(self):
+        self.create_db("input.db")
+
+        engine = create_engine("sqlite:///input.db")
+        maintenance = PgMaintenance(engine)
+
+        # call tested function
+        reports = maintenance.run("analyze", ["linkdatamodel", "sourcedatamodel", "does_not_exist"], jobs=2)
+
+        self.assertEqual(len(reports), 3)
+        self.assertIsNone(reports[0].error)
+        self.assertIsNone(reports[1].error)
+        self.assertIsNotNone(reports[2].error)
+        self.assertFalse(maintenance.is_successful())
+
+        engine.dispose()
+
+    def test_report(self):
+        report = MaintenanceReport(
+            "vacuum",
+            "linkdatamodel",
+            before={"n_live_tup": 10, "n_dead_tup": 5, "total_bytes": 8192},
+            after={"n_live_tup": 10, "n_dead_tup": 0, "total_bytes": 4096},
+        )
+
+        self.assertEqual(report.get_dead_rows_removed(), 5)
+        self.assertEqual(report.get_bytes_freed(), 4096)
+        self.assertIn("dead rows 5 -> 0", str(report))
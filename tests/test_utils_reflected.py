@@ -8,6 +8,10 @@ from linkarchivetools.utils.reflected import (
    ReflectedSourceTable,
    ReflectedTable,
    ReflectedConfigurationEntry,
+   ReflectedEntryCompactedTags,
+   ReflectedSocialData,
+   EntryCopier,
+   set_entry_json_defaults,
 )
 from .dbtestcase import DbTestCase
 
@@ -31,6 +35,25 @@ class UtilsReflectedEntryTableTest(DbTestCase):
             self.assertEqual(table.count(), 1)
             self.assertTrue(entry_id)
 
+    def test_insert_json_data_many__return_ids(self):
+        self.create_db("input1.db")
+
+        engine = create_engine(f"sqlite:///input1.db")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            table.truncate()
+
+            rows = []
+            for index in range(5):
+                rows.append(set_entry_json_defaults(self.get_default_entry_data(f"https://test.com/{index}")))
+
+            # call tested function
+            entry_ids = table.insert_json_data_many(rows, return_ids=True)
+
+            self.assertEqual(len(entry_ids), 5)
+            for index, entry_id in enumerate(entry_ids):
+                self.assertEqual(table.get(entry_id).link, f"https://test.com/{index}")
+
     def test_is__link(self):
         self.create_db("input1.db")
 
@@ -228,3 +251,36 @@ class ReflectedConfigurationEntryTest(DbTestCase):
         with engine.connect() as connection:
             table = ReflectedConfigurationEntry(engine=engine, connection=connection)
             table.add_configuration()
+
+
+class EntryCopierTest(DbTestCase):
+    def test_copy_entries(self):
+        self.create_db("input1.db")
+        self.create_db("input2.db")
+        self.add_entry_with_tags("input1.db")
+
+        src_engine = create_engine(f"sqlite:///input1.db")
+        dst_engine = create_engine(f"sqlite:///input2.db")
+        with src_engine.connect() as src_connection:
+            with dst_engine.connect() as dst_connection:
+                entries = list(ReflectedEntryTable(src_engine, src_connection).get_entries())
+
+                copier = EntryCopier(src_engine, src_connection, dst_engine, dst_connection)
+
+                # call tested function
+                new_ids = copier.copy_entries(entries)
+                self.assertEqual(len(new_ids), 2)
+
+                # entries already present are skipped
+                self.assertEqual(copier.copy_entries(entries), [])
+
+                dst_entries = ReflectedEntryTable(dst_engine, dst_connection)
+                self.assertEqual(dst_entries.count(), 2)
+
+                entry = list(dst_entries.get_where({"link": "https://youtube.com/channel/12345678"}))[0]
+
+                tags = ReflectedEntryCompactedTags(dst_engine, dst_connection)
+                self.assertEqual(tags.get_tags(entry.id), ["test tag"])
+
+                social = ReflectedSocialData(dst_engine, dst_connection)
+                self.assertEqual(social.get(entry.id).stars, 123)
@@ -0,0 +1,73 @@
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+from linkarchivetools.utils.reflected import ReflectedGenericTable
+from linkarchivetools.utils.snapshotprocessor import SnapshotProcessor
+from .dbtestcase import DbTestCase
+
+
+class SnapshotProcessorTest(DbTestCase):
+    def test_process(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        engine = create_engine("sqlite:///input.db")
+        with engine.connect() as connection:
+            connection.execute(text("DELETE FROM user"))
+            connection.execute(
+                text(
+                    "INSERT INTO user (username, password, is_superuser) VALUES "
+                    "('root', 'secret', 1), ('other', 'secret', 1), ('user', 'secret', 0)"
+                )
+            )
+            connection.commit()
+
+            processor = SnapshotProcessor(engine, connection)
+            # call tested function
+            report = processor.process(
+                obfuscate=True,
+                truncate_tables=["browser", "notexisting"],
+                indexes=[("linkdatamodel", "title")],
+                vacuum_into="output.db",
+            )
+
+            rows = connection.execute(text("SELECT username, password FROM user ORDER BY id")).fetchall()
+
+            self.assertEqual([row.password for row in rows], ["", "", ""])
+            self.assertEqual(rows[0].username, "admin")
+            self.assertTrue(rows[1].username.startswith("admin_"))
+            self.assertEqual(rows[2].username, "user")
+
+            self.assertEqual(ReflectedGenericTable(engine, connection, "browser").count(), 0)
+
+            index = connection.execute(
+                text("SELECT name FROM sqlite_master WHERE name = 'idx_linkdatamodel_title'")
+            ).first()
+            self.assertTrue(index)
+
+        self.assertTrue(Path("output.db").exists())
+        self.assertTrue(report is not None)
+
+    def test_obfuscate_users__taken_names(self):
+        self.create_db("input.db")
+        self.clean_out()
+
+        engine = create_engine("sqlite:///input.db")
+        with engine.connect() as connection:
+            connection.execute(text("DELETE FROM user"))
+            connection.execute(
+                text(
+                    "INSERT INTO user (id, username, password, is_superuser) VALUES "
+                    "(1, 'admin', 'secret', 0), (2, 'root', 'secret', 1), "
+                    "(3, 'admin_4', 'secret', 0), (4, 'other', 'secret', 1)"
+                )
+            )
+            connection.commit()
+
+            processor = SnapshotProcessor(engine, connection)
+            # call tested function
+            processor.obfuscate_users()
+
+            rows = connection.execute(text("SELECT username FROM user ORDER BY id")).fetchall()
+
+            self.assertEqual([row.username for row in rows], ["admin", "admin_2", "admin_4", "other"])
@@ -0,0 +1,71 @@
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+from linkarchivetools.utils.reflected import ReflectedEntryTable
+from linkarchivetools.utils.sqlitecompaction import SqliteCompaction
+from .dbtestcase import DbTestCase
+
+
+class SqliteCompactionTest(DbTestCase):
+    def add_and_remove_entries(self, engine, connection):
+        table = ReflectedEntryTable(engine=engine, connection=connection)
+        for index in range(200):
+            data = self.get_default_entry_data("https://google.com/{}".format(index))
+            data["description"] = "x" * 2000
+            table.insert_json(data)
+
+        table.truncate()
+
+    def test_compact__full(self):
+        self.create_db("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            self.add_and_remove_entries(engine, connection)
+
+            compaction = SqliteCompaction(engine, connection)
+            # call tested function
+            report = compaction.compact(mode="full")
+
+            self.assertGreater(report.get_pages_freed(), 0)
+            self.assertEqual(report.free_pages_after, 0)
+
+    def test_compact__incremental(self):
+        self.create_db("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            compaction = SqliteCompaction(engine, connection)
+            self.assertFalse(compaction.is_incremental())
+
+            # not incremental yet, full vacuum enables it
+            compaction.compact(mode="incremental")
+            self.assertTrue(compaction.is_incremental())
+
+            self.add_and_remove_entries(engine, connection)
+
+            free_pages = compaction.get_pragma("freelist_count")
+            self.assertGreater(free_pages, 10)
+
+            # call tested function
+            report = compaction.compact(mode="incremental", pages=10)
+
+            self.assertEqual(report.get_pages_freed(), 10)
+            self.assertEqual(report.free_pages_after, free_pages - 10)
+
+    def test_compact__into(self):
+        self.create_db("input.db")
+
+        engine = create_engine(f"sqlite:///input.db")
+        with engine.connect() as connection:
+            self.add_and_remove_entries(engine, connection)
+
+            compaction = SqliteCompaction(engine, connection)
+            pages = compaction.get_pragma("page_count")
+
+            # call tested function
+            report = compaction.compact(mode="into", output_file="output.db")
+
+            self.assertTrue(Path("output.db").exists())
+            self.assertEqual(compaction.get_pragma("page_count"), pages)
+            self.assertGreater(report.get_pages_freed(), 0)
@@ -0,0 +1,74 @@
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+from linkarchivetools.backup import copy_table, get_engine_table
+from linkarchivetools.utils.tabledigest import (
+    get_table_digest,
+    get_digest_differences,
+    BackupManifest,
+)
+from linkarchivetools.utils.reflected import ReflectedEntryTable
+from .dbtestcase import DbTestCase
+
+
+class TableDigestTest(DbTestCase):
+    def create_workspace_db(self, file_name):
+        self.create_db(file_name)
+
+        engine = create_engine(f"sqlite:///{file_name}")
+        with engine.connect() as connection:
+            table = ReflectedEntryTable(engine=engine, connection=connection)
+            for index in range(15):
+                table.insert_json(self.get_default_entry_data("https://google.com/{}".format(index)))
+
+            connection.execute(text("ALTER TABLE linkdatamodel RENAME TO workspace_linkdatamodel"))
+            connection.commit()
+
+    def get_digest(self, engine, with_workspace):
+        table = get_engine_table("workspace", "linkdatamodel", engine, with_workspace=with_workspace)
+        with engine.connect() as connection:
+            return get_table_digest(connection, table, batch_size=4)
+
+    def test_get_table_digest(self):
+        self.create_workspace_db("input.db")
+        self.create_db("output.db")
+
+        source_engine = create_engine("sqlite:///input.db")
+        destination_engine = create_engine("sqlite:///output.db")
+        copy_table("workspace", "linkdatamodel", source_engine, destination_engine, override=True)
+
+        # call tested function
+        expected = self.get_digest(source_engine, with_workspace=True)
+        actual = self.get_digest(destination_engine, with_workspace=False)
+
+        self.assertEqual(expected["rows"], 15)
+        self.assertEqual(expected["max_id"], 15)
+        self.assertIn("link", expected["columns"])
+        self.assertEqual(get_digest_differences(expected, actual), [])
+
+        with destination_engine.connect() as connection:
+            connection.execute(text("UPDATE linkdatamodel SET title = 'changed' WHERE id = 3"))
+            connection.commit()
+
+        actual = self.get_digest(destination_engine, with_workspace=False)
+        self.assertEqual(get_digest_differences(expected, actual), ["hash"])
+
+    def test_backup_manifest(self):
+        self.clean_out()
+        file_name = Path("input.json")
+
+        manifest = BackupManifest(file_name)
+        manifest.set_info(workspace="places")
+        manifest.set_table("linkdatamodel", {"rows": 1, "max_id": 1, "hash": "abc", "columns": ["id"]})
+
+        # call tested function
+        manifest.write()
+
+        manifest = BackupManifest(file_name)
+        self.assertTrue(manifest.read())
+        self.assertEqual(manifest.data["workspace"], "places")
+        self.assertEqual(manifest.get_table("linkdatamodel")["hash"], "abc")
+
+        self.assertFalse(BackupManifest("does_not_exist.json").read())
+
+        file_name.unlink()
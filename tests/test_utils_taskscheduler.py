@@ -0,0 +1,73 @@
+import threading
+import time
+import unittest
+
+from linkarchivetools.utils.taskscheduler import TaskScheduler, Task
+
+
+class TaskSchedulerTest(unittest.TestCase):
+    def test_run__dependencies(self):
+        order = []
+        lock = threading.Lock()
+
+        def work(name):
+            time.sleep(0.01)
+            with lock:
+                order.append(name)
+
+        scheduler = TaskScheduler(jobs=4)
+        scheduler.add_task("child", work, "child", depends_on=["parent"])
+        scheduler.add_task("parent", work, "parent")
+        scheduler.add_task("other", work, "other")
+
+        # call tested function
+        self.assertTrue(scheduler.run())
+
+        self.assertEqual(len(order), 3)
+        self.assertLess(order.index("parent"), order.index("child"))
+
+    def test_run__resource(self):
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                running.append(1)
+                max_running.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        scheduler = TaskScheduler(jobs=4)
+        for index in range(4):
+            scheduler.add_task(f"task{index}", work, resource="file.db")
+
+        # call tested function
+        self.assertTrue(scheduler.run())
+
+        self.assertEqual(max(max_running), 1)
+
+    def test_run__failure(self):
+        called = []
+
+        scheduler = TaskScheduler(jobs=2, stop_on_error=False)
+        scheduler.add_task("parent", lambda: False)
+        scheduler.add_task("child", lambda: called.append("child"), depends_on=["parent"])
+        scheduler.add_task("other", lambda: called.append("other"))
+
+        # call tested function
+        self.assertFalse(scheduler.run())
+
+        self.assertEqual(called, ["other"])
+        self.assertEqual(scheduler.tasks["parent"].status, Task.FAILED)
+        self.assertEqual(scheduler.tasks["child"].status, Task.SKIPPED)
+        self.assertEqual(scheduler.tasks["other"].status, Task.DONE)
+
+    def test_run__cycle(self):
+        scheduler = TaskScheduler(jobs=2)
+        scheduler.add_task("a", lambda: True, depends_on=["b"])
+        scheduler.add_task("b", lambda: True, depends_on=["a"])
+
+        with self.assertRaises(ValueError):
+            scheduler.run()